@@ -0,0 +1,133 @@
+"""
+/sms 업무 배정 엔진
+
+센터 인원 전체를 한 번에 배정한다. 한 사람당 SLOTS 칸(전반/후반)을 칸 단위로 채운다.
+- 직무별 인원은 비율(ratio)대로 최대 잉여 방식으로 나눠 합계가 정확히 인원 수와 같다
+- 자격증이 필요한 직무는 해당 자격증 보유자만 배정한다 (부족분은 자격 없는 직무로 넘김)
+- 최근 부하(rollup_fatigue_day)가 적은 사람부터 강도 높은 직무에 배정한다
+- 다음 칸에서는 앞 칸에서 고강도(HEAVY_INTENSITY 이상) 직무를 받은 횟수가 적은 사람이 먼저다.
+  한 칸의 강도 × 시간(최대 7.6)은 7일 부하 차이보다 작아 부하만으로는 순위가 거의 바뀌지 않으므로
+  횟수를 먼저 보고 부하는 같은 횟수끼리의 순서로만 쓴다. 고강도 인원이 절반 이하이고 자격자가 충분하면
+  두 칸 모두 고강도인 사람은 없다 (부족할 때만 어쩔 수 없이 생긴다)
+- 같은 부하끼리의 순서는 seed 로 섞으므로 seed 가 같으면 결과도 같다
+정렬 위주라 인원 수에 거의 비례하는 시간에 끝난다.
+"""
+import random
+import zlib
+
+SLOTS = 2          # 한 사람당 배정 칸 수
+SLOT_HOURS = 4     # 한 칸의 근무시간 (다음 칸 배정 시 부하 = 강도 × 시간 만큼 더함)
+FATIGUE_DAYS = 7   # 최근 부하 합계 기간
+
+DEFAULT_INTENSITY = 1.0
+HEAVY_INTENSITY = 1.5  # 고강도 직무 기준 (fatigue.RISK_INTENSITY 와 같은 값)
+
+# 일용직 업무 가중치: 상하차 40%, 포장 40%, 재고관리 20%
+DAILY_RATIOS = {
+    '상하차': 40,
+    '포장': 40,
+    '재고관리': 20
+}
+
+def default_seed(*parts) -> int:
+    # seed 를 주지 않으면 (센터, 근로형태, 날짜)로 정해 같은 날 여러 페이지를 나눠 받아도 결과가 같게
+    return zlib.crc32("|".join(str(p) for p in parts).encode("utf-8"))
+
+def apportion(total: int, ratios: dict) -> dict:
+    # 최대 잉여 방식: 비율대로 나눈 몫을 내림한 뒤 남는 인원을 소수부가 큰 직무부터 1명씩
+    weight = sum(r for r in ratios.values() if r > 0)
+    if total <= 0 or weight <= 0:
+        return {job: 0 for job in ratios}
+    quotas = {job: total * max(r, 0) / weight for job, r in ratios.items()}
+    counts = {job: int(q) for job, q in quotas.items()}
+    rest = total - sum(counts.values())
+    for job in sorted(quotas, key=lambda j: (counts[j] - quotas[j], j))[:rest]:
+        counts[job] += 1
+    return counts
+
+def eligible(cert, required) -> bool:
+    return not required or (cert is not None and required in str(cert))
+
+# ==============================
+# 배정
+# ==============================
+
+def assign_slot(certs, jobs, targets, loads, order, heavy=None):
+    """
+    한 칸 배정. order 는 seed 로 섞은 사람 인덱스 (같은 순위일 때의 순서).
+    heavy 는 사람별 앞 칸 고강도 횟수 (없으면 부하만으로 순위).
+    반환: (사람별 직무 목록, 직무별 부족 인원)
+    """
+    heavy = heavy or [0] * len(certs)
+    # 안정 정렬 -> 같은 순위는 섞인 순서 유지
+    ranked = sorted(order, key=lambda i: (heavy[i], loads[i]))
+    result = [None] * len(certs)
+    shortfall = {}
+
+    # 1) 자격증 직무: 자격자 수 대비 필요 인원이 빠듯한 직무부터
+    cert_jobs = [j for j in jobs if jobs[j]['required_cert'] and targets.get(j, 0) > 0]
+    candidates = {
+        j: [i for i in ranked if eligible(certs[i], jobs[j]['required_cert'])]
+        for j in cert_jobs
+    }
+    cert_jobs.sort(key=lambda j: (len(candidates[j]) / targets[j], j))
+    for job in cert_jobs:
+        need = targets[job]
+        for i in candidates[job]:
+            if need == 0:
+                break
+            if result[i] is None:
+                result[i] = job
+                need -= 1
+        if need:
+            shortfall[job] = need
+
+    # 2) 나머지 직무: 부족분을 비율대로 더해, 덜 피로한 사람부터 강도 높은 직무로
+    open_jobs = {j: jobs[j]['ratio'] for j in jobs if not jobs[j]['required_cert']}
+    counts = {j: targets.get(j, 0) for j in open_jobs}
+    for job, extra in apportion(sum(shortfall.values()), open_jobs).items():
+        counts[job] += extra
+
+    rest = iter(i for i in ranked if result[i] is None)
+    for job in sorted(open_jobs, key=lambda j: (-jobs[j]['intensity'], j)):
+        for _ in range(counts[job]):
+            i = next(rest, None)
+            if i is None:
+                break
+            result[i] = job
+    return result, shortfall
+
+def plan(certs, jobs: dict, ratios: dict, loads, seed: int):
+    """
+    certs : 사람별 자격증 (명단 순서)
+    jobs  : 직무 -> {'intensity', 'required_cert'} (job_settings)
+    ratios: 배정 대상 직무 -> 비율
+    loads : 사람별 최근 부하
+    반환: (사람별 [칸1 직무, 칸2 직무, ...], 직무별 목표 인원, 칸별 부족 인원)
+    """
+    rng = random.Random(seed)
+    loads = [float(x) for x in loads]
+    active = {
+        j: {
+            'intensity': jobs.get(j, {}).get('intensity') or DEFAULT_INTENSITY,
+            'required_cert': jobs.get(j, {}).get('required_cert'),
+            'ratio': r,
+        }
+        for j, r in ratios.items() if r and r > 0
+    }
+
+    targets = apportion(len(certs), {j: v['ratio'] for j, v in active.items()})
+    assigned = [[] for _ in certs]
+    heavy = [0] * len(certs)  # 사람별 고강도 칸 수
+    shortfalls = []
+    for _ in range(SLOTS):
+        order = list(range(len(certs)))
+        rng.shuffle(order)
+        result, shortfall = assign_slot(certs, active, targets, loads, order, heavy)
+        for i, job in enumerate(result):
+            assigned[i].append(job)
+            if job is not None:
+                loads[i] += active[job]['intensity'] * SLOT_HOURS
+                heavy[i] += active[job]['intensity'] >= HEAVY_INTENSITY
+        shortfalls.append(shortfall)
+    return assigned, targets, shortfalls
@@ -0,0 +1,392 @@
+"""
+API 벤치마크
+
+bench_data 로 합성 DB 를 만든 뒤 main.app 을 프로세스 안에서(httpx ASGITransport) 띄우고
+main.py 의 모든 엔드포인트를 시나리오별로 호출해 지연시간 분위수(p50/p95/p99), 처리량, 최대 RSS 를
+JSON 으로 남긴다. 릴리스 사이 결과는 --compare 로 비교한다.
+
+    python bench.py --logs 100000 --out before.json
+    python bench.py --logs 100000 --out after.json --cold     # 응답 캐시 끄고 측정
+    python bench.py --compare before.json after.json
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_REQUESTS = 50     # 읽기 시나리오별 요청 수
+DEFAULT_CONCURRENCY = 4
+WRITE_REQUESTS = 5        # 쓰기 시나리오별 요청 수 (데이터를 바꾸므로 적게)
+EDIT_BATCH_ITEMS = 100    # /edit/logs 한 요청의 수정 건수
+REGRESSION_PCT = 20       # --compare 에서 p95 가 이 비율 이상 나빠지면 표시
+JOB_WAIT_SEC = 60         # 결과 파일 시나리오 전에 내보내기 작업이 끝나길 기다리는 최대 시간
+
+# ==============================
+# 측정
+# ==============================
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def peak_rss_mb() -> float:
+    # 리눅스는 KB, macOS 는 바이트 단위
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def summarize(latencies, statuses, wall: float) -> dict:
+    ms = sorted(x * 1000 for x in latencies)
+    codes = {}
+    for s in statuses:
+        codes[str(s)] = codes.get(str(s), 0) + 1
+    return {
+        "requests": len(ms),
+        "p50_ms": round(percentile(ms, 0.50), 3),
+        "p95_ms": round(percentile(ms, 0.95), 3),
+        "p99_ms": round(percentile(ms, 0.99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "max_ms": round(ms[-1], 3) if ms else 0.0,
+        "rps": round(len(ms) / wall, 2) if wall > 0 else 0.0,
+        "status": codes,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+async def drive(client, make_request, count: int, concurrency: int) -> dict:
+    """
+    make_request(i) -> (method, url, kwargs). count 개를 동시에 concurrency 개씩 보낸다.
+    kwargs 의 on_response 는 요청 인자가 아니라 응답을 받을 콜백 (예: 제출한 작업 id 기록).
+    """
+    sem = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], []
+
+    async def one(i):
+        method, url, kwargs = make_request(i)
+        on_response = kwargs.pop("on_response", None)
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.request(method, url, **kwargs)
+            await r.aread()
+            latencies.append(time.perf_counter() - t0)
+            statuses.append(r.status_code)
+        if on_response:
+            on_response(r)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+# ==============================
+# 시나리오
+# ==============================
+
+def scenarios(data: dict, files: dict, headers: dict, requests: int):
+    """
+    (이름, 요청 수, make_request[, prepare]) 목록. main.py 의 엔드포인트를 모두 한 번 이상 부른다.
+    prepare(client) 는 측정 전에 실행하는 코루틴 (취소할 작업 제출, 작업 완료 대기 등).
+    쓰기 시나리오는 뒤쪽에 두어 앞의 읽기 측정이 같은 데이터를 보게 한다.
+    parquet 내보내기는 pyarrow 가 있을 때만.
+    """
+    centers = data["centers"]
+    end = data["end"]
+    month = end[:7]
+    pay_day = (datetime.strptime(end, "%Y-%m-%d") + timedelta(days=3)).strftime("%Y-%m-%d")
+    name = data["sample_name"]
+    login = {"code": "WMS01", "username": "admin", "key": "1234"}
+    xlsx = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    def get(url_fn):
+        return lambda i: ("GET", url_fn(i), {"headers": headers})
+
+    def center(i):
+        return centers[i % len(centers)]
+
+    def upload(path, form, on_response=None):
+        def make(i):
+            with open(path, "rb") as f:
+                content = f.read()
+            return ("POST", "/" + form["_url"], {
+                "headers": headers,
+                "data": {k: v for k, v in form.items() if not k.startswith("_")},
+                "files": {"file": (os.path.basename(path), content, xlsx)},
+                "on_response": on_response,
+            })
+        return make
+
+    # 제출한 백그라운드 작업 id (jobs_get 에서 조회)
+    job_ids = []
+
+    def submitted(r):
+        if r.status_code == 202:
+            job_ids.append(r.json()["job_id"])
+
+    # 끝나면 결과 파일이 생기는 내보내기 작업 id (jobs_artifact 에서 다운로드)
+    export_ids = []
+
+    def exported(r):
+        submitted(r)
+        if r.status_code == 202:
+            export_ids.append(r.json()["job_id"])
+
+    def job_id(i, ids=job_ids):
+        return ids[i % len(ids)] if ids else "none"
+
+    export_url = f"/jobs/export?target=work_logs&type=REGULAR&date_from={month}-01"
+
+    async def wait_jobs(client):
+        # 결과 파일은 끝난 작업만 받을 수 있으므로
+        deadline = time.perf_counter() + JOB_WAIT_SEC
+        while time.perf_counter() < deadline:
+            r = await client.get("/jobs", headers=headers)
+            if all(j["status"] not in ("queued", "running") for j in r.json()):
+                return
+            await asyncio.sleep(0.1)
+
+    # 취소 시나리오용 작업 (측정하지 않고 제출만)
+    cancel_ids = []
+
+    async def submit_for_cancel(client):
+        for _ in range(WRITE_REQUESTS):
+            r = await client.post(export_url, headers=headers)
+            cancel_ids.append(r.json()["job_id"])
+
+    # 프로파일이 없으면 (PROFILING=0) 빈 프로파일 하나를 저장해 다운로드 경로를 잰다
+    profile_ids = []
+
+    async def pick_profile(client):
+        r = await client.get("/admin/profiles", headers=headers)
+        found = [p["id"] for p in r.json()["profiles"]]
+        if not found:
+            from profiling import Profile, profile_store
+            found = [profile_store.save(Profile(), {"route": "/bench"})]
+        profile_ids.extend(found)
+
+    def edit_batch(i):
+        # 요청마다 다른 id 구간 (edit_log 가 고친 앞쪽 id 와 겹치지 않게)
+        start = 1000 + i * EDIT_BATCH_ITEMS
+        return {"items": [
+            {"id": start + k, "job_name": "상하차" if k % 2 else "포장", "work_hours": 6 + k % 3}
+            for k in range(EDIT_BATCH_ITEMS)
+        ]}
+
+    reads = [
+        ("health", get(lambda i: "/health")),
+        ("workers_list_regular", get(lambda i: "/workers/list?type=REGULAR")),
+        ("workers_list_regular_page", get(lambda i: "/workers/list?type=REGULAR&limit=100&sort=name")),
+        ("workers_list_daily", get(lambda i: f"/workers/list?type=DAILY&date={end}")),
+        ("payroll_regular", get(lambda i: f"/payroll?center={center(i)}&date_filter={month}&type=REGULAR")),
+        ("payroll_daily", get(lambda i: f"/payroll?center={center(i)}&date_filter={pay_day}&type=DAILY")),
+        ("workforce_detail", get(lambda i: f"/workforce/detail?name={name}&date_filter={month}&type=REGULAR")),
+        ("risk_regular", get(lambda i: "/risk?type=REGULAR")),
+        ("risk_daily", get(lambda i: "/risk?type=DAILY")),
+        ("analytics", get(lambda i: "/analytics?type=REGULAR")),
+        ("sms", get(lambda i: f"/sms?center={center(i)}&type=REGULAR&limit=500")),
+        ("settings", get(lambda i: "/settings")),
+        ("health_pools", get(lambda i: "/health/pools")),
+        ("health_cache", get(lambda i: "/health/cache")),
+        ("health_sql", get(lambda i: "/health/sql")),
+        ("metrics", get(lambda i: "/metrics")),
+        ("admin_profiles", get(lambda i: "/admin/profiles")),
+        ("jobs_list", get(lambda i: "/jobs")),
+    ]
+    out = [(n, requests, fn) for n, fn in reads]
+    out += [
+        ("download_xlsx", max(1, requests // 10), get(lambda i: f"/download?target=work_logs&type=REGULAR&date_from={month}-01")),
+        ("download_csv", max(1, requests // 10), get(lambda i: f"/download?target=work_logs&type=REGULAR&format=csv&date_from={month}-01")),
+    ]
+    if importlib.util.find_spec("pyarrow") is not None:
+        out.append(("download_parquet", max(1, requests // 10), get(lambda i: f"/download?target=work_logs&type=REGULAR&format=parquet&date_from={month}-01")))
+    out += [
+        ("admin_profile", requests, get(lambda i: f"/admin/profiles/{job_id(i, profile_ids)}"), pick_profile),
+        ("login", WRITE_REQUESTS, lambda i: ("POST", "/auth/login", {"json": login})),
+        ("upload_workers", 1, upload(files["workers"][0], {"_url": "upload/workers", "type": "DAILY"})),
+        ("upload_logs", 1, upload(files["logs"][0], {"_url": "upload/logs", "type": "DAILY"})),
+        ("edit_log", WRITE_REQUESTS, lambda i: ("POST", "/edit/log", {"headers": headers, "json": {"id": i + 1, "job_name": "포장", "work_hours": 6}})),
+        ("edit_logs", WRITE_REQUESTS, lambda i: ("POST", "/edit/logs", {"headers": headers, "json": edit_batch(i)})),
+        ("edit_worker", WRITE_REQUESTS, lambda i: ("POST", "/edit/worker", {"headers": headers, "json": {"id": i + 1, "name": f"벤치{i}", "phone": f"010-9999-{i:04d}", "center": centers[0]}})),
+        ("settings_update", WRITE_REQUESTS, lambda i: ("POST", "/settings/update", {"headers": headers, "json": {"job_name": "포장", "ratio": 20 + i}})),
+        # 강도/시급이 바뀌면 기간 안 근무 기록을 다시 계산 (요청마다 값이 달라야 재계산이 일어남)
+        ("settings_update_reprice", WRITE_REQUESTS, lambda i: ("POST", "/settings/update", {"headers": headers, "json": {"job_name": "상하차", "intensity": 1.5 + (i + 1) / 10, "hourly_wage": 12000 + i * 100, "date_from": f"{month}-01"}})),
+        ("settings_reprice", WRITE_REQUESTS, lambda i: ("POST", "/settings/reprice", {"headers": headers, "json": {"job_name": "상하차", "date_from": f"{month}-01"}})),
+        ("jobs_export", WRITE_REQUESTS, lambda i: ("POST", export_url, {"headers": headers, "on_response": exported})),
+        ("jobs_upload", 1, upload(files["workers"][0], {"_url": "jobs/upload/workers", "type": "DAILY"}, submitted)),
+        ("jobs_get", requests, get(lambda i: f"/jobs/{job_id(i)}")),
+        ("jobs_cancel", WRITE_REQUESTS, lambda i: ("POST", f"/jobs/{cancel_ids[i]}/cancel", {"headers": headers}), submit_for_cancel),
+        ("jobs_artifact", WRITE_REQUESTS, get(lambda i: f"/jobs/{job_id(i, export_ids)}/artifact"), wait_jobs),
+        ("settings_add", 1, lambda i: ("POST", "/settings/add", {"headers": headers, "json": {"job_name": "벤치직무"}})),
+        ("settings_delete", 1, lambda i: ("POST", "/settings/delete", {"headers": headers, "json": {"job_name": "벤치직무"}})),
+        ("delete_worker", 1, lambda i: ("POST", "/delete/worker", {"headers": headers, "json": {"id": 1}})),
+        ("logout", 1, lambda i: ("POST", "/auth/logout", {"headers": headers})),
+    ]
+    return out
+
+async def run_app(data: dict, files: dict, requests: int, concurrency: int, only=None, log=print) -> dict:
+    import httpx
+    import main
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    # ASGITransport 는 lifespan 을 보내지 않으므로 직접 실행
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            r = await client.post("/auth/login", json={"code": "WMS01", "username": "admin", "key": "1234"})
+            headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+            for name, count, make, *prepare in scenarios(data, files, headers, requests):
+                if only and name not in only:
+                    continue
+                for step in prepare:
+                    await step(client)
+                # 쓰기/업로드는 순서가 의미 있으므로 하나씩
+                conc = concurrency if count == requests else 1
+                results[name] = await drive(client, make, count, conc)
+                if log:
+                    s = results[name]
+                    log(f"[bench] {name:28s} p50 {s['p50_ms']:9.2f}ms  p95 {s['p95_ms']:9.2f}ms  "
+                        f"{s['rps']:8.1f} req/s  {s['status']}")
+    return results
+
+# ==============================
+# 비교
+# ==============================
+
+def compare(old: dict, new: dict, threshold: float = REGRESSION_PCT) -> list:
+    # 시나리오별 p95 변화율. threshold 이상 느려진 항목은 '!' 표시
+    lines = []
+    for name, cur in new["results"].items():
+        prev = old["results"].get(name)
+        if prev is None:
+            lines.append(f"  {name:28s} (새 시나리오) p95 {cur['p95_ms']:.2f}ms")
+            continue
+        base = prev["p95_ms"] or 1e-9
+        change = (cur["p95_ms"] - prev["p95_ms"]) / base * 100
+        flag = "!" if change >= threshold else " "
+        lines.append(
+            f"{flag} {name:28s} p95 {prev['p95_ms']:9.2f} -> {cur['p95_ms']:9.2f}ms ({change:+6.1f}%)  "
+            f"rps {prev['rps']:.1f} -> {cur['rps']:.1f}"
+        )
+    return lines
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+# ==============================
+# CLI
+# ==============================
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="WorkerGuard API 벤치마크")
+    parser.add_argument("--logs", type=int, default=100000, help="근무 기록 행 수 (1만~1000만)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--centers", type=int, default=12)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="읽기 시나리오별 요청 수")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--upload-rows", type=int, default=10000, help="업로드 시나리오 근무 기록 행 수")
+    parser.add_argument("--only", default=None, help="쉼표로 구분한 시나리오 이름만 실행")
+    parser.add_argument("--cold", action="store_true", help="응답 캐시를 끄고 측정")
+    parser.add_argument("--db", default=None, help="데이터셋 DB 경로: 있으면 복사해서 재사용, 없으면 만들어 저장")
+    parser.add_argument("--out", default=None, help="결과 JSON 경로")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="두 결과 JSON 비교")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            new = json.load(f)
+        lines = compare(old, new)
+        print("\n".join(lines))
+        return 1 if any(line.startswith("!") for line in lines) else 0
+
+    # db / cache 모듈이 임포트 시점에 읽는 설정은 임포트 전에
+    work_dir = tempfile.mkdtemp(prefix="wg-bench-")
+    db_path = os.path.join(work_dir, "bench.db")
+    os.environ["DB_PATH"] = db_path
+    os.environ["JOB_DIR"] = os.path.join(work_dir, "jobs")
+    os.environ["PROFILE_DIR"] = os.path.join(work_dir, "profiles")
+    if args.cold:
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    try:
+        return run_bench(args, work_dir, db_path)
+    finally:
+        # 데이터셋 복사본(1000만 행이면 수 GB)과 작업/업로드 파일
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def run_bench(args, work_dir: str, db_path: str) -> int:
+    import bench_data
+
+    if args.db and os.path.exists(args.db):
+        # 쓰기 시나리오가 데이터를 바꾸므로 원본은 두고 복사본으로 측정
+        src = sqlite3.connect(args.db)
+        dst = sqlite3.connect(db_path)
+        src.backup(dst)
+        src.close()
+        dst.close()
+        with open(args.db + ".json", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = bench_data.populate(db_path, args.logs, args.workers, args.centers, args.days, args.seed)
+        if args.db:
+            # 데이터셋 설명(센터, 날짜 범위 등)은 DB 옆 <db>.json 에
+            shutil.copyfile(db_path, args.db)
+            with open(args.db + ".json", "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+    after = bench_data.date_range(data["end"], 2)[-1]
+    files = bench_data.upload_files(
+        os.path.join(work_dir, "upload"), workers=max(10, args.upload_rows // 10),
+        logs=args.upload_rows, centers=len(data["centers"]), date=after, seed=args.seed + 1
+    )
+
+    started = time.perf_counter()
+    results = asyncio.run(run_app(
+        data, files, args.requests, args.concurrency,
+        only=set(args.only.split(",")) if args.only else None
+    ))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cold": args.cold,
+            "elapsed_sec": round(time.perf_counter() - started, 2),
+        },
+        "dataset": data,
+        "results": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
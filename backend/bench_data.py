@@ -0,0 +1,235 @@
+"""
+벤치마크용 합성 데이터
+
+센터·근로형태별 명단(workers)과 근무 기록(work_logs)을 업로드와 같은 경로
+(WorkerIdMap -> compute_*_frame -> insert_frame -> apply_log_delta)로 DB 에 채우고,
+업로드 API 에 그대로 넣을 수 있는 엑셀 파일도 만든다. job_settings 는 마이그레이션 기본값을 쓴다.
+
+    python bench_data.py --db bench.db --logs 1000000 --centers 12
+    python bench_data.py --db bench.db --logs 100000 --xlsx out/   # 업로드용 엑셀도 생성
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from db import DB_BUSY_TIMEOUT, PRAGMAS
+from ingest import (
+    INSERT_LOG_SQL, INSERT_WORKER_SQL, LOG_COLUMNS, WORKER_COLUMNS,
+    WorkerIdMap, compute_log_frame, compute_worker_frame, insert_frame, load_job_frame
+)
+from migrations import migrate_path
+from rollups import apply_log_delta
+
+GEN_CHUNK_ROWS = 50000     # 한 트랜잭션에 넣는 근무 기록 수
+XLSX_MAX_ROWS = 1000000    # 시트 최대 행(1,048,576) 아래에서 파일을 나눈다
+LOGS_PER_WORKER = 40       # 명단 크기를 정하지 않았을 때: 근무 기록 수 / 이 값
+DAILY_SHARE = 0.3          # 명단 중 일용직 비율
+
+START_DATE = "2025-01-01"
+
+CENTERS = (
+    '서울', '부산', '인천', '대구', '대전', '광주', '울산', '수원', '용인', '고양',
+    '성남', '화성', '청주', '천안', '전주', '김해', '평택', '이천', '김포', '양산',
+)
+SURNAMES = ('김', '이', '박', '최', '정', '강', '조', '윤', '장', '임', '한', '오', '서', '신', '권', '황')
+GIVEN = (
+    '민준', '서준', '도윤', '예준', '시우', '하준', '지호', '주원', '지후', '준우',
+    '서연', '서윤', '지우', '서현', '민서', '하은', '하윤', '윤서', '지민', '채원',
+    '철수', '영희', '민수', '영수', '순자', '정숙', '현우', '지훈', '수빈', '예린',
+)
+SHIFTS = ('A', 'B', 'C')
+CERTS = ('지게차면허', '전기기사', '용접기능사', '지게차면허,전기기사')
+CERT_SHARE = 0.25
+
+# calc_pay / night_mask 가 해석하는 실제 시간대 문자열 (18:00~02:00 후반, 02:00~10:00 전반이 야간)
+TIME_SLOTS = (
+    '02:00~10:00 (전반)', '02:00~10:00 (후반)',
+    '10:00~18:00 (전반)', '10:00~18:00 (후반)',
+    '18:00~02:00 (전반)', '18:00~02:00 (후반)',
+)
+WORK_HOURS = (4, 4, 8, 8, 8, 6)
+
+# ==============================
+# 엑셀 형식 프레임 (업로드 컬럼 그대로)
+# ==============================
+
+def date_range(start: str, days: int) -> list:
+    base = datetime.strptime(start, "%Y-%m-%d")
+    return [(base + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+
+def make_workers(rng, count: int, centers, valid_date=None, phone_start: int = 0) -> pd.DataFrame:
+    # 이름 조합이 적어 동명이인이 섞인다 (전화번호는 모두 다름)
+    names = np.char.add(rng.choice(SURNAMES, count), rng.choice(GIVEN, count))
+    phones = [f"010-{(phone_start + i) // 10000:04d}-{(phone_start + i) % 10000:04d}" for i in range(count)]
+    certs = np.where(rng.random(count) < CERT_SHARE, rng.choice(CERTS, count), None)
+    df = pd.DataFrame({
+        '이름': names,
+        '전화번호': phones,
+        '소속센터': rng.choice(np.asarray(centers, dtype=object), count),
+        '고정교대조': rng.choice(SHIFTS, count),
+        '자격증': certs,
+    })
+    if valid_date is not None:
+        df['기준일'] = valid_date
+    return df
+
+def make_logs(rng, workers: pd.DataFrame, count: int, dates, jobs: pd.DataFrame) -> pd.DataFrame:
+    # 직무는 job_settings 비율대로, 근무지는 그 사람의 소속센터
+    who = rng.integers(0, len(workers), count)
+    ratio = jobs['ratio'].clip(lower=0).astype(float).to_numpy()
+    p = ratio / ratio.sum() if ratio.sum() > 0 else None
+    slot = rng.integers(0, len(TIME_SLOTS), count)
+    return pd.DataFrame({
+        '날짜': rng.choice(np.asarray(dates, dtype=object), count),
+        '이름': workers['이름'].to_numpy()[who],
+        '전화번호': workers['전화번호'].to_numpy()[who],
+        '근무지': workers['소속센터'].to_numpy()[who],
+        '직무': rng.choice(jobs['job_name'].to_numpy(), count, p=p),
+        '시간대': np.asarray(TIME_SLOTS, dtype=object)[slot],
+        '근무시간': np.asarray(WORK_HOURS)[slot],
+    })
+
+def write_xlsx(df: pd.DataFrame, path: str) -> list:
+    # 쓰기 전용 워크북으로 행 단위 기록 (메모리에 셀 객체를 쌓지 않음). 너무 크면 파일을 나눈다
+    from openpyxl import Workbook
+
+    paths = []
+    parts = max(1, -(-len(df) // XLSX_MAX_ROWS))
+    root, ext = os.path.splitext(path)
+    for part in range(parts):
+        chunk = df.iloc[part * XLSX_MAX_ROWS:(part + 1) * XLSX_MAX_ROWS]
+        target = path if parts == 1 else f"{root}_{part + 1}{ext}"
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(list(chunk.columns))
+        for row in chunk.itertuples(index=False, name=None):
+            ws.append([None if isinstance(v, float) and np.isnan(v) else v for v in row])
+        wb.save(target)
+        paths.append(target)
+    return paths
+
+# ==============================
+# DB 채우기
+# ==============================
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _insert_workers(conn, df: pd.DataFrame, worker_type: str, valid_date) -> pd.DataFrame:
+    ids = WorkerIdMap(conn, worker_type)
+    worker_ids = ids.ensure(conn, df['이름'], df['전화번호'])
+    insert_frame(conn, INSERT_WORKER_SQL, compute_worker_frame(df, worker_type, valid_date, worker_ids), WORKER_COLUMNS)
+    conn.commit()
+    return df
+
+def populate(db_path: str, logs: int = 100000, workers: int = None, centers: int = 12,
+             days: int = 60, seed: int = 0, start: str = START_DATE, log=print) -> dict:
+    """
+    빈 DB(또는 새 경로)에 명단과 근무 기록을 채운다. 근무 기록은 정규직/일용직을 명단 비율대로 나눈다.
+    반환: 벤치마크가 요청 파라미터로 쓰는 값 (센터, 날짜 범위, 표본 이름 등)
+    """
+    started = time.perf_counter()
+    migrate_path(db_path, log=None)
+    rng = np.random.default_rng(seed)
+    workers = workers or max(10, logs // LOGS_PER_WORKER)
+    centers = list(CENTERS[:max(1, min(centers, len(CENTERS)))])
+    dates = date_range(start, days)
+
+    conn = connect(db_path)
+    try:
+        jobs = load_job_frame(conn)
+        ratios = pd.DataFrame([tuple(r) for r in conn.execute("SELECT job_name, ratio FROM job_settings")],
+                              columns=['job_name', 'ratio'])
+        n_daily = int(workers * DAILY_SHARE)
+        rosters = {
+            'REGULAR': _insert_workers(conn, make_workers(rng, workers - n_daily, centers), 'REGULAR', None),
+            # 일용직 명단은 마지막 근무일 기준 (/workers/list?type=DAILY&date=...)
+            'DAILY': _insert_workers(conn, make_workers(rng, n_daily, centers, phone_start=workers), 'DAILY', dates[-1]),
+        }
+
+        inserted = 0
+        for worker_type, roster in rosters.items():
+            if roster.empty:
+                continue
+            total = int(logs * len(roster) / workers)
+            ids = WorkerIdMap(conn, worker_type)
+            for offset in range(0, total, GEN_CHUNK_ROWS):
+                df = make_logs(rng, roster, min(GEN_CHUNK_ROWS, total - offset), dates, ratios)
+                frame = compute_log_frame(df, jobs, worker_type, ids.resolve(df['이름'], df['전화번호']))
+                inserted += insert_frame(conn, INSERT_LOG_SQL, frame, LOG_COLUMNS)
+                apply_log_delta(conn, frame)
+                conn.commit()
+                if log:
+                    log(f"[bench_data] {worker_type} {inserted:,} rows")
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    regular = rosters['REGULAR']
+    return {
+        "db": db_path,
+        "workers": int(workers),
+        "logs": int(inserted),
+        "centers": centers,
+        "start": dates[0],
+        "end": dates[-1],
+        "days": days,
+        "seed": seed,
+        "sample_name": str(regular['이름'].iloc[0]) if len(regular) else None,
+        "elapsed_sec": round(time.perf_counter() - started, 2),
+    }
+
+def upload_files(out_dir: str, workers: int = 1000, logs: int = 10000, centers: int = 12,
+                 date: str = None, seed: int = 1) -> dict:
+    """
+    업로드 API 용 엑셀: 일용직 명단(기준일=date) + 그 명단의 date 하루치 근무 기록.
+    date 는 populate 범위 밖의 날짜여야 근무 기록 업로드가 중복(409)으로 막히지 않는다.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    date = date or date_range(START_DATE, 2)[-1]
+    roster = make_workers(rng, workers, list(CENTERS[:centers]), valid_date=date, phone_start=10 ** 7)
+    jobs = pd.DataFrame({'job_name': ['상하차', '포장', '재고관리'], 'ratio': [40, 40, 20]})
+    day_logs = make_logs(rng, roster, logs, [date], jobs)
+    return {
+        "workers": write_xlsx(roster, os.path.join(out_dir, "workers.xlsx")),
+        "logs": write_xlsx(day_logs, os.path.join(out_dir, "logs.xlsx")),
+        "date": date,
+    }
+
+# ==============================
+# CLI
+# ==============================
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 데이터 생성")
+    parser.add_argument("--db", required=True, help="채울 DB 경로 (없으면 생성)")
+    parser.add_argument("--logs", type=int, default=100000, help="근무 기록 행 수")
+    parser.add_argument("--workers", type=int, default=None, help="명단 인원 (기본: 근무 기록 / %d)" % LOGS_PER_WORKER)
+    parser.add_argument("--centers", type=int, default=12)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--xlsx", default=None, help="업로드용 엑셀을 만들 디렉터리")
+    args = parser.parse_args(argv)
+
+    summary = populate(args.db, args.logs, args.workers, args.centers, args.days, args.seed)
+    print(summary)
+    if args.xlsx:
+        after = date_range(summary["end"], 2)[-1]
+        print(upload_files(args.xlsx, centers=args.centers, date=after, seed=args.seed + 1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,223 @@
+"""
+응답 캐시
+
+대시보드가 계속 폴링하는 조회 API(/analytics, /risk, /payroll, /workers/list, /settings)의 결과를
+(엔드포인트, 파라미터, 읽는 테이블들의 데이터 버전) 키로 메모리에 보관한다.
+쓰기 경로(업로드/수정/삭제/설정)는 커밋 후 tenant.versions.bump() 로 테이블 버전을 올리므로
+이전 버전으로 만든 항목은 다시 조회되지 않고 LRU 로 밀려난다.
+버전과 캐시는 회사 DB 마다 한 벌씩 있다 (tenants.Tenant). 한 회사의 조회가 다른 회사 항목을 밀어내지 않는다.
+
+다른 프로세스(여러 워커, rollups.py --rebuild, tenants.py migrate)의 쓰기는 DB 의 data_versions 행으로 알린다.
+쓰기 트랜잭션 안에서 record_write() 로 행 버전을 올리고, 각 프로세스는 VERSION_CHECK_INTERVAL 초에 한 번
+그 행을 읽어 버전에 합친다. 다른 프로세스의 쓰기는 최대 그 간격만큼 늦게 반영되고,
+data_versions 를 거치지 않은 쓰기(sqlite3 셸 등)는 RESPONSE_CACHE_TTL 이 지나야 반영된다.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from executor import db_executor
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))   # 최대 항목 수
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))    # 초
+VERSION_CHECK_INTERVAL = float(os.getenv("VERSION_CHECK_INTERVAL", "1"))  # data_versions 를 다시 읽는 간격 (초)
+
+TABLES = ("workers", "work_logs", "job_settings")
+
+_MISSING = object()
+
+# ==============================
+# 테이블별 데이터 버전
+# ==============================
+
+def record_write(conn, *tables):
+    # 쓰기 트랜잭션 안에서 (커밋 전) 호출. 테이블을 주지 않으면 전부
+    conn.execute(
+        "UPDATE data_versions SET version = version + 1 WHERE table_name IN (SELECT value FROM json_each(?))",
+        (json.dumps(tables or TABLES),)
+    )
+
+class DataVersions:
+    """
+    이 프로세스의 쓰기(bump) 카운터 + path 의 data_versions 행 (다른 프로세스의 쓰기).
+    data_versions 는 VERSION_CHECK_INTERVAL 초에 한 번만 읽으므로 요청마다 DB 를 읽지 않는다.
+    읽기(refresh)는 DB 작업 풀에서 하고 (refresh_versions), snapshot/shared 는 메모리 값만 돌려준다.
+    """
+
+    def __init__(self, tables=TABLES, path: str = None, interval: float = VERSION_CHECK_INTERVAL):
+        self._lock = threading.Lock()
+        self._versions = {t: 0 for t in tables}
+        self._shared = {}
+        self.path = path
+        self.interval = interval
+        self._conn = None
+        self._read_lock = threading.Lock()  # _conn 과 _shared 교체 순서 (이벤트 루프는 잡지 않음)
+        self._next_check = 0.0
+
+    def bump(self, *tables):
+        # 커밋이 끝난 뒤에 호출 (캐시 키를 먼저 읽은 요청이 새 데이터를 옛 버전으로 저장해도 다시 안 쓰임)
+        with self._lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+            # 같은 트랜잭션에서 올린 data_versions 행을 다음 조회에서 바로 읽도록 (ETag 는 그 값만 씀)
+            self._next_check = 0.0
+
+    def due(self) -> bool:
+        # 다시 읽을 때가 됐으면 True (이번 간격의 읽기를 맡음: 동시에 온 요청은 기존 값을 씀)
+        with self._lock:
+            now = time.monotonic()
+            if self.path is None or now < self._next_check:
+                return False
+            self._next_check = now + self.interval
+            return True
+
+    def refresh(self):
+        # data_versions 읽기 (동기 sqlite: 작업 스레드에서 호출)
+        with self._read_lock:
+            try:
+                if self._conn is None:
+                    uri = pathlib.Path(self.path).resolve().as_uri() + "?mode=ro"
+                    self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                shared = dict(self._conn.execute(
+                    "SELECT table_name, version FROM data_versions /* scan-ok: 3행 */"
+                ).fetchall())
+            except sqlite3.Error:
+                # 마이그레이션 전이거나 파일이 없음: 이 프로세스 버전만 쓰고 다음 간격에 다시
+                shared = {}
+                self._close()
+            with self._lock:
+                self._shared = shared
+
+    def snapshot(self, tables) -> tuple:
+        with self._lock:
+            return tuple((self._versions.get(t, 0), self._shared.get(t, 0)) for t in tables)
+
+    def shared(self, tables):
+        # data_versions 값만 (모든 프로세스·재시작에서 같음). 읽지 못했으면 None
+        with self._lock:
+            if not self._shared:
+                return None
+            return tuple(self._shared.get(t, 0) for t in tables)
+
+    def _close(self):
+        # _read_lock 안에서 호출
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def close(self):
+        with self._read_lock:
+            self._close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {t: {"local": v, "shared": self._shared.get(t, 0)} for t, v in self._versions.items()}
+
+# ==============================
+# LRU + TTL 캐시
+# ==============================
+
+class ResponseCache:
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # key -> (만료 시각, 값)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return _MISSING
+            if item[0] <= now:
+                del self._items[key]
+                self.expired += 1
+                self.misses += 1
+                return _MISSING
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
+
+
+async def refresh_versions(versions: DataVersions):
+    # 간격이 지났을 때만 DB 작업 풀에서 data_versions 를 읽는다 (나머지 요청은 dict 조회만)
+    if versions.due():
+        await db_executor.run(versions.refresh)
+
+async def cached(tenant, endpoint: str, params: tuple, tables, compute):
+    """
+    캐시에 있으면 바로 돌려주고, 없으면 compute()(코루틴 함수) 결과를 저장한다.
+    버전은 계산 전에 읽는다 (계산 중 커밋된 쓰기는 다음 요청에서 새 키로 반영).
+    tenant: versions(DataVersions) 와 responses(ResponseCache) 를 가진 회사 DB (tenants.Tenant)
+    """
+    await refresh_versions(tenant.versions)
+    key = (endpoint, params, tenant.versions.snapshot(tables))
+    value = tenant.responses.get(key)
+    if value is _MISSING:
+        value = await compute()
+        tenant.responses.put(key, value)
+    return value
+
+# ==============================
+# ETag
+# ==============================
+
+def make_etag(tenant, path: str, params, tables):
+    """
+    같은 회사·경로·파라미터·테이블 버전이면 응답 본문도 같으므로 strong ETag.
+    refresh_versions 를 먼저 기다린 뒤 호출. 버전은 DB 의 data_versions 값만 쓰므로 어느 워커 프로세스가 응답해도, 재시작 후에도 같은 태그가 나온다.
+    data_versions 를 읽지 못하면 None (ETag 를 붙이지 않음).
+    """
+    versions = tenant.versions.shared(tables)
+    if versions is None:
+        return None
+    raw = repr((tenant.code, path, tuple(params), tuple(tables), versions))
+    return '"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (t.strip() for t in if_none_match.split(","))
+    return any((t[2:] if t.startswith("W/") else t) == etag for t in tags)
+
+def cache_stats(tenants) -> dict:
+    return {t.code: {"responses": t.responses.stats(), "versions": t.versions.stats()} for t in tenants}
@@ -0,0 +1,149 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+
+from metrics import connection_factory
+
+# ==============================
+# 설정 / 상수
+# ==============================
+
+DB_PATH = os.getenv("DB_PATH", "worker_data_v22.db")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))        # 프로세스당 최대 커넥션 수
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # 커넥션 대기 최대 시간(초)
+DB_BUSY_TIMEOUT = 30        # 다른 프로세스가 쓰기 잠금을 잡고 있을 때 대기(초)
+STATEMENT_CACHE_SIZE = 256  # 커넥션별 prepared statement 캐시 크기
+
+# 커넥션 생성 시 한 번만 적용하는 PRAGMA
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # 쓰기 중에도 읽기 가능 (업로드가 조회를 막지 않음)
+    "PRAGMA synchronous=NORMAL",    # WAL 모드에서는 NORMAL로도 커밋 내구성 보장
+    "PRAGMA cache_size=-65536",     # 페이지 캐시 64MB (음수 = KB 단위)
+    "PRAGMA mmap_size=268435456",   # 256MB 메모리 매핑 읽기
+    "PRAGMA temp_store=MEMORY",     # GROUP BY / ORDER BY 임시 테이블을 메모리에
+)
+
+
+class PoolExhausted(RuntimeError):
+    pass
+
+
+# ==============================
+# 커넥션 풀
+# ==============================
+
+class ConnectionPool:
+    """
+    SQLite 커넥션 풀.
+    커넥션은 요청마다 새로 열지 않고 재사용하며, 최근에 반납된 커넥션을 먼저 꺼내
+    (LIFO) 페이지 캐시와 statement 캐시가 따뜻한 상태를 유지한다.
+    """
+
+    def __init__(self, path: str, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT,
+            check_same_thread=False,  # 풀에서 꺼낸 스레드와 사용하는 스레드가 다를 수 있음
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=connection_factory(),  # 문장별 시간 측정 (METRICS_ENABLED=0 이면 기본 커넥션)
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolExhausted("사용 가능한 DB 커넥션이 없습니다.")
+
+    def release(self, conn: sqlite3.Connection):
+        # 커밋되지 않은 작업은 버린다 (기존 conn.close() 동작과 동일)
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        # 유휴 커넥션만 닫는다. 사용 중인 커넥션은 반납될 때 다시 풀에 들어간다.
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "created": self._created,
+            "idle": self._idle.qsize(),
+        }
+
+
+pool = ConnectionPool(DB_PATH)
+
+# ==============================
+# FastAPI 의존성
+# ==============================
+
+def pool_db(db_pool: ConnectionPool):
+    try:
+        conn = db_pool.acquire()
+    except PoolExhausted:
+        raise HTTPException(status_code=503, detail="서버가 혼잡합니다. 잠시 후 다시 시도해주세요.")
+    try:
+        yield conn
+    finally:
+        db_pool.release(conn)
+
+def get_db():
+    # 공용 DB (계정). 회사 데이터는 main.get_tenant_db
+    yield from pool_db(pool)
@@ -0,0 +1,91 @@
+"""
+근무 기록 일괄 수정 (/edit/logs)
+
+/edit/log 를 행마다 부르면 요청·직무 조회·커밋이 행 수만큼 반복된다.
+여기서는 직무 설정을 한 번 읽고, 대상 행을 한 번에 조회해 급여/야간시간/점수를 열 단위로 계산한 뒤
+UPDATE 와 집계 증감분을 한 트랜잭션으로 반영한다. 잘못된 항목은 건너뛰고 항목별 사유를 돌려준다.
+"""
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingest import frame_rows, load_job_frame, night_mask, throughput
+from rollups import ROLLUP_COLUMNS, apply_log_delta
+
+EDIT_BATCH_MAX = int(os.getenv("EDIT_BATCH_MAX", "10000"))  # 한 요청의 최대 수정 건수
+
+EDIT_COLUMNS = ('id', 'job_name', 'work_hours')
+TARGET_COLUMNS = ('id', 'time_slot') + ROLLUP_COLUMNS
+
+UPDATE_LOG_SQL = (
+    "UPDATE work_logs SET job_name=?, work_hours=?, night_hours=?, total_pay=?, intensity=?, score=? "
+    "WHERE id=?"
+)
+
+
+def load_targets(conn, ids) -> pd.DataFrame:
+    # 수정 대상 행을 id 목록으로 한 번에 조회 (이전 값은 집계에서 빼기용)
+    rows = conn.execute(
+        f"SELECT {', '.join(TARGET_COLUMNS)} FROM work_logs "
+        "WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(sorted({int(i) for i in ids})),)
+    ).fetchall()
+    return pd.DataFrame([tuple(r) for r in rows], columns=list(TARGET_COLUMNS))
+
+def edit_log_rows(conn, items: list) -> dict:
+    """
+    items: (id, job_name, work_hours) 목록. 계산 규칙은 /edit/log (calc_pay) 와 같다.
+    반영된 건수는 rows, 건너뛴 항목은 failed (요청 순서의 index 와 사유).
+    같은 id 가 여러 번 오면 첫 항목만 반영한다. 커밋은 호출자가 한다.
+    """
+    started = time.perf_counter()
+    req = pd.DataFrame(items, columns=list(EDIT_COLUMNS))
+    req['index'] = np.arange(len(req))
+    failed = []
+
+    def reject(mask, detail):
+        for idx, log_id in zip(req.loc[mask, 'index'].tolist(), req.loc[mask, 'id'].tolist()):
+            failed.append({"index": idx, "id": log_id, "detail": detail})
+
+    dup = req['id'].duplicated()
+    reject(dup, "같은 요청에 이미 있는 기록입니다.")
+    req = req[~dup].merge(load_job_frame(conn), how='left', on='job_name', sort=False)
+
+    no_job = req['hourly_wage'].isna()
+    reject(no_job, "직무 설정이 존재하지 않습니다.")
+    req = req[~no_job]
+
+    old = load_targets(conn, req['id'])
+    missing = ~req['id'].isin(old['id'])
+    reject(missing, "근무 기록을 찾을 수 없습니다.")
+    req = req[~missing]
+
+    if not req.empty:
+        old = old.set_index('id').loc[req['id']].reset_index()
+        hours = req['work_hours'].astype(float).to_numpy()
+        intensity = req['intensity'].astype(float).to_numpy()
+        wage = req['hourly_wage'].astype(float).to_numpy()
+        night = night_mask(old['time_slot'])
+
+        new = old.copy()
+        new['job_name'] = req['job_name'].to_numpy()
+        new['work_hours'] = hours
+        new['night_hours'] = np.where(night, hours, 0.0)
+        new['total_pay'] = np.trunc(hours * wage * np.where(night, 1.5, 1.0)).astype(np.int64)
+        new['intensity'] = intensity
+        new['score'] = intensity * hours * 10
+
+        conn.executemany(UPDATE_LOG_SQL, frame_rows(new, (
+            'job_name', 'work_hours', 'night_hours', 'total_pay', 'intensity', 'score', 'id'
+        )))
+        # 집계 테이블: 이전 값 빼고 새 값 더하기
+        apply_log_delta(
+            conn, pd.concat([old, new], ignore_index=True),
+            weight=np.repeat([-1, 1], len(req))
+        )
+
+    failed.sort(key=lambda f: f["index"])
+    return {**throughput(len(req), started), "failed": failed}
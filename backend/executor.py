@@ -0,0 +1,201 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from db import DB_POOL_SIZE
+from profiling import PROFILING, current_profile, run_attached
+
+# ==============================
+# 설정 / 상수
+# ==============================
+
+CPU_COUNT = os.cpu_count() or 2
+
+# 작업 종류별 스레드 수 (서로 다른 풀이라 엑셀 파싱이 DB 조회나 로그인을 막지 않음)
+DB_WORKERS = int(os.getenv("DB_WORKERS", str(DB_POOL_SIZE)))           # 커넥션 수보다 많으면 의미 없음
+EXCEL_WORKERS = int(os.getenv("EXCEL_WORKERS", str(min(2, CPU_COUNT))))  # pandas/openpyxl 파싱·생성
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(CPU_COUNT)))           # bcrypt (GIL 해제됨)
+
+# bcrypt 입장 제한: 대기+실행 작업이 이 수를 넘으면 즉시 거절, 이 시간 안에 스레드를 못 받으면 포기
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+HASH_QUEUE_TIMEOUT = float(os.getenv("HASH_QUEUE_TIMEOUT", "5"))
+
+
+class ExecutorBusy(RuntimeError):
+    # reason: "saturated" (대기열 가득 참) | "timeout" (대기 시간 초과)
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"{name} 작업 풀이 혼잡합니다 ({reason})")
+        self.reason = reason
+
+# ==============================
+# 작업 실행기
+# ==============================
+
+class BoundedExecutor:
+    """
+    이벤트 루프를 막는 동기 작업을 실행하는 스레드 풀.
+    스레드 수는 고정이고, 대기 중/실행 중 작업 수를 집계해 큐 적체를 확인할 수 있다.
+    max_pending / queue_timeout 을 주면 입장 제한: 대기+실행 수가 max_pending 이상이면 바로,
+    queue_timeout 안에 실행이 시작되지 않으면 작업을 취소하고 ExecutorBusy 를 낸다.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int = 0, queue_timeout: float = 0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self.queued = 0      # 스레드를 기다리는 작업 수
+        self.running = 0     # 실행 중인 작업 수
+        self.completed = 0
+        self.failed = 0
+        self.max_queued = 0  # 관측된 최대 대기 수
+        self.rejected = 0    # max_pending 초과로 거절
+        self.timed_out = 0   # queue_timeout 초과로 취소
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"wg-{self.name}",
+                )
+            return self._executor
+
+    def _call(self, fn, enqueued_at: float):
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.total_wait += started - enqueued_at
+        ok = False
+        try:
+            result = fn()
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                if not ok:
+                    self.failed += 1
+                self.total_run += time.perf_counter() - started
+
+    async def run(self, fn, *args, **kwargs):
+        executor = self._get_executor()
+        call = functools.partial(fn, *args, **kwargs)
+        if PROFILING:
+            # 작업 스레드를 호출한 요청의 프로파일에 묶음 (run_in_executor 는 contextvar 를 넘기지 않음)
+            call = functools.partial(run_attached, current_profile.get(), call)
+        with self._lock:
+            if self.max_pending and self.queued + self.running >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorBusy(self.name, "saturated")
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        future = executor.submit(self._call, call, time.perf_counter())
+        future.add_done_callback(self._dequeue_cancelled)
+        waiter = asyncio.wrap_future(future)
+        if not self.queue_timeout:
+            # 요청이 취소되면 waiter 와 함께 아직 시작 전인 future 도 취소된다
+            return await waiter
+
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # asyncio.wait 는 취소돼도 waiter 를 두고 나오므로 직접 취소
+            future.cancel()
+            raise
+        # 아직 스레드를 못 받았으면 취소 (이미 실행 중이면 끝날 때까지 기다림)
+        if not done and future.cancel():
+            with self._lock:
+                self.timed_out += 1
+            raise ExecutorBusy(self.name, "timeout")
+        return await waiter
+
+    def _dequeue_cancelled(self, future):
+        # 스레드를 받기 전에 취소된 작업은 _call 이 실행되지 않으므로 대기 수를 여기서 뺀다
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "max_queued": self.max_queued,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "avg_wait_ms": round(self.total_wait / done * 1000, 3),
+                "avg_run_ms": round(self.total_run / done * 1000, 3),
+            }
+
+
+class ThreadedGenerator:
+    """
+    동기 제너레이터를 실행기 스레드에서 한 항목씩 꺼낸다 (엑셀 파싱/인코딩 스트림).
+    요청이 취소돼도 스레드에서 실행 중인 next() 는 멈추지 않으므로, close() 는 그 호출이 끝나길 기다린 뒤
+    같은 실행기에서 제너레이터를 닫는다 (실행 중에 닫으면 ValueError: generator already executing).
+    """
+
+    def __init__(self, executor: BoundedExecutor, gen):
+        self.executor = executor
+        self.gen = gen
+        self._pending = None
+
+    async def next(self):
+        # 끝나면 None
+        self._pending = asyncio.ensure_future(self.executor.run(next, self.gen, None))
+        # shield: 요청 취소가 진행 중인 next() 의 결과 대기를 끊지 않게 (close 에서 기다림)
+        item = await asyncio.shield(self._pending)
+        self._pending = None
+        return item
+
+    async def close(self):
+        pending, self._pending = self._pending, None
+        try:
+            if pending is not None:
+                await asyncio.wait({pending})
+                if not pending.cancelled():
+                    pending.exception()  # 취소로 버려진 결과의 예외는 여기서 소비
+            await self.executor.run(self.gen.close)
+        except asyncio.CancelledError:
+            # 닫는 중에 다시 취소됨: 실행 중인 next() 가 끝나는 대로 닫는다
+            if pending is not None and not pending.done():
+                pending.add_done_callback(lambda _: self.gen.close())
+            else:
+                self.gen.close()
+            raise
+
+
+db_executor = BoundedExecutor("db", DB_WORKERS)
+excel_executor = BoundedExecutor("excel", EXCEL_WORKERS)
+hash_executor = BoundedExecutor("hash", HASH_WORKERS, HASH_MAX_PENDING, HASH_QUEUE_TIMEOUT)
+
+EXECUTORS = (db_executor, excel_executor, hash_executor)
+
+
+def executor_stats() -> dict:
+    return {p.name: p.stats() for p in EXECUTORS}
+
+
+def shutdown_executors():
+    for p in EXECUTORS:
+        p.shutdown()
@@ -0,0 +1,216 @@
+"""
+스트리밍 내보내기
+
+DB 커서에서 EXPORT_CHUNK_ROWS 행씩 읽어 형식별 인코더로 바로 바이트를 만들어 보낸다.
+전체 테이블을 DataFrame 으로 올리지 않으므로 내보내는 기간이 길어도 메모리 사용량이 일정하다.
+
+- csv    : 청크마다 바로 전송 (엑셀 호환을 위해 UTF-8 BOM 포함)
+- xlsx   : openpyxl write-only 모드로 행을 임시 파일에 기록한 뒤, 완성된 파일을 청크로 전송
+           (xlsx 는 zip 컨테이너라 저장이 끝나야 파일이 완성됨)
+- parquet: 청크마다 row group 하나씩 기록해 바로 전송 (pyarrow 필요, 선택 의존성)
+"""
+import csv
+import io
+import tempfile
+import time
+
+import openpyxl
+from fastapi import HTTPException
+
+from executor import ThreadedGenerator, excel_executor
+from metrics import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # parquet 내보내기는 선택 기능
+    pa = None
+    pq = None
+
+EXPORT_CHUNK_ROWS = 2000        # 커서에서 한 번에 읽는 행 수
+FILE_CHUNK_BYTES = 1024 * 1024  # 완성된 파일을 보낼 때 청크 크기
+
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# 테이블별 날짜/센터 필터 컬럼과 정렬 (work_date 는 인덱스 순서라 같은 날짜 안에서만 정렬됨)
+TABLES = {
+    "work_logs": {"date": "work_date", "center": "location", "order": "work_date, id"},
+    "workers": {"date": "valid_date", "center": "center", "order": "id"},
+}
+
+SQLITE_TO_ARROW = {
+    "INTEGER": "int64",
+    "REAL": "float64",
+    "TEXT": "string",
+}
+
+# ==============================
+# 쿼리
+# ==============================
+
+def build_query(table: str, worker_type: str, center=None, date_from=None, date_to=None):
+    spec = TABLES[table]
+    where, params = ["worker_type=?"], [worker_type]
+    if center:
+        where.append(f"{spec['center']}=?")
+        params.append(center)
+    if date_from:
+        where.append(f"{spec['date']} >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append(f"{spec['date']} <= ?")
+        params.append(date_to)
+    sql = f"SELECT * FROM {table} /* dynamic: export */ WHERE {' AND '.join(where)} ORDER BY {spec['order']}"
+    return sql, params
+
+def iter_row_chunks(conn, sql: str, params, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    cur = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield [tuple(r) for r in rows]
+    finally:
+        cur.close()
+
+def count_query(sql: str) -> str:
+    # 백그라운드 내보내기 진행률의 전체 행 수 (같은 조건, 정렬 없이)
+    return f"SELECT COUNT(*) /* dynamic: export */ FROM ({sql.rsplit(' ORDER BY ', 1)[0]})"
+
+def count_rows(conn, sql: str, params) -> int:
+    return conn.execute(count_query(sql), params).fetchone()[0]
+
+def counted(chunks, on_rows):
+    for rows in chunks:
+        yield rows
+        on_rows(len(rows))
+
+def column_types(conn, table: str):
+    return {r[1]: (r[2] or "TEXT").upper() for r in conn.execute(f"PRAGMA table_info({table})")}
+
+# ==============================
+# 형식별 인코더
+# ==============================
+
+def encode_csv(columns, chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    yield ("\ufeff" + buf.getvalue()).encode("utf-8")
+    for rows in chunks:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+
+def encode_xlsx(columns, chunks):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(columns)
+    for rows in chunks:
+        for row in rows:
+            ws.append(row)
+
+    with tempfile.TemporaryFile() as out:
+        wb.save(out)
+        out.seek(0)
+        while True:
+            data = out.read(FILE_CHUNK_BYTES)
+            if not data:
+                break
+            yield data
+
+class _Drain(io.RawIOBase):
+    # ParquetWriter 가 쓰는 바이트를 모아 두었다가 row group 마다 꺼내 보낸다
+    def __init__(self):
+        self.buf = bytearray()
+        self.pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.buf += b
+        self.pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.pos
+
+    def take(self) -> bytes:
+        data, self.buf = bytes(self.buf), bytearray()
+        return data
+
+def encode_parquet(columns, chunks, types):
+    schema = pa.schema([
+        (col, getattr(pa, SQLITE_TO_ARROW.get(types.get(col, "TEXT"), "string"))())
+        for col in columns
+    ])
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in chunks:
+            batch = pa.Table.from_arrays(
+                [pa.array(col, type=schema.field(i).type) for i, col in enumerate(zip(*rows))],
+                schema=schema
+            )
+            writer.write_table(batch)
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+# ==============================
+# 스트림
+# ==============================
+
+def export_stream(table: str, fmt: str, sql: str, params, db_pool, on_rows=None):
+    """
+    내보내기 바이트를 차례로 내는 동기 제너레이터.
+    요청 의존성(get_tenant_db)의 커넥션은 응답 전에 반납되므로 스트림이 db_pool(회사 DB 풀)에서
+    자기 커넥션을 따로 잡는다. on_rows(n) 는 청크를 인코더에 넘긴 뒤 호출 (백그라운드 작업의 진행률).
+    """
+    with db_pool.connection() as conn:
+        cur = conn.execute(sql + " LIMIT 0", params)
+        columns = [d[0] for d in cur.description]
+        chunks = iter_row_chunks(conn, sql, params)
+        if on_rows:
+            chunks = counted(chunks, on_rows)
+        if fmt == "csv":
+            yield from encode_csv(columns, chunks)
+        elif fmt == "xlsx":
+            yield from encode_xlsx(columns, chunks)
+        else:
+            yield from encode_parquet(columns, chunks, column_types(conn, table))
+
+def check_format(fmt: str):
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 형식입니다: {fmt} (xlsx, csv, parquet)")
+    if fmt == "parquet" and pa is None:
+        raise HTTPException(status_code=400, detail="parquet 내보내기에는 pyarrow 설치가 필요합니다.")
+
+async def stream_export(gen, label: str = None):
+    # 인코딩(엑셀 풀)을 청크 단위로 실행해 이벤트 루프를 막지 않는다
+    started = time.perf_counter()
+    sent = 0
+    encoded = ThreadedGenerator(excel_executor, gen)
+    try:
+        while True:
+            data = await encoded.next()
+            if data is None:
+                break
+            if data:
+                sent += len(data)
+                yield data
+    finally:
+        # 연결이 끊겨도 인코딩 중인 청크가 끝난 뒤 닫아 커넥션을 바로 반납
+        try:
+            await encoded.close()
+        finally:
+            if label:
+                metrics.transferred("export", label, sent, time.perf_counter() - started)
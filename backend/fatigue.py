@@ -0,0 +1,113 @@
+"""
+/risk 피로도 계산
+
+rollup_fatigue_day (근로형태·날짜·worker_id별 합계)에서 기준일 이전 N일 창을 읽어
+근로자별 창 합계(근무시간, 부하 = 근무시간 × 강도, 야간시간, 근무일수)와
+기준일부터 거꾸로 센 고강도 연속 근무일수(streak)를 계산한다.
+원본 work_logs 와 명단 조인 없이 창 길이만큼의 집계 행만 읽는다.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+DEFAULT_WINDOWS = (3, 7, 14)
+MAX_WINDOW = 90
+
+RISK_INTENSITY = 1.5  # 하루 평균 강도가 이 값 이상이면 고강도 근무일
+RISK_STREAK = 2       # 고강도 근무일이 이만큼 연속이면 위험
+
+ID_BATCH = 500        # 명단 조회 IN (...) 한 번에 넣는 worker_id 수
+
+FATIGUE_COLUMNS = ('work_date', 'worker_id', 'hours_sum', 'load_sum', 'night_sum', 'intensity_sum', 'intensity_count')
+
+# ==============================
+# 입력
+# ==============================
+
+def parse_windows(text) -> tuple:
+    if not text:
+        return DEFAULT_WINDOWS
+    try:
+        windows = sorted({int(x) for x in str(text).split(",") if x.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="windows 는 쉼표로 구분한 일수여야 합니다. (예: 3,7,14)")
+    if not windows or windows[0] < 1 or windows[-1] > MAX_WINDOW:
+        raise HTTPException(status_code=400, detail=f"windows 는 1~{MAX_WINDOW}일 사이여야 합니다.")
+    return tuple(windows)
+
+def shift_date(date: str, days: int) -> str:
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+# ==============================
+# 조회 / 계산
+# ==============================
+
+def latest_date(conn, worker_type: str):
+    row = conn.execute(
+        "SELECT MAX(work_date) FROM rollup_fatigue_day WHERE worker_type=?",
+        (worker_type,)
+    ).fetchone()
+    return row[0][:10] if row and row[0] else None
+
+def load_days(conn, worker_type: str, as_of: str, span: int) -> pd.DataFrame:
+    # (기준일 - span, 기준일] 구간
+    rows = conn.execute(
+        "SELECT work_date, worker_id, hours_sum, load_sum, night_sum, intensity_sum, intensity_count "
+        "FROM rollup_fatigue_day WHERE worker_type=? AND work_date >= ? AND work_date < ?",
+        (worker_type, shift_date(as_of, 1 - span), shift_date(as_of, 1))
+    ).fetchall()
+    return pd.DataFrame([tuple(r) for r in rows], columns=list(FATIGUE_COLUMNS))
+
+def evaluate(days: pd.DataFrame, as_of: str, windows, intensity: float) -> pd.DataFrame:
+    """
+    worker_id별 한 행: today_int, prev_int, streak, 창마다 hours_Nd / load_Nd / night_Nd / days_Nd
+    """
+    if days.empty:
+        return pd.DataFrame()
+
+    days = days.copy()
+    days['offset'] = (
+        pd.Timestamp(as_of) - pd.to_datetime(days['work_date'].str.slice(0, 10))
+    ).dt.days
+    days['avg_int'] = days['intensity_sum'] / days['intensity_count'].where(days['intensity_count'] > 0)
+
+    span = int(days['offset'].max()) + 1
+    avg = days.pivot_table(index='worker_id', columns='offset', values='avg_int', aggfunc='mean')
+    avg = avg.reindex(columns=range(span))
+
+    # 기준일(offset 0)부터 끊기지 않고 이어지는 고강도 근무일 수
+    hot = (avg >= intensity).to_numpy()
+    streak = np.cumprod(hot, axis=1).sum(axis=1)
+
+    out = pd.DataFrame({
+        'today_int': avg[0].to_numpy(),
+        'prev_int': avg[1].to_numpy() if span > 1 else np.nan,
+        'streak': streak.astype(int),
+    }, index=avg.index)
+
+    for n in windows:
+        w = days[days['offset'] < n].groupby('worker_id')
+        agg = w[['hours_sum', 'load_sum', 'night_sum']].sum()
+        agg['days'] = w.size()
+        for col, src in (('hours', 'hours_sum'), ('load', 'load_sum'), ('night', 'night_sum'), ('days', 'days')):
+            # 창 안에 근무가 없으면 0
+            out[f'{col}_{n}d'] = agg[src].reindex(out.index).fillna(0).to_numpy()
+        out[f'days_{n}d'] = out[f'days_{n}d'].astype(int)
+    return out
+
+def lookup_workers(conn, worker_ids) -> dict:
+    # worker_id -> 명단 행 (일용직처럼 여러 행이면 가장 최근 등록 행)
+    found = {}
+    worker_ids = [int(x) for x in worker_ids]
+    for start in range(0, len(worker_ids), ID_BATCH):
+        batch = worker_ids[start:start + ID_BATCH]
+        rows = conn.execute(
+            f"SELECT worker_id, name, phone, center FROM workers "
+            f"WHERE worker_id IN ({','.join('?' * len(batch))}) ORDER BY id",
+            batch
+        ).fetchall()
+        for r in rows:
+            found[r['worker_id']] = r
+    return found
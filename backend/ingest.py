@@ -0,0 +1,460 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from fastapi import HTTPException
+
+from executor import ThreadedGenerator, excel_executor
+
+# ==============================
+# 설정 / 상수
+# ==============================
+
+INSERT_BATCH_SIZE = 5000  # executemany 한 번에 넣는 행 수 (= 엑셀 파싱 청크 크기)
+
+DEFAULT_INTENSITY = 1.0   # job_settings에 없는 직무의 기본값
+DEFAULT_WAGE = 10000
+
+WORKER_COLUMNS = ('name', 'phone', 'center', 'shift', 'cert', 'worker_type', 'valid_date', 'worker_id')
+LOG_COLUMNS = (
+    'name', 'location', 'job_name', 'time_slot', 'work_hours', 'night_hours',
+    'total_pay', 'intensity', 'score', 'work_date', 'worker_type', 'worker_id'
+)
+
+# 업로드 원장: 같은 파일을 다시 올리면 이 시간 안에서는 파싱 없이 이전 결과를 돌려줌
+UPLOAD_REPLAY_SECONDS = int(os.getenv("UPLOAD_REPLAY_SECONDS", str(24 * 3600)))
+UPLOAD_HASH_CHUNK = 1024 * 1024
+UPLOAD_MODES = ('reject', 'upsert')  # 이미 있는 날짜: 거절(409) / 같은 키의 행만 교체
+
+# upsert 모드에서 교체되어 지워진 근무 기록 (집계에서 빼기 위해 rollups.ROLLUP_COLUMNS 와 같은 순서)
+REPLACED_LOG_COLUMNS = (
+    'worker_type', 'location', 'name', 'work_date', 'work_hours', 'night_hours',
+    'total_pay', 'intensity', 'score', 'worker_id'
+)
+
+# 명단보다 먼저 올라온 근무 기록을 연결할 때 돌려받는 컬럼 (피로도 집계 반영용)
+ORPHAN_LOG_COLUMNS = ('worker_type', 'work_date', 'worker_id', 'work_hours', 'night_hours', 'intensity')
+
+INSERT_WORKER_SQL = (
+    f"INSERT INTO workers ({', '.join(WORKER_COLUMNS)}) "
+    f"VALUES ({','.join('?' * len(WORKER_COLUMNS))})"
+)
+INSERT_LOG_SQL = (
+    f"INSERT INTO work_logs ({', '.join(LOG_COLUMNS)}) "
+    f"VALUES ({','.join('?' * len(LOG_COLUMNS))})"
+)
+
+# ==============================
+# 스트리밍 엑셀 파싱
+# ==============================
+
+def iter_excel_chunks(fileobj, required_columns, chunk_rows: int = INSERT_BATCH_SIZE, meta: dict = None):
+    """
+    openpyxl read-only 모드로 첫 시트를 한 행씩 읽어 chunk_rows 크기의 DataFrame으로 내보낸다.
+    첫 행(헤더)에서 필수 컬럼을 검사하므로 잘못된 파일은 본문을 읽기 전에 거절된다.
+    meta 를 주면 시트에 적힌 크기로 추정한 행 수를 meta["total_rows"] 에 넣는다 (없으면 None).
+    DataFrame 의 index 는 시트의 행 번호(헤더 = 1)라 오류 메시지에 그대로 쓸 수 있다.
+    """
+    fileobj.seek(0)
+    try:
+        wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception:
+        raise HTTPException(status_code=400, detail="엑셀 파일을 읽을 수 없습니다.")
+
+    try:
+        ws = wb.worksheets[0]
+        if meta is not None:
+            meta["total_rows"] = ws.max_row - 1 if ws.max_row else None
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        columns = [
+            str(h).strip() if h is not None else f"Unnamed: {i}"
+            for i, h in enumerate(header)
+        ]
+        missing = [col for col in required_columns if col not in columns]
+        if missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"필수 컬럼이 없습니다: {', '.join(missing)}"
+            )
+
+        width = len(columns)
+        buf, numbers = [], []
+        for number, row in enumerate(rows, start=2):
+            if all(v is None for v in row):
+                continue  # 빈 행
+            if len(row) != width:
+                row = (tuple(row) + (None,) * width)[:width]
+            buf.append(row)
+            numbers.append(number)
+            if len(buf) >= chunk_rows:
+                yield pd.DataFrame(buf, columns=columns, index=numbers)
+                buf, numbers = [], []
+        if buf:
+            yield pd.DataFrame(buf, columns=columns, index=numbers)
+    finally:
+        wb.close()
+
+class ChunkSpool:
+    """
+    파싱한 청크를 임시 파일에 차례로 적어 두었다가 같은 순서로 다시 꺼낸다.
+    파싱을 쓰기 트랜잭션 전에 끝내 두기 위한 것으로, 쓸 때도 읽을 때도 한 번에 한 청크만 메모리에 있다.
+    (temp_store=MEMORY 라 TEMP 테이블은 메모리에 쌓이므로 디스크 임시 파일을 쓴다)
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile(prefix="wg-upload-")
+        self.chunks = 0
+        self.rows = 0
+
+    def write(self, df: pd.DataFrame):
+        pickle.dump(df, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.chunks += 1
+        self.rows += len(df)
+
+    def __iter__(self):
+        self._file.seek(0)
+        for _ in range(self.chunks):
+            yield pickle.load(self._file)
+
+    def close(self):
+        self._file.close()
+
+def _spooled(chunks, spool: ChunkSpool):
+    # 같은 스레드에서 파싱과 임시 파일 쓰기 (청크마다 행 수를 내보냄)
+    try:
+        for df in chunks:
+            spool.write(df)
+            yield len(df)
+    finally:
+        chunks.close()
+
+async def spool_excel_chunks(chunks, spool: ChunkSpool) -> int:
+    """
+    엑셀 파싱(엑셀 풀)을 끝까지 마쳐 spool 에 적는다. DB 는 건드리지 않으므로
+    큰 파일을 파싱하는 동안 회사 DB 의 쓰기 잠금을 잡지 않는다. 반환: 행 수
+    """
+    parsed = ThreadedGenerator(excel_executor, _spooled(chunks, spool))
+    try:
+        while await parsed.next() is not None:
+            pass
+    finally:
+        await parsed.close()
+    return spool.rows
+
+def spool_chunks(chunks, spool: ChunkSpool, progress=None) -> int:
+    # 백그라운드 작업용 (작업 스레드에서 바로). progress(rows) 는 청크마다
+    gen = _spooled(chunks, spool)
+    try:
+        for _ in gen:
+            if progress:
+                progress(spool.rows)
+    finally:
+        gen.close()
+    return spool.rows
+
+# ==============================
+# 열 단위 계산
+# ==============================
+
+def load_job_frame(conn) -> pd.DataFrame:
+    rows = conn.execute("SELECT job_name, intensity, hourly_wage FROM job_settings").fetchall()
+    return pd.DataFrame(
+        [tuple(r) for r in rows],
+        columns=['job_name', 'intensity', 'hourly_wage']
+    )
+
+def night_mask(slots: pd.Series) -> np.ndarray:
+    # calc_pay 의 야간 판정과 동일한 규칙
+    s = slots.astype(str)
+    late = s.str.contains("18:00~02:00", regex=False) & s.str.contains("(후반)", regex=False)
+    early = s.str.contains("02:00~10:00", regex=False) & s.str.contains("(전반)", regex=False)
+    return (late | early).to_numpy()
+
+def to_date_str(values: pd.Series) -> pd.Series:
+    # str(x).split()[0] 과 동일 ("2025-01-01 00:00:00" -> "2025-01-01")
+    return values.astype(str).str.split().str[0]
+
+def reject_bad_numbers(rows, bad: np.ndarray, detail: str):
+    # rows: 행 번호 (iter_excel_chunks 의 index)
+    if bad.any():
+        first = rows[int(np.argmax(bad))]
+        more = int(bad.sum()) - 1
+        raise HTTPException(status_code=400, detail=f"{first}행{f' 외 {more}건' if more else ''}: {detail}")
+
+def compute_log_frame(df: pd.DataFrame, jobs: pd.DataFrame, worker_type: str, worker_ids=None) -> pd.DataFrame:
+    """
+    엑셀 근무 기록(한글 컬럼)을 work_logs 행으로 변환한다.
+    직무 정보는 merge로 붙이고, 급여/야간시간/점수는 행 반복 없이 한 번에 계산한다.
+    근무시간이 비었거나 숫자가 아니면 (NaN 이 int64 급여로 바뀌어 저장되지 않도록) 파일 전체를 400 으로 거절한다.
+    """
+    merged = df[['날짜', '이름', '근무지', '직무', '시간대', '근무시간']].merge(
+        jobs, how='left', left_on='직무', right_on='job_name', sort=False
+    )
+    hours = pd.to_numeric(merged['근무시간'], errors='coerce').astype(float).to_numpy()
+    intensity = merged['intensity'].fillna(DEFAULT_INTENSITY).astype(float).to_numpy()
+    wage = merged['hourly_wage'].fillna(DEFAULT_WAGE).astype(float).to_numpy()
+    night = night_mask(merged['시간대'])
+    pay = hours * wage * np.where(night, 1.5, 1.0)
+
+    reject_bad_numbers(df.index, ~np.isfinite(hours), "근무시간이 비어 있거나 숫자가 아닙니다.")
+    reject_bad_numbers(df.index, ~np.isfinite(wage), "직무 시급 설정이 숫자가 아닙니다.")
+    reject_bad_numbers(df.index, ~(np.abs(pay) < 2 ** 63), "근무시간이 너무 커서 급여를 계산할 수 없습니다.")
+
+    return pd.DataFrame({
+        'name': merged['이름'],
+        'location': merged['근무지'],
+        'job_name': merged['직무'],
+        'time_slot': merged['시간대'],
+        'work_hours': hours,
+        'night_hours': np.where(night, hours, 0.0),
+        'total_pay': np.trunc(pay).astype(np.int64),
+        'intensity': intensity,
+        'score': intensity * hours * 10,
+        'work_date': to_date_str(merged['날짜']),
+        'worker_type': worker_type,
+        'worker_id': pd.Series(worker_ids, dtype=object) if worker_ids is not None else None,
+    })
+
+def compute_worker_frame(df: pd.DataFrame, worker_type: str, valid_date: str, worker_ids=None) -> pd.DataFrame:
+    return pd.DataFrame({
+        'name': df['이름'],
+        'phone': df['전화번호'],
+        'center': df['소속센터'],
+        'shift': df['고정교대조'],
+        'cert': df['자격증'],
+        'worker_type': worker_type,
+        'valid_date': valid_date,
+        'worker_id': pd.Series(worker_ids, dtype=object, index=df.index) if worker_ids is not None else None,
+    })
+
+# ==============================
+# worker_id 매핑
+# ==============================
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+def identity_key(name, phone):
+    # workers 에 저장되는 텍스트와 같은 표현 (이름 없으면 None, 전화번호 없으면 '')
+    if _blank(name):
+        return None
+    return str(name), '' if _blank(phone) else str(phone)
+
+class WorkerIdMap:
+    """
+    업로드 한 번 동안 쓰는 (이름, 전화번호) -> worker_id 사전.
+    시작할 때 해당 근로형태의 worker_identities 를 한 번 읽고, 명단에 새 사람이 나오면 추가한다.
+    """
+    def __init__(self, conn, worker_type: str):
+        self.worker_type = worker_type
+        self.by_key = {}
+        self.by_name = defaultdict(list)
+        self.created = []  # 이번 업로드에서 새로 만든 (worker_id, 이름)
+        rows = conn.execute(
+            "SELECT id, name, phone FROM worker_identities WHERE worker_type=?",
+            (worker_type,)
+        ).fetchall()
+        for wid, name, phone in rows:
+            self._add(wid, name, phone)
+
+    def _add(self, wid, name, phone):
+        self.by_key[(name, phone)] = wid
+        self.by_name[name].append(wid)
+
+    def ensure(self, conn, names, phones) -> list:
+        # 명단 업로드: 처음 보는 사람은 worker_identities 에 추가
+        ids = []
+        for name, phone in zip(names, phones):
+            key = identity_key(name, phone)
+            if key is None:
+                ids.append(None)
+                continue
+            wid = self.by_key.get(key)
+            if wid is None:
+                row = conn.execute(
+                    "INSERT INTO worker_identities (worker_type, name, phone) VALUES (?,?,?) "
+                    "ON CONFLICT DO NOTHING RETURNING id",
+                    (self.worker_type, *key)
+                ).fetchone()
+                if row is None:  # 다른 요청이 먼저 추가함
+                    row = conn.execute(
+                        "SELECT id FROM worker_identities WHERE worker_type=? AND name=? AND phone=?",
+                        (self.worker_type, *key)
+                    ).fetchone()
+                wid = row[0]
+                self._add(wid, *key)
+                self.created.append((wid, key[0]))
+            ids.append(wid)
+        return ids
+
+    def resolve(self, names, phones=None) -> list:
+        """
+        근무 기록: 전화번호 컬럼이 있으면 (이름, 전화번호)로, 없으면 동명이인이 없을 때만 이름으로 찾는다.
+        찾지 못한 행은 None (나중에 명단이 올라오면 link_orphans 로 연결).
+        """
+        if phones is None:
+            phones = [None] * len(names)
+        ids = []
+        for name, phone in zip(names, phones):
+            key = identity_key(name, phone)
+            if key is None:
+                ids.append(None)
+                continue
+            wid = self.by_key.get(key) if key[1] else None
+            if wid is None:
+                same = self.by_name.get(key[0], ())
+                wid = same[0] if len(same) == 1 else None
+            ids.append(wid)
+        return ids
+
+    def link_orphans(self, conn) -> pd.DataFrame:
+        # 이번에 새로 생긴 사람과 이름이 같은 미연결 근무 기록을 연결하고, 연결된 행을 돌려준다
+        rows = []
+        for wid, name in self.created:
+            if len(self.by_name[name]) != 1:
+                continue  # 동명이인은 이름만으로 연결하지 않음
+            rows += conn.execute(
+                "UPDATE work_logs SET worker_id=? WHERE worker_type=? AND name=? AND worker_id IS NULL "
+                "RETURNING worker_type, work_date, worker_id, work_hours, night_hours, intensity",
+                (wid, self.worker_type, name)
+            ).fetchall()
+        self.created = []
+        return pd.DataFrame([tuple(r) for r in rows], columns=list(ORPHAN_LOG_COLUMNS))
+
+# ==============================
+# 대량 INSERT
+# ==============================
+
+def frame_rows(frame: pd.DataFrame, columns) -> list:
+    # tolist()로 numpy 스칼라를 파이썬 기본형으로 바꿔야 sqlite3에 바인딩된다
+    return list(zip(*(frame[col].tolist() for col in columns)))
+
+def insert_frame(conn, sql: str, frame: pd.DataFrame, columns, batch_size: int = INSERT_BATCH_SIZE) -> int:
+    # 커밋은 호출자가 한 번만 한다 (업로드 전체가 하나의 트랜잭션)
+    rows = frame_rows(frame, columns)
+    for start in range(0, len(rows), batch_size):
+        conn.executemany(sql, rows[start:start + batch_size])
+    return len(rows)
+
+def throughput(rows: int, started: float) -> dict:
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    return {
+        "rows": rows,
+        "elapsed_sec": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1),
+    }
+
+# ==============================
+# 업로드 원장 / 중복 검사
+# ==============================
+
+def check_upload_mode(mode: str):
+    if mode not in UPLOAD_MODES:
+        raise HTTPException(status_code=400, detail=f"mode 는 {', '.join(UPLOAD_MODES)} 중 하나여야 합니다.")
+
+def file_digest(fileobj, copy_to: str = None) -> tuple:
+    """
+    업로드 본문(SpooledTemporaryFile)을 블록 단위로 읽어 SHA-256. 반환: (hex, 바이트 수)
+    copy_to 를 주면 같은 읽기로 그 경로에 복사한다 (백그라운드 작업용, 요청이 끝나면 본문이 사라짐).
+    """
+    fileobj.seek(0)
+    h = hashlib.sha256()
+    size = 0
+    out = open(copy_to, "wb") if copy_to else None
+    try:
+        while True:
+            block = fileobj.read(UPLOAD_HASH_CHUNK)
+            if not block:
+                break
+            h.update(block)
+            size += len(block)
+            if out:
+                out.write(block)
+    finally:
+        if out:
+            out.close()
+    fileobj.seek(0)
+    return h.hexdigest(), size
+
+def find_replay(conn, kind: str, worker_type: str, mode: str, digest: str):
+    """
+    같은 종류(kind, worker_type)의 가장 최근 업로드가 같은 파일·같은 모드이고 UPLOAD_REPLAY_SECONDS 안이면
+    그때의 결과를 돌려준다 (네트워크 오류 후 재시도). 그 사이 다른 파일이 올라왔으면 다시 처리한다.
+    """
+    row = conn.execute(
+        "SELECT id, content_hash, mode, result, created_at FROM uploads "
+        "WHERE kind=? AND worker_type=? ORDER BY id DESC LIMIT 1",
+        (kind, worker_type)
+    ).fetchone()
+    if row is None or row['content_hash'] != digest or row['mode'] != mode:
+        return None
+    age = (datetime.utcnow() - datetime.fromisoformat(row['created_at'])).total_seconds()
+    if age > UPLOAD_REPLAY_SECONDS:
+        return None
+    return {**json.loads(row['result']), "upload_id": row['id'], "replayed": True}
+
+def record_upload(conn, kind: str, worker_type: str, mode: str, digest: str, size: int,
+                  result: dict, username: str) -> int:
+    # 데이터와 같은 트랜잭션에서 기록 (커밋은 호출자)
+    row = conn.execute(
+        "INSERT INTO uploads (kind, worker_type, mode, content_hash, size, result, username, created_at) "
+        "VALUES (?,?,?,?,?,?,?,?) RETURNING id",
+        (kind, worker_type, mode, digest, size, json.dumps(result, ensure_ascii=False), username,
+         datetime.utcnow().isoformat(timespec="seconds"))
+    ).fetchone()
+    return row[0]
+
+def existing_dates(conn, worker_type: str, dates) -> list:
+    # 업로드 날짜들 중 이미 기록이 있는 날짜 (날짜마다 COUNT 대신 한 번에, json_each 는 입력 순서 = 정렬 순)
+    if not dates:
+        return []
+    rows = conn.execute(
+        "SELECT d.value FROM json_each(?) d "
+        "WHERE EXISTS (SELECT 1 FROM work_logs l WHERE l.worker_type=? AND l.work_date=d.value)",
+        (json.dumps(sorted(dates)), worker_type)
+    ).fetchall()
+    return [r[0] for r in rows]
+
+def replace_log_rows(conn, frame: pd.DataFrame, worker_type: str, dates) -> pd.DataFrame:
+    """
+    upsert 모드: frame 중 dates(이미 있던 날짜)에 해당하는 행과 (날짜, 이름, 시간대)가 같은 기존 행을 지우고
+    지운 행을 돌려준다 (집계에서 빼기용). 새 행 INSERT 는 호출자가 이어서 한다.
+    """
+    sub = frame[frame['work_date'].isin(list(dates))]
+    if sub.empty:
+        return pd.DataFrame(columns=list(REPLACED_LOG_COLUMNS))
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS upload_log_keys (work_date TEXT, name TEXT, time_slot TEXT)")
+    conn.execute("DELETE FROM temp.upload_log_keys")
+    conn.executemany(
+        "INSERT INTO temp.upload_log_keys (work_date, name, time_slot) VALUES (?,?,?)",
+        frame_rows(sub, ('work_date', 'name', 'time_slot'))
+    )
+    rows = conn.execute(
+        "DELETE FROM work_logs WHERE worker_type=? "
+        "AND (work_date, name, time_slot) IN (SELECT work_date, name, time_slot FROM temp.upload_log_keys) "
+        "RETURNING worker_type, location, name, work_date, work_hours, night_hours, "
+        "total_pay, intensity, score, worker_id",
+        (worker_type,)
+    ).fetchall()
+    return pd.DataFrame([tuple(r) for r in rows], columns=list(REPLACED_LOG_COLUMNS))
+
+def replace_daily_workers(conn, valid_date: str, worker_ids) -> int:
+    # upsert 모드 일용직 명단: 같은 기준일의 같은 사람 행을 지운다 (새 행은 호출자가 INSERT)
+    ids = sorted({int(w) for w in worker_ids if w is not None})
+    if not ids:
+        return 0
+    cur = conn.execute(
+        "DELETE FROM workers WHERE worker_type='DAILY' AND valid_date=? "
+        "AND worker_id IN (SELECT value FROM json_each(?))",
+        (valid_date, json.dumps(ids))
+    )
+    return cur.rowcount
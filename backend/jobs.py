@@ -0,0 +1,499 @@
+"""
+백그라운드 작업 (큰 업로드 / 내보내기)
+
+요청은 파일을 JOB_DIR 에 옮겨 두고 작업 id 만 바로 돌려준다. 실제 파싱·INSERT·직렬화는
+JOB_WORKERS 개의 작업 스레드가 회사 DB 의 작업 전용 커넥션(Tenant.job_pool)으로 처리하므로 대시보드 조회와
+요청 풀(db/excel 실행기, 커넥션 풀)을 나눠 쓰지 않는다.
+
+큐는 별도 SQLite 파일(JOB_DB_PATH)이다. 업로드는 반영하는 동안 본 DB 의 쓰기 잠금을 잡고 있으므로,
+같은 파일에 두면 작업 등록·진행률·취소 기록이 그 잠금을 기다리게 된다.
+- 상태: queued -> running -> done | failed | cancelled
+- 진행률: 작업 스레드가 JOB_PROGRESS_SECONDS 마다 처리 행 수를 기록 (취소 요청도 이때 확인)
+- 여러 프로세스가 같은 큐를 쓸 수 있다. 꺼낼 때는 UPDATE ... RETURNING 한 문장으로 하나만 가져가고,
+  실행 중인 작업은 JOB_HEARTBEAT_SECONDS 마다 갱신해 JOB_LEASE_SECONDS 동안 소식이 없으면
+  (프로세스 종료) 다시 queued 로 돌린다. 업로드는 커밋 전이면 전체가 롤백되고, 커밋 후였다면
+  업로드 원장(재시도 재생)이 같은 결과를 돌려주므로 다시 실행해도 안전하다.
+- 끝난 작업과 결과 파일은 JOB_KEEP_SECONDS 뒤에 지운다.
+- 큐는 모든 회사가 같이 쓴다. 꺼낼 때 실행 중인 작업이 적은 회사를 먼저 골라, 한 회사가 작업을 몰아 넣어도
+  다른 회사 작업이 그 뒤에 줄 서지 않는다. 조회·취소는 같은 회사(company_code) 작업만.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+
+from fastapi import HTTPException
+
+from db import ConnectionPool
+from export import MEDIA_TYPES, build_query, count_rows, export_stream
+from ingest import ChunkSpool, find_replay, iter_excel_chunks, spool_chunks
+from metrics import metrics
+from tenants import tenants
+from uploads import UPLOADS, apply_spool
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))            # 동시에 실행하는 작업 수 (0 이면 이 프로세스는 실행 안 함)
+JOB_DIR = os.getenv("JOB_DIR", "jobs")                       # 올린 파일 / 내보내기 결과
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(JOB_DIR, "jobs.db"))
+JOB_KEEP_SECONDS = int(os.getenv("JOB_KEEP_SECONDS", str(24 * 3600)))
+JOB_MAX_ATTEMPTS = 3            # 프로세스 종료로 끊긴 작업을 다시 시도하는 횟수
+JOB_POLL_SECONDS = 2.0          # 다른 프로세스가 넣은 작업 확인 주기
+JOB_PROGRESS_SECONDS = 0.5      # 진행률 기록 간격
+JOB_HEARTBEAT_SECONDS = 10.0
+JOB_LEASE_SECONDS = 60.0
+JOB_SWEEP_SECONDS = 600.0
+JOB_LIST_LIMIT = 50
+
+JOB_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,                 -- upload | export
+        params TEXT NOT NULL,               -- JSON
+        company_code TEXT NOT NULL DEFAULT '',
+        username TEXT NOT NULL,
+        status TEXT NOT NULL,
+        owner TEXT,                         -- 실행 중인 프로세스 (JobRunner.owner)
+        heartbeat_at REAL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        rows_done INTEGER NOT NULL DEFAULT 0,
+        rows_total INTEGER,
+        result TEXT,                        -- JSON
+        error TEXT,
+        error_status INTEGER,
+        artifact TEXT,                      -- 결과 파일 경로 (내보내기)
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs (status, company_code)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_company ON jobs (company_code, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_company_user ON jobs (company_code, username, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at)",
+    # 회사 구분 전 목록 조회용 (company 인덱스로 대체)
+    "DROP INDEX IF EXISTS idx_jobs_user",
+    "DROP INDEX IF EXISTS idx_jobs_created",
+)
+
+
+class JobCancelled(Exception):
+    pass
+
+class JobInterrupted(Exception):
+    # 서버 종료: 롤백 후 queued 로 돌려 다음 실행 때 이어서 처리
+    pass
+
+# ==============================
+# 큐 (jobs.db)
+# ==============================
+
+class JobQueue:
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self.pool = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> ConnectionPool:
+        with self._lock:
+            if self.pool is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                pool = ConnectionPool(self.path, size=max(4, JOB_WORKERS + 2))
+                with pool.connection() as conn:
+                    conn.execute(JOB_SCHEMA[0])
+                    if not any(r[1] == 'company_code' for r in conn.execute("PRAGMA table_info(jobs)")):
+                        # 회사 구분 전에 만든 큐 파일
+                        conn.execute("ALTER TABLE jobs ADD COLUMN company_code TEXT NOT NULL DEFAULT ''")
+                    for sql in JOB_SCHEMA[1:]:
+                        conn.execute(sql)
+                    conn.commit()
+                self.pool = pool
+            return self.pool
+
+    def submit(self, job_id: str, kind: str, params: dict, company_code: str, username: str) -> str:
+        with self._db().connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, params, company_code, username, status, created_at) "
+                "VALUES (?,?,?,?,?,'queued',?)",
+                (job_id, kind, json.dumps(params, ensure_ascii=False), company_code, username, time.time())
+            )
+            conn.commit()
+        return job_id
+
+    def claim(self, owner: str):
+        # 작업 하나를 한 문장으로 가져간다 (여러 프로세스가 동시에 꺼내도 하나만 성공)
+        # 실행 중인 작업이 가장 적은 회사 -> 그 안에서 가장 오래 기다린 작업 순
+        now = time.time()
+        with self._db().connection() as conn:
+            row = conn.execute(
+                "UPDATE jobs SET status='running', owner=?, heartbeat_at=?, started_at=?, attempts=attempts+1 "
+                "WHERE id = (SELECT q.id FROM jobs q WHERE q.status='queued' ORDER BY "
+                "(SELECT COUNT(*) FROM jobs r WHERE r.status='running' AND r.company_code=q.company_code), "
+                "q.created_at LIMIT 1) "
+                "RETURNING id, kind, params, company_code, username, attempts",
+                (owner, now, now)
+            ).fetchone()
+            conn.commit()
+        if row is None:
+            return None
+        return {**dict(row), "params": json.loads(row['params'])}
+
+    def progress(self, job_id: str, rows_done: int, rows_total) -> bool:
+        # 진행률 기록 + 취소 요청 여부
+        with self._db().connection() as conn:
+            row = conn.execute(
+                "UPDATE jobs SET rows_done=?, rows_total=?, heartbeat_at=? WHERE id=? RETURNING cancel_requested",
+                (rows_done, rows_total, time.time(), job_id)
+            ).fetchone()
+            conn.commit()
+        return bool(row and row[0])
+
+    def finish(self, job_id: str, status: str, result=None, error=None, error_status=None, artifact=None):
+        with self._db().connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status=?, result=?, error=?, error_status=?, artifact=?, finished_at=?, owner=NULL "
+                "WHERE id=?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, error_status, artifact, time.time(), job_id)
+            )
+            conn.commit()
+
+    def release(self, job_id: str):
+        # 종료로 중단된 작업을 대기열로 (시도 횟수는 되돌림)
+        with self._db().connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status='queued', owner=NULL, attempts=attempts-1, rows_done=0 WHERE id=?",
+                (job_id,)
+            )
+            conn.commit()
+
+    def heartbeat(self, owner: str):
+        with self._db().connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at=? WHERE status='running' AND owner=?",
+                (time.time(), owner)
+            )
+            conn.commit()
+
+    def requeue_stale(self) -> int:
+        # 소식이 끊긴 실행 중 작업: 시도 횟수가 남았으면 다시 대기열로, 아니면 실패 처리
+        now = time.time()
+        with self._db().connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status='failed', error='작업 프로세스가 응답하지 않습니다.', finished_at=?, owner=NULL "
+                "WHERE status='running' AND heartbeat_at < ? AND attempts >= ?",
+                (now, now - JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS)
+            )
+            cur = conn.execute(
+                "UPDATE jobs SET status='queued', owner=NULL, rows_done=0 "
+                "WHERE status='running' AND heartbeat_at < ?",
+                (now - JOB_LEASE_SECONDS,)
+            )
+            conn.commit()
+        return cur.rowcount
+
+    def cancel(self, job_id: str) -> str:
+        # 대기 중이면 바로 취소, 실행 중이면 요청만 남기고 작업 스레드가 다음 진행률 기록 때 멈춘다
+        with self._db().connection() as conn:
+            row = conn.execute(
+                "UPDATE jobs SET status='cancelled', finished_at=? WHERE id=? AND status='queued' RETURNING status",
+                (time.time(), job_id)
+            ).fetchone()
+            if row is None:
+                row = conn.execute(
+                    "UPDATE jobs SET cancel_requested=1 WHERE id=? AND status='running' RETURNING status",
+                    (job_id,)
+                ).fetchone()
+            conn.commit()
+        return row[0] if row else None
+
+    def get(self, job_id: str):
+        with self._db().connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, company_code: str, username=None, limit: int = JOB_LIST_LIMIT) -> list:
+        with self._db().connection() as conn:
+            if username is None:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE company_code=? ORDER BY created_at DESC LIMIT ?",
+                    (company_code, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE company_code=? AND username=? ORDER BY created_at DESC LIMIT ?",
+                    (company_code, username, limit)
+                ).fetchall()
+        return [dict(r) for r in rows]
+
+    def sweep(self, keep: float = JOB_KEEP_SECONDS) -> int:
+        # 오래된 끝난 작업과 그 파일 정리
+        with self._db().connection() as conn:
+            rows = conn.execute(
+                "DELETE FROM jobs WHERE finished_at < ? RETURNING id, artifact",
+                (time.time() - keep,)
+            ).fetchall()
+            conn.commit()
+        for row in rows:
+            for path in (row['artifact'], upload_path(row['id'])):
+                remove_quietly(path)
+        return len(rows)
+
+    def stats(self, company_code: str) -> dict:
+        # 같은 회사 작업만 (다른 회사의 대기열 규모는 보여 주지 않음)
+        with self._db().connection() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE status IN ('queued', 'running') AND company_code=? "
+                "GROUP BY status",
+                (company_code,)
+            ).fetchall()
+        return {r[0]: r[1] for r in rows}
+
+    def close(self):
+        with self._lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.close_all()
+
+
+job_queue = JobQueue()
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+def upload_path(job_id: str) -> str:
+    return os.path.join(JOB_DIR, f"{job_id}.upload.xlsx")
+
+def remove_quietly(path):
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def job_view(job: dict) -> dict:
+    # API 응답: 진행률(%) / 경과 / 남은 시간 추정
+    now = time.time()
+    params = {k: v for k, v in json.loads(job['params']).items() if k not in ("path", "digest")}
+    started, finished = job['started_at'], job['finished_at']
+    done, total = job['rows_done'], job['rows_total']
+    elapsed = ((finished or now) - started) if started else None
+    eta = None
+    if job['status'] == 'running' and elapsed and done and total and total > done:
+        eta = round(elapsed / done * (total - done), 1)
+    return {
+        "id": job['id'],
+        "kind": job['kind'],
+        "params": params,
+        "username": job['username'],
+        "status": job['status'],
+        "cancel_requested": bool(job['cancel_requested']),
+        "rows_done": done,
+        "rows_total": total,
+        "percent": round(min(done / total, 1.0) * 100, 1) if total else None,
+        "elapsed_sec": round(elapsed, 3) if elapsed is not None else None,
+        "eta_sec": eta,
+        "attempts": job['attempts'],
+        "result": json.loads(job['result']) if job['result'] else None,
+        "error": job['error'],
+        "error_status": job['error_status'],
+        "has_artifact": bool(job['artifact']) and job['status'] == 'done',
+        "created_at": job['created_at'],
+        "started_at": started,
+        "finished_at": finished,
+    }
+
+# ==============================
+# 작업 종류
+# ==============================
+
+class JobContext:
+    def __init__(self, queue: JobQueue, job_id: str, interrupted: threading.Event):
+        self.queue = queue
+        self.job_id = job_id
+        self.interrupted = interrupted
+        self._next = 0.0
+
+    def progress(self, rows_done: int, rows_total=None, force: bool = False):
+        if self.interrupted.is_set():
+            raise JobInterrupted()
+        now = time.monotonic()
+        if not force and now < self._next:
+            return
+        self._next = now + JOB_PROGRESS_SECONDS
+        if self.queue.progress(self.job_id, rows_done, rows_total):
+            raise JobCancelled()
+
+
+def run_upload_job(job: dict, ctx: JobContext):
+    p = job['params']
+    cls = UPLOADS[p['kind']]
+    tenant = tenants.get(job['company_code'])
+    started = time.perf_counter()
+    with tenant.job_pool.connection() as conn:
+        replay = find_replay(conn, cls.kind, p['type'], p['mode'], p['digest'])
+        if replay:
+            return replay, None
+        upload = cls(conn, p['type'], p['mode'])
+        meta = {}
+        spool = ChunkSpool()
+        try:
+            # 파싱(진행률은 파싱한 행 수) -> 쓰기 잠금을 잡고 반영 (이때는 취소만 확인)
+            with open(p['path'], "rb") as f:
+                chunks = iter_excel_chunks(f, upload.required, meta=meta)
+                parsed = spool_chunks(chunks, spool, lambda n: ctx.progress(n, meta.get("total_rows")))
+            rows = apply_spool(upload, spool, lambda n: ctx.progress(parsed, meta.get("total_rows")))
+            ctx.progress(rows, meta.get("total_rows"), force=True)  # 커밋 직전 마지막 취소 확인
+            result = upload.finish(rows, started, p['digest'], p['size'], job['username'])
+        finally:
+            spool.close()
+    tenant.versions.bump(*upload.tables)
+    metrics.transferred("upload", upload.label, rows, time.perf_counter() - started)
+    return result, None
+
+def run_export_job(job: dict, ctx: JobContext):
+    p = job['params']
+    table = "workers" if p['target'] == "workers" else "work_logs"
+    fmt = p['format']
+    sql, params = build_query(table, p['type'], p.get('center'), p.get('date_from'), p.get('date_to'))
+    tenant = tenants.get(job['company_code'])
+    started = time.perf_counter()
+    with tenant.job_pool.connection() as conn:
+        total = count_rows(conn, sql, params)
+    ctx.progress(0, total, force=True)
+
+    counter = {"rows": 0}
+    def on_rows(n):
+        counter["rows"] += n
+        ctx.progress(counter["rows"], total)
+
+    path = os.path.join(JOB_DIR, f"{job['id']}.{fmt}")
+    tmp = path + ".part"
+    gen = export_stream(table, fmt, sql, params, tenant.job_pool, on_rows=on_rows)
+    try:
+        with open(tmp, "wb") as out:
+            for data in gen:
+                out.write(data)
+        os.replace(tmp, path)
+    finally:
+        gen.close()
+        remove_quietly(tmp)
+    size = os.path.getsize(path)
+    metrics.transferred("export", f"{table}.{fmt}", size, time.perf_counter() - started)
+    return {
+        "rows": counter["rows"],
+        "bytes": size,
+        "elapsed_sec": round(time.perf_counter() - started, 3),
+        "filename": f"{p['target']}_{p['type']}.{fmt}",
+        "media_type": MEDIA_TYPES[fmt],
+    }, path
+
+
+HANDLERS = {"upload": run_upload_job, "export": run_export_job}
+
+# ==============================
+# 실행기
+# ==============================
+
+class JobRunner:
+    def __init__(self, queue: JobQueue = job_queue, workers: int = JOB_WORKERS):
+        self.queue = queue
+        self.workers = workers
+        self.owner = uuid.uuid4().hex  # 이 프로세스
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self.running = {}  # job id -> company_code (이 프로세스에서 실행 중)
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"wg-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        keeper = threading.Thread(target=self._keep, name="wg-job-keeper", daemon=True)
+        keeper.start()
+        self._threads.append(keeper)
+
+    def stop(self, timeout: float = 10.0):
+        # 실행 중인 작업은 다음 진행률 확인에서 롤백하고 queued 로 돌아간다
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        # 이 프로세스에서 작업을 넣었을 때 바로 깨움 (다른 프로세스 것은 JOB_POLL_SECONDS 안에)
+        self._wake.set()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(self.owner)
+            except Exception:
+                traceback.print_exc()
+                job = None
+            if job is None:
+                self._wake.wait(JOB_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self.run(job)
+
+    def run(self, job: dict):
+        job_id = job['id']
+        self.running[job_id] = job['company_code']
+        ctx = JobContext(self.queue, job_id, self._stop)
+        try:
+            result, artifact = HANDLERS[job['kind']](job, ctx)
+        except JobInterrupted:
+            self.queue.release(job_id)
+        except JobCancelled:
+            self.queue.finish(job_id, "cancelled")
+        except HTTPException as e:
+            # 요청 경로와 같은 검증 오류 (필수 컬럼, 중복 날짜 409 등)
+            self.failed += 1
+            self.queue.finish(job_id, "failed", error=str(e.detail), error_status=e.status_code)
+        except Exception as e:
+            traceback.print_exc()
+            self.failed += 1
+            self.queue.finish(job_id, "failed", error=f"작업 중 오류: {e}", error_status=500)
+        else:
+            self.completed += 1
+            self.queue.finish(job_id, "done", result=result, artifact=artifact)
+        finally:
+            self.running.pop(job_id, None)
+            if job['kind'] == "upload" and not self._stop.is_set():
+                remove_quietly(job['params'].get('path'))
+
+    def _keep(self):
+        next_sweep = 0.0
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self.queue.heartbeat(self.owner)
+                self.queue.requeue_stale()
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + JOB_SWEEP_SECONDS
+                    self.queue.sweep()
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self, company_code: str) -> dict:
+        # 실행 중 / 대기열은 company_code 의 작업만, 처리 건수는 이 프로세스 전체
+        return {
+            "workers": self.workers,
+            "running": sum(1 for code in list(self.running.values()) if code == company_code),
+            "completed": self.completed,
+            "failed": self.failed,
+            **{f"queue_{k}": v for k, v in self.queue.stats(company_code).items()},
+        }
+
+
+job_runner = JobRunner()
@@ -1,40 +1,88 @@
+import hmac
 import os
 import sqlite3
-import io
+import json
+import time
 import bcrypt
 import pandas as pd
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 
 from fastapi import (
     FastAPI, UploadFile, File, Form, HTTPException,
-    Depends, Request
+    Depends, Query, Request, Response
 )
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import List, Optional
 
 from jose import JWTError, jwt  # JWT 토큰 발급/검증
 
+from db import DB_PATH, get_db, pool_db
+from ratelimit import login_limiter
+from tokens import revocations, token_cache, token_digest
+from cache import cache_stats, cached, etag_matches, make_etag, record_write, refresh_versions
+from migrations import migrate_path
+from executor import ExecutorBusy, db_executor, excel_executor, hash_executor, executor_stats, shutdown_executors
+from rollups import ROLLUP_COLUMNS, apply_log_delta
+from reprice import reprice
+from edits import EDIT_BATCH_MAX, edit_log_rows
+from assign import DAILY_RATIOS, FATIGUE_DAYS, default_seed, plan
+from fatigue import MAX_WINDOW, RISK_INTENSITY, RISK_STREAK, evaluate, latest_date, load_days, lookup_workers, parse_windows
+from paging import LIST_PAGE_MAX, cursor_values, keyset_clause, next_after_id, order_by, parse_fields, parse_sort
+from profiling import PROFILING, ProfilingMiddleware, profile_store, to_collapsed
+from metrics import METRICS_ENABLED, METRICS_TOKEN, MetricsMiddleware, metrics
+from export import MEDIA_TYPES, build_query, check_format, export_stream, stream_export
+from ingest import (
+    LOG_COLUMNS, ChunkSpool, check_upload_mode, file_digest, find_replay, identity_key, iter_excel_chunks,
+    spool_excel_chunks
+)
+from uploads import UPLOADS, apply_spool, check_upload_access
+from jobs import job_queue, job_runner, job_view, new_job_id, remove_quietly, upload_path
+from tenants import Tenant, tenants
+
 # ==============================
 # 설정 / 상수
 # ==============================
 
-DB_PATH = os.getenv("DB_PATH", "worker_data_v22.db")
-
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me")  # 실제 서비스에선 환경변수 필수
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # 1시간
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # 바꾸면 다음 로그인 때 해시를 새 비용으로 교체
 
 PAYROLL_DELAY_DAYS = 3   # 일용직 급여 지급 지연 일수 (D-3)
-MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # 5MB
+SMS_PAGE_DEFAULT = 20    # /sms 한 번에 돌려주는 배정 수 (기존 응답 크기)
+SMS_PAGE_MAX = 5000
+
+# /workers/list, /workforce/detail 필드 선택과 정렬 (정렬은 인덱스가 있는 컬럼만)
+WORKER_LIST_FIELDS = ('id', 'name', 'phone', 'center', 'shift', 'cert', 'worker_type', 'valid_date', 'worker_id')
+WORKER_LIST_SORTS = {'id', 'name', 'center', 'valid_date'}
+DETAIL_FIELDS = ('id',) + LOG_COLUMNS
+DETAIL_SORTS = {'id', 'work_date', 'time_slot'}
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(512 * 1024 * 1024)))  # 512MB (청크 단위 처리)
+
+# 서버 시작 시 미적용 마이그레이션 실행 (0이면 배포 단계에서 `python migrations.py` 로만 실행)
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") == "1"
 
 ORIGINS = [
     "http://localhost:3000",
 ]
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AUTO_MIGRATE:
+        migrate_path(DB_PATH)
+        tenants.migrate_all()  # TENANT_MODE=routed 일 때 회사 DB 들
+    job_runner.start()
+    yield
+    job_runner.stop()  # 실행 중인 작업은 롤백 후 대기열로 (다음 시작 때 이어서)
+    shutdown_executors()
+    tenants.close_all()  # 종료 시 풀에 남은 커넥션 정리 (shared 모드는 공용 풀)
+    job_queue.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -42,33 +90,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count", "X-Next-After-Id", "X-Assign-Seed", "X-Assign-Shortfall"],
 )
 
-security = HTTPBearer()  # Authorization: Bearer <token>
+# 라우트별 지연시간/처리 중 요청 수 (가장 바깥에서 측정)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
-# 로그인 시도 제한 (인메모리)
-login_attempts: Dict[str, Dict[str, Any]] = {}
-MAX_LOGIN_ATTEMPTS = 5
-BLOCK_DURATION_SECONDS = 300  # 5분
+security = HTTPBearer()  # Authorization: Bearer <token>
 
 # ==============================
 # 공통 유틸 / DB
 # ==============================
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    return conn
-
 def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
+def needs_rehash(hashed_password: str) -> bool:
+    # "$2b$12$..." 의 비용 인자가 현재 설정과 다르면 교체 대상
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    # iat: 계정 단위 토큰 폐기(revoke_user) 시 발급 시각 비교용 (초 단위 소수까지)
+    to_encode.update({"exp": expire, "iat": time.time()})
     token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
@@ -79,87 +131,16 @@ def calc_pay(slot: str, hours: float, wage: int):
     )
     return (hours if is_night else 0), int(hours * wage * (1.5 if is_night else 1.0))
 
-# ==============================
-# DB 초기화
-# ==============================
+def prefix_range(prefix: str):
+    # work_date LIKE 'YYYY-MM%' 대신 인덱스를 탈 수 있는 범위 조건으로 사용
+    return prefix, prefix + "\uffff"
 
-def init_db():
-    conn = get_db()
-    try:
-        c = conn.cursor()
-
-        # 계정 테이블
-        c.execute('''CREATE TABLE IF NOT EXISTS accounts (
-            company_code TEXT,
-            username TEXT,
-            secret_key TEXT,
-            role INTEGER,
-            company_name TEXT,
-            PRIMARY KEY (company_code, username)
-        )''')
-
-        # 직원 명단
-        c.execute('''CREATE TABLE IF NOT EXISTS workers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            phone TEXT,
-            center TEXT,
-            shift TEXT,
-            cert TEXT,
-            worker_type TEXT,
-            valid_date TEXT
-        )''')
-
-        # 직무 설정
-        c.execute('''CREATE TABLE IF NOT EXISTS job_settings (
-            job_name TEXT PRIMARY KEY,
-            intensity REAL,
-            hourly_wage INTEGER,
-            ratio INTEGER,
-            required_cert TEXT
-        )''')
-
-        # 근무 기록
-        c.execute('''CREATE TABLE IF NOT EXISTS work_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            location TEXT,
-            job_name TEXT,
-            time_slot TEXT,
-            work_hours REAL,
-            night_hours REAL,
-            total_pay INTEGER,
-            intensity REAL,
-            score REAL,
-            work_date TEXT,
-            worker_type TEXT
-        )''')
-
-        # 초기 계정
-        c.execute("SELECT count(*) FROM accounts")
-        if c.fetchone()[0] == 0:
-            pw_hash = get_password_hash("1234")  # 데모용 비밀번호
-            c.execute("INSERT INTO accounts VALUES ('WMS01', 'admin', ?, 1, '대한통운 서울센터')", (pw_hash,))
-            c.execute("INSERT INTO accounts VALUES ('WMS01', 'staff', ?, 2, '대한통운 서울센터')", (pw_hash,))
-
-        # 초기 직무
-        c.execute("SELECT count(*) FROM job_settings")
-        if c.fetchone()[0] == 0:
-            jobs = [
-                ('상하차',   1.9, 15000, 20, None),
-                ('포장',     1.0, 12000, 20, None),
-                ('재고관리', 0.8, 13000, 20, None),
-                ('특수용접', 1.7, 25000, 10, '용접기능사'),
-                ('전기설비', 1.5, 22000, 10, '전기기사'),
-                ('지게차',   1.4, 18000, 20, '지게차면허')
-            ]
-            c.executemany("INSERT INTO job_settings VALUES (?,?,?,?,?)", jobs)
-
-        conn.commit()
-    finally:
-        conn.close()
-
-init_db()
+def delayed_date(date_filter: str) -> str:
+    # 일용직 급여 지급일 -> 근무일 (D-3)
+    return (
+        datetime.strptime(date_filter, "%Y-%m-%d") -
+        timedelta(days=PAYROLL_DELAY_DAYS)
+    ).strftime("%Y-%m-%d")
 
 # ==============================
 # Pydantic 모델
@@ -175,6 +156,9 @@ class EditLog(BaseModel):
     job_name: str
     work_hours: float
 
+class EditLogs(BaseModel):
+    items: List[EditLog]
+
 class EditWorker(BaseModel):
     id: int
     name: str
@@ -200,6 +184,21 @@ class JobAdd(BaseModel):
 class JobDelete(BaseModel):
     job_name: str
 
+class JobUpdate(BaseModel):
+    job_name: str
+    ratio: Optional[int] = None
+    intensity: Optional[float] = None
+    hourly_wage: Optional[int] = None
+    # 강도/시급을 바꿀 때 다시 계산할 근무 기록 기간 (없으면 전체)
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+
+class RepriceReq(BaseModel):
+    job_name: str
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    worker_type: Optional[str] = None
+
 # ==============================
 # 인증/인가 의존성
 # ==============================
@@ -208,6 +207,11 @@ async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> TokenData:
     token = credentials.credentials
+    # 이미 검증한 토큰이면 서명 검증/모델 생성 생략 (exp 지난 항목은 캐시에서 버려짐)
+    digest = token_digest(token)
+    user = token_cache.get(digest)
+    if user is not None:
+        return user
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -216,7 +220,7 @@ async def get_current_user(
         company_name: str = payload.get("company")
         if username is None or company_code is None:
             raise HTTPException(status_code=401, detail="토큰이 유효하지 않습니다.")
-        return TokenData(
+        user = TokenData(
             username=username,
             company_code=company_code,
             role=role,
@@ -225,50 +229,87 @@ async def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="토큰 검증 실패")
 
+    exp = payload.get("exp") or time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    subject = (company_code, username)
+    # 다른 워커 프로세스에서 폐기한 토큰 (공용 DB 거부 목록, 캐시에 없을 때만 확인)
+    if await db_executor.run(revocations.is_revoked, digest, subject, payload.get("iat")):
+        raise HTTPException(status_code=401, detail="로그아웃되었거나 폐기된 토큰입니다.")
+    if not token_cache.admit(digest, exp, subject, payload.get("iat"), user):
+        raise HTTPException(status_code=401, detail="로그아웃되었거나 폐기된 토큰입니다.")
+    return user
+
+async def get_tenant(user: TokenData = Depends(get_current_user)) -> Tenant:
+    # 토큰의 회사 코드 -> 회사 DB (TENANT_MODE=shared 면 공용 DB)
+    return tenants.get(user.company_code)
+
+def get_tenant_db(tenant: Tenant = Depends(get_tenant)):
+    yield from pool_db(tenant.pool)
+
 def admin_required(user: TokenData = Depends(get_current_user)) -> TokenData:
     if user.role != 1:
         raise HTTPException(status_code=403, detail="관리자 권한이 필요합니다.")
     return user
 
+async def is_admin_token(authorization: str) -> bool:
+    # X-Profile 헤더 허용 여부: get_current_user 와 같은 검증 (토큰 캐시/폐기 포함)
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user = await get_current_user(HTTPAuthorizationCredentials(scheme=scheme, credentials=token))
+    except HTTPException:
+        return False
+    return user.role == 1
+
+# 느린 요청 프로파일링 (PROFILING=1 일 때만 붙음, 지표 미들웨어보다 바깥)
+if PROFILING:
+    app.add_middleware(ProfilingMiddleware, is_admin=is_admin_token)
+
+def conditional_get(*tables):
+    """
+    결과가 tables 의 데이터 버전과 쿼리 파라미터로만 정해지는 GET 에 ETag 를 붙인다.
+    If-None-Match 가 현재 태그와 같으면 (인증 후, DB 커넥션을 잡기 전에) 304 로 끝낸다.
+    """
+    async def check(request: Request, response: Response, tenant: Tenant = Depends(get_tenant)):
+        await refresh_versions(tenant.versions)
+        tag = make_etag(tenant, request.url.path, sorted(request.query_params.multi_items()), tables)
+        if tag is None:
+            return
+        if etag_matches(request.headers.get("if-none-match"), tag):
+            raise HTTPException(status_code=304, headers={"ETag": tag, "Cache-Control": "no-cache"})
+        response.headers["ETag"] = tag
+        response.headers["Cache-Control"] = "no-cache"
+    return check
+
 # ==============================
 # 로그인 시도 제한
 # ==============================
 
-def check_login_rate_limit(request: Request):
-    ip = request.client.host if request.client else "unknown"
-    now = datetime.utcnow()
+# 저장소(memory/sqlite)에 따라 DB 를 읽을 수 있으므로 DB 작업 풀에서 실행
 
-    info = login_attempts.get(ip)
-    if info:
-        blocked_until = info.get("blocked_until")
-        if blocked_until and blocked_until > now:
-            raise HTTPException(
-                status_code=429,
-                detail="로그인 시도가 너무 많습니다. 잠시 후 다시 시도해주세요."
-            )
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
 
-def register_login_fail(request: Request):
-    ip = request.client.host if request.client else "unknown"
-    now = datetime.utcnow()
-    info = login_attempts.get(ip, {"count": 0, "blocked_until": None})
-    info["count"] += 1
-    if info["count"] >= MAX_LOGIN_ATTEMPTS:
-        info["blocked_until"] = now + timedelta(seconds=BLOCK_DURATION_SECONDS)
-        info["count"] = 0
-    login_attempts[ip] = info
+async def check_login_rate_limit(request: Request):
+    await db_executor.run(login_limiter.check, client_ip(request))
 
-def reset_login_fail(request: Request):
-    ip = request.client.host if request.client else "unknown"
-    if ip in login_attempts:
-        del login_attempts[ip]
+async def register_login_fail(request: Request):
+    await db_executor.run(login_limiter.hit, client_ip(request))
+
+async def reset_login_fail(request: Request):
+    await db_executor.run(login_limiter.reset, client_ip(request))
 
 # ==============================
 # 파일 업로드 검증
 # ==============================
 
-def validate_excel_file(file: UploadFile, content: bytes, required_columns):
-    if len(content) > MAX_UPLOAD_SIZE:
-        raise HTTPException(status_code=413, detail="파일이 너무 큽니다. 최대 5MB까지 허용됩니다.")
+def validate_excel_file(file: UploadFile):
+    # 본문은 Starlette가 이미 SpooledTemporaryFile(1MB 초과분은 디스크)로 받아둔 상태
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"파일이 너무 큽니다. 최대 {MAX_UPLOAD_SIZE // (1024 * 1024)}MB까지 허용됩니다."
+        )
 
     if file.content_type not in (
         "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
@@ -277,180 +318,157 @@ def validate_excel_file(file: UploadFile, content: bytes, required_columns):
     ):
         raise HTTPException(status_code=400, detail="엑셀 파일만 업로드 가능합니다.")
 
-    df = pd.read_excel(io.BytesIO(content))
-    missing = [col for col in required_columns if col not in df.columns]
-    if missing:
-        raise HTTPException(
-            status_code=400,
-            detail=f"필수 컬럼이 없습니다: {', '.join(missing)}"
-        )
-    return df
-
 # ==============================
 # API: 인증
 # ==============================
 
 @app.post("/auth/login")
-async def login(req: LoginReq, request: Request):
-    check_login_rate_limit(request)
+async def login(
+    req: LoginReq,
+    request: Request,
+    conn: sqlite3.Connection = Depends(get_db)
+):
+    await check_login_rate_limit(request)
 
-    conn = get_db()
-    try:
+    def work():
         c = conn.cursor()
         c.execute(
             "SELECT secret_key, role, company_name FROM accounts WHERE company_code=? AND username=?",
             (req.code, req.username)
         )
-        row = c.fetchone()
-        if not row:
-            register_login_fail(request)
-            return {"success": False, "msg": "로그인 정보가 올바르지 않습니다."}
+        return c.fetchone()
 
-        stored_hash, role, company_name = row
-        try:
-            if verify_password(req.key, stored_hash):
-                reset_login_fail(request)
-                access_token = create_access_token(
-                    data={
-                        "sub": req.username,
-                        "code": req.code,
-                        "role": role,
-                        "company": company_name
-                    }
-                )
-                return {
-                    "success": True,
-                    "access_token": access_token,
-                    "token_type": "bearer",
-                    "role": role,
-                    "company": company_name,
-                    "username": req.username
-                }
-        except Exception:
-            pass
-
-        register_login_fail(request)
+    row = await db_executor.run(work)
+    if not row:
+        await register_login_fail(request)
         return {"success": False, "msg": "로그인 정보가 올바르지 않습니다."}
-    finally:
-        conn.close()
+
+    stored_hash, role, company_name = row
+    try:
+        ok = await hash_executor.run(verify_password, req.key, stored_hash)
+    except ExecutorBusy as e:
+        # 혼잡해서 검증하지 못한 것은 로그인 실패로 세지 않는다
+        if e.reason == "saturated":
+            raise HTTPException(
+                status_code=429,
+                detail="로그인 요청이 많습니다. 잠시 후 다시 시도해주세요.",
+                headers={"Retry-After": "1"}
+            )
+        raise HTTPException(status_code=503, detail="서버가 혼잡합니다. 잠시 후 다시 시도해주세요.")
+    except Exception:
+        ok = False  # 저장된 해시 형식 오류 등
+
+    if ok:
+        await reset_login_fail(request)
+        if needs_rehash(stored_hash):
+            await rehash_password(conn, req, stored_hash)
+        access_token = create_access_token(
+            data={
+                "sub": req.username,
+                "code": req.code,
+                "role": role,
+                "company": company_name
+            }
+        )
+        return {
+            "success": True,
+            "access_token": access_token,
+            "token_type": "bearer",
+            "role": role,
+            "company": company_name,
+            "username": req.username
+        }
+
+    await register_login_fail(request)
+    return {"success": False, "msg": "로그인 정보가 올바르지 않습니다."}
+
+async def rehash_password(conn: sqlite3.Connection, req: LoginReq, old_hash: str):
+    # 비밀번호 원문을 아는 로그인 성공 시점에만 가능. 혼잡하면 다음 로그인으로 미룸
+    try:
+        new_hash = await hash_executor.run(get_password_hash, req.key)
+    except ExecutorBusy:
+        return
+
+    def work():
+        # 그 사이 비밀번호가 바뀌었으면 덮어쓰지 않음
+        conn.execute(
+            "UPDATE accounts SET secret_key=? WHERE company_code=? AND username=? AND secret_key=?",
+            (new_hash, req.code, req.username, old_hash)
+        )
+        conn.commit()
+
+    await db_executor.run(work)
+
+@app.post("/auth/logout")
+async def logout(
+    all_sessions: bool = Query(False, alias="all"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user: TokenData = Depends(get_current_user)
+):
+    # 토큰 만료 시각까지 같은 토큰으로 들어오는 요청 거부
+    # all=true 면 이 계정이 지금까지 발급받은 토큰 전부 (다른 기기 포함)
+    if all_sessions:
+        subject, before = (user.company_code, user.username), time.time()
+        await db_executor.run(revocations.revoke_user, subject, before, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        token_cache.revoke_user(subject, before)
+    else:
+        digest = token_digest(credentials.credentials)
+        exp = jwt.get_unverified_claims(credentials.credentials).get("exp") or time.time()
+        await db_executor.run(revocations.revoke_token, digest, exp)
+        token_cache.revoke_token(digest, exp)
+    return {"success": True}
 
 # ==============================
 # API: 업로드
 # ==============================
 
+async def run_upload(kind: str, type: str, file: UploadFile, mode: str, user: TokenData,
+                     tenant: Tenant, conn: sqlite3.Connection):
+    started = time.perf_counter()
+    validate_excel_file(file)
+    check_upload_mode(mode)
+    check_upload_access(kind, type, user.role)
+
+    # 같은 파일 재시도면 파싱 없이 이전 결과
+    digest, size = await excel_executor.run(file_digest, file.file)
+    upload = UPLOADS[kind](conn, type, mode)
+    replay = await db_executor.run(find_replay, conn, upload.kind, type, mode, digest)
+    if replay:
+        return replay
+
+    spool = ChunkSpool()
+    try:
+        await spool_excel_chunks(iter_excel_chunks(file.file, upload.required), spool)
+        # 파싱이 끝난 뒤에만 쓰기 잠금 (apply_spool 의 BEGIN IMMEDIATE ~ finish 의 COMMIT)
+        rows = await db_executor.run(apply_spool, upload, spool)
+        result = await db_executor.run(upload.finish, rows, started, digest, size, user.username)
+    finally:
+        spool.close()
+    tenant.versions.bump(*upload.tables)
+    metrics.transferred("upload", upload.label, rows, time.perf_counter() - started)
+    return result
+
 @app.post("/upload/workers")
 async def upload_workers(
     type: str = Form(...),
     file: UploadFile = File(...),
-    user: TokenData = Depends(get_current_user)
+    mode: str = Form("reject"),
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    content = await file.read()
-    required_cols = ['이름', '전화번호', '소속센터', '고정교대조', '자격증']
-    df = validate_excel_file(file, content, required_cols)
-
-    conn = get_db()
-    try:
-        c = conn.cursor()
-        if type == 'DAILY':
-            target_date = str(df.iloc[0].get('기준일')).split()[0]
-            if not target_date:
-                raise HTTPException(status_code=400, detail="기준일 컬럼이 필요합니다.")
-            c.execute(
-                "SELECT count(*) FROM workers WHERE worker_type='DAILY' AND valid_date=?",
-                (target_date,)
-            )
-            if c.fetchone()[0] > 0:
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"❌ {target_date} 일용직 명단이 이미 존재합니다."
-                )
-
-            for _, r in df.iterrows():
-                c.execute(
-                    "INSERT INTO workers (name, phone, center, shift, cert, worker_type, valid_date) "
-                    "VALUES (?,?,?,?,?,?,?)",
-                    (
-                        r['이름'],
-                        r['전화번호'],
-                        r['소속센터'],
-                        r['고정교대조'],
-                        r['자격증'],
-                        type,
-                        target_date
-                    )
-                )
-        else:
-            # 정규직 명단은 관리자만 덮어쓰기 허용
-            if user.role != 1:
-                raise HTTPException(status_code=403, detail="정규직 명단 업로드는 관리자만 가능합니다.")
-
-            c.execute("DELETE FROM workers WHERE worker_type='REGULAR'")
-            for _, r in df.iterrows():
-                c.execute(
-                    "INSERT INTO workers (name, phone, center, shift, cert, worker_type, valid_date) "
-                    "VALUES (?,?,?,?,?,?,?)",
-                    (
-                        r['이름'],
-                        r['전화번호'],
-                        r['소속센터'],
-                        r['고정교대조'],
-                        r['자격증'],
-                        type,
-                        ''
-                    )
-                )
-        conn.commit()
-    finally:
-        conn.close()
-    return {"msg": "명단 업로드 완료"}
+    return await run_upload("workers", type, file, mode, user, tenant, conn)
 
 @app.post("/upload/logs")
 async def upload_logs(
     type: str = Form(...),
     file: UploadFile = File(...),
-    user: TokenData = Depends(get_current_user)
+    mode: str = Form("reject"),
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    content = await file.read()
-    required_cols = ['날짜', '이름', '근무지', '직무', '시간대', '근무시간']
-    df = validate_excel_file(file, content, required_cols)
-
-    conn = get_db()
-    try:
-        c = conn.cursor()
-        dates = df['날짜'].astype(str).apply(lambda x: x.split()[0]).unique()
-        for d in dates:
-            c.execute(
-                "SELECT count(*) FROM work_logs WHERE work_date=? AND worker_type=?",
-                (d, type)
-            )
-            if c.fetchone()[0] > 0:
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"❌ {d} 근무 기록이 이미 존재합니다. (수정 탭 이용)"
-                )
-
-        c.execute("SELECT job_name, intensity, hourly_wage FROM job_settings")
-        job_map = {r[0]: {'int': r[1], 'wage': r[2]} for r in c.fetchall()}
-
-        for _, r in df.iterrows():
-            j_info = job_map.get(r['직무'], {'int': 1.0, 'wage': 10000})
-            night_h, pay = calc_pay(r['시간대'], r['근무시간'], j_info['wage'])
-            work_date = str(r['날짜']).split()[0]
-            score = j_info['int'] * r['근무시간'] * 10
-            c.execute(
-                "INSERT INTO work_logs (name, location, job_name, time_slot, work_hours, night_hours, "
-                "total_pay, intensity, score, work_date, worker_type) "
-                "VALUES (?,?,?,?,?,?,?,?,?,?,?)",
-                (
-                    r['이름'], r['근무지'], r['직무'], r['시간대'],
-                    r['근무시간'], night_h, pay, j_info['int'],
-                    score, work_date, type
-                )
-            )
-        conn.commit()
-    finally:
-        conn.close()
-    return {"msg": "기록 업로드 완료"}
+    return await run_upload("logs", type, file, mode, user, tenant, conn)
 
 # ==============================
 # API: 다운로드
@@ -460,103 +478,210 @@ async def upload_logs(
 async def download(
     target: str,
     type: str,
-    user: TokenData = Depends(get_current_user)
+    format: str = "xlsx",
+    center: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    tenant: Tenant = Depends(get_tenant)
 ):
-    conn = get_db()
-    try:
-        table = "workers" if target == "workers" else "work_logs"
-        df = pd.read_sql_query(
-            f"SELECT * FROM {table} WHERE worker_type=?",
-            conn,
-            params=(type,)
-        )
-    finally:
-        conn.close()
-
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
+    # 커넥션은 스트림 제너레이터가 회사 DB 풀에서 직접 잡는다 (응답이 끝날 때까지 유지)
+    check_format(format)
+    table = "workers" if target == "workers" else "work_logs"
+    sql, params = build_query(table, type, center, date_from, date_to)
     return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        stream_export(export_stream(table, format, sql, params, tenant.pool), label=f"{table}.{format}"),
+        media_type=MEDIA_TYPES[format],
         headers={
-            "Content-Disposition": f"attachment; filename={target}_{type}.xlsx"
+            "Content-Disposition": f"attachment; filename={target}_{type}.{format}"
         }
     )
 
+# ==============================
+# API: 백그라운드 작업 (큰 업로드 / 내보내기)
+# ==============================
+
+async def load_job(job_id: str, user: TokenData) -> dict:
+    job = await db_executor.run(job_queue.get, job_id)
+    # 다른 회사 작업은 보이지 않고, 같은 회사의 다른 사람 작업은 관리자만 (존재 여부도 숨김)
+    if job is None or job['company_code'] != user.company_code or (
+        job['username'] != user.username and user.role != 1
+    ):
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job
+
+@app.post("/jobs/upload/{kind}", status_code=202, dependencies=[Depends(get_tenant)])
+async def submit_upload_job(
+    kind: str,
+    type: str = Form(...),
+    file: UploadFile = File(...),
+    mode: str = Form("reject"),
+    user: TokenData = Depends(get_current_user)
+):
+    if kind not in UPLOADS:
+        raise HTTPException(status_code=404, detail="업로드 종류는 workers, logs 중 하나입니다.")
+    validate_excel_file(file)
+    check_upload_mode(mode)
+    check_upload_access(kind, type, user.role)
+
+    # 요청이 끝나면 본문 임시 파일이 사라지므로 작업 디렉터리에 복사 (해시도 같이)
+    job_id = new_job_id()
+    path = upload_path(job_id)
+    digest, size = await excel_executor.run(file_digest, file.file, path)
+    try:
+        await db_executor.run(job_queue.submit, job_id, "upload", {
+            "kind": kind, "type": type, "mode": mode, "digest": digest, "size": size,
+            "path": path, "filename": file.filename,
+        }, user.company_code, user.username)
+    except Exception:
+        remove_quietly(path)
+        raise
+    job_runner.notify()
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/jobs/export", status_code=202, dependencies=[Depends(get_tenant)])
+async def submit_export_job(
+    target: str,
+    type: str,
+    format: str = "xlsx",
+    center: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    user: TokenData = Depends(get_current_user)
+):
+    # /download 와 같은 파라미터. 결과 파일은 /jobs/{id}/artifact 로 받는다
+    check_format(format)
+    job_id = new_job_id()
+    await db_executor.run(job_queue.submit, job_id, "export", {
+        "target": target, "type": type, "format": format,
+        "center": center, "date_from": date_from, "date_to": date_to,
+    }, user.company_code, user.username)
+    job_runner.notify()
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs")
+async def list_jobs(user: TokenData = Depends(get_current_user)):
+    # 최근 작업 (관리자는 같은 회사 전체)
+    jobs = await db_executor.run(job_queue.list, user.company_code, None if user.role == 1 else user.username)
+    return [job_view(j) for j in jobs]
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, user: TokenData = Depends(get_current_user)):
+    return job_view(await load_job(job_id, user))
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, user: TokenData = Depends(get_current_user)):
+    await load_job(job_id, user)
+    status = await db_executor.run(job_queue.cancel, job_id)
+    if status is None:
+        raise HTTPException(status_code=409, detail="이미 끝난 작업입니다.")
+    # queued 였으면 바로 cancelled, 실행 중이면 다음 진행률 확인 때 롤백 후 cancelled
+    return job_view(await load_job(job_id, user))
+
+@app.get("/jobs/{job_id}/artifact")
+async def get_job_artifact(job_id: str, user: TokenData = Depends(get_current_user)):
+    job = await load_job(job_id, user)
+    if job['status'] != 'done':
+        raise HTTPException(status_code=409, detail=f"작업이 아직 끝나지 않았습니다 ({job['status']}).")
+    if not job['artifact'] or not os.path.exists(job['artifact']):
+        raise HTTPException(status_code=404, detail="결과 파일이 없습니다.")
+    result = json.loads(job['result'])
+    return FileResponse(job['artifact'], media_type=result['media_type'], filename=result['filename'])
+
 # ==============================
 # API: 명단 조회/수정/삭제
 # ==============================
 
-@app.get("/workers/list")
+def wants_month_fatigue(type: str, cols) -> bool:
+    return type == 'REGULAR' and (cols is None or 'month_fatigue' in cols)
+
+def workers_list_query(type, date, keys, cols, cursor, last_month, limit):
+    # /workers/list SQL (query_plans 가 같은 함수로 정렬·커서 조합별 실행 계획을 검사)
+    where, params = ["w.worker_type=?"], [type]
+    if type == 'DAILY' and date:
+        where.append("w.valid_date=?")
+        params.append(date)
+    if cursor is not None:
+        clause, p = keyset_clause(keys, cursor, "w.")
+        where.append(clause)
+        params += p
+
+    select = "w.*" if cols is None else ", ".join(f"w.{col}" for col in cols if col != 'month_fatigue')
+    select_params = []
+    if wants_month_fatigue(type, cols):
+        if last_month:
+            # 페이지에 포함된 사람만 계산되도록 상관 서브쿼리로
+            select += """,
+                (SELECT AVG(l.intensity) FROM work_logs l
+                 WHERE l.worker_id = w.worker_id
+                   AND l.work_date >= ? AND l.work_date < ?
+                   AND l.worker_type = 'REGULAR') AS month_fatigue"""
+            select_params = list(prefix_range(last_month))
+        elif cols is not None:
+            select += ", NULL AS month_fatigue"
+
+    sql = (f"SELECT {select} FROM workers w /* dynamic: workers_list */ "
+           f"WHERE {' AND '.join(where)} ORDER BY {order_by(keys, 'w.')}")
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, select_params + params
+
+@app.get("/workers/list", dependencies=[Depends(conditional_get("workers", "work_logs"))])
 async def get_workers_list(
     type: str,
+    response: Response,
     date: Optional[str] = None,
-    user: TokenData = Depends(get_current_user)
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX),
+    fields: Optional[str] = None,
+    sort: Optional[str] = None,
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
     """
     REGULAR: 최근 월 기준으로 'month_fatigue'(평균 intensity) 함께 반환
     DAILY  : 기존 로직 그대로 (date=valid_date)
+    after_id/limit/sort/fields 로 페이지 단위 조회 (다음 페이지 커서는 X-Next-After-Id 헤더)
     """
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    try:
+    cols = parse_fields(fields, WORKER_LIST_FIELDS + ('month_fatigue',))
+    keys = parse_sort(sort, WORKER_LIST_SORTS, [("id", False)])
+
+    def work():
         c = conn.cursor()
-        if type == 'DAILY' and date:
-            c.execute(
-                "SELECT * FROM workers WHERE worker_type='DAILY' AND valid_date=?",
-                (date,)
-            )
-            return [dict(r) for r in c.fetchall()]
-        elif type == 'REGULAR':
+        cursor = cursor_values(conn, "workers", keys, after_id) if after_id is not None else None
+        last_month = None
+        if wants_month_fatigue(type, cols):
             # 최근 월 구하기
             c.execute("SELECT MAX(work_date) FROM work_logs WHERE worker_type='REGULAR'")
             row = c.fetchone()
-            last_date = row[0] if row else None
-            if not last_date:
-                c.execute("SELECT * FROM workers WHERE worker_type='REGULAR'")
-                return [dict(r) for r in c.fetchall()]
+            last_month = row[0][:7] if row and row[0] else None  # "YYYY-MM"
+        c.execute(*workers_list_query(type, date, keys, cols, cursor, last_month, limit))
+        return [dict(r) for r in c.fetchall()]
 
-            last_month = last_date[:7]  # "YYYY-MM"
-            query = """
-                SELECT
-                    w.*,
-                    AVG(
-                        CASE
-                            WHEN strftime('%Y-%m', l.work_date) = ?
-                            THEN l.intensity
-                            ELSE NULL
-                        END
-                    ) AS month_fatigue
-                FROM workers w
-                LEFT JOIN work_logs l
-                  ON w.name = l.name
-                 AND l.worker_type = 'REGULAR'
-                WHERE w.worker_type = 'REGULAR'
-                GROUP BY w.id
-            """
-            c.execute(query, (last_month,))
-            return [dict(r) for r in c.fetchall()]
-        else:
-            c.execute("SELECT * FROM workers WHERE worker_type=?", (type,))
-            return [dict(r) for r in c.fetchall()]
-    finally:
-        conn.close()
+    rows = await cached(
+        tenant, "workers/list", (type, date, after_id, limit, fields, sort),
+        ("workers", "work_logs"), lambda: db_executor.run(work)
+    )
+    cursor = next_after_id(rows, limit)
+    if cursor is not None:
+        response.headers["X-Next-After-Id"] = str(cursor)
+    return rows
 
 @app.post("/edit/worker")
 async def edit_worker(
     data: EditWorker,
-    user: TokenData = Depends(get_current_user)
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    try:
+    def work():
         c = conn.cursor()
-        c.execute("SELECT worker_type FROM workers WHERE id=?", (data.id,))
+        c.execute("SELECT worker_type, worker_id FROM workers WHERE id=?", (data.id,))
         row = c.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="대상 근로자를 찾을 수 없습니다.")
-        worker_type = row[0]
+        worker_type, worker_id = row
         if worker_type == 'REGULAR' and user.role != 1:
             raise HTTPException(status_code=403, detail="정규직 명단 수정은 관리자만 가능합니다.")
 
@@ -564,32 +689,45 @@ async def edit_worker(
             "UPDATE workers SET name=?, phone=?, center=? WHERE id=?",
             (data.name, data.phone, data.center, data.id)
         )
+        # 같은 사람의 이름/전화번호 정정: 다음 업로드에서도 같은 worker_id 로 연결되도록
+        # (이미 같은 이름+전화번호의 다른 사람이 있으면 기존 키 유지)
+        key = identity_key(data.name, data.phone)
+        if worker_id is not None and key is not None:
+            c.execute(
+                "UPDATE OR IGNORE worker_identities SET name=?, phone=? WHERE id=?",
+                (*key, worker_id)
+            )
+        record_write(conn, "workers")
         conn.commit()
-    finally:
-        conn.close()
-    return {"msg": "명단 수정 완료"}
+        tenant.versions.bump("workers")
+        return {"msg": "명단 수정 완료"}
+
+    return await db_executor.run(work)
 
 @app.post("/delete/worker")
 async def delete_worker(
     data: DeleteWorker,
-    user: TokenData = Depends(get_current_user)
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    try:
+    def work():
         c = conn.cursor()
-        c.execute("SELECT worker_type FROM workers WHERE id=?", (data.id,))
+        c.execute("SELECT worker_type, worker_id FROM workers WHERE id=?", (data.id,))
         row = c.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="대상 근로자를 찾을 수 없습니다.")
-        worker_type = row[0]
+        worker_type, worker_id = row
         if worker_type == 'REGULAR' and user.role != 1:
             raise HTTPException(status_code=403, detail="정규직 명단 삭제는 관리자만 가능합니다.")
 
         c.execute("DELETE FROM workers WHERE id=?", (data.id,))
+        record_write(conn, "workers")
         conn.commit()
-    finally:
-        conn.close()
-    return {"msg": "삭제 완료"}
+        tenant.versions.bump("workers")
+        return {"msg": "삭제 완료"}
+
+    return await db_executor.run(work)
 
 # ==============================
 # API: 기록 수정
@@ -598,10 +736,11 @@ async def delete_worker(
 @app.post("/edit/log")
 async def edit_log(
     data: EditLog,
-    user: TokenData = Depends(get_current_user)
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    try:
+    def work():
         c = conn.cursor()
         c.execute(
             "SELECT intensity, hourly_wage FROM job_settings WHERE job_name=?",
@@ -611,7 +750,12 @@ async def edit_log(
         if not j:
             raise HTTPException(status_code=400, detail="직무 설정이 존재하지 않습니다.")
 
-        c.execute("SELECT time_slot FROM work_logs WHERE id=?", (data.id,))
+        c.execute(
+            "SELECT time_slot, worker_type, location, name, work_date, work_hours, night_hours, "
+            "total_pay, intensity, score, worker_id "
+            "FROM work_logs WHERE id=?",
+            (data.id,)
+        )
         row = c.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="근무 기록을 찾을 수 없습니다.")
@@ -625,27 +769,77 @@ async def edit_log(
             "WHERE id=?",
             (data.job_name, data.work_hours, night_h, pay, j[0], score, data.id)
         )
+
+        # 집계 테이블: 이전 값 빼고 새 값 더하기
+        old = {col: row[col] for col in ROLLUP_COLUMNS}
+        new = {
+            **old, "work_hours": data.work_hours, "night_hours": night_h,
+            "total_pay": pay, "intensity": j[0], "score": score
+        }
+        apply_log_delta(conn, pd.DataFrame([old, new]), weight=[-1, 1])
+        record_write(conn, "work_logs")
         conn.commit()
-    finally:
-        conn.close()
-    return {"msg": "수정 완료"}
+        tenant.versions.bump("work_logs")
+        return {"msg": "수정 완료"}
+
+    return await db_executor.run(work)
+
+@app.post("/edit/logs")
+async def edit_logs(
+    data: EditLogs,
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
+):
+    # 여러 건을 한 트랜잭션으로 수정 (잘못된 항목은 건너뛰고 failed 로 돌려줌)
+    if len(data.items) > EDIT_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"한 번에 최대 {EDIT_BATCH_MAX}건까지 수정할 수 있습니다."
+        )
+
+    def work():
+        result = edit_log_rows(conn, [(i.id, i.job_name, i.work_hours) for i in data.items])
+        if result["rows"]:
+            record_write(conn, "work_logs")
+            conn.commit()
+            tenant.versions.bump("work_logs")
+        return {"msg": "수정 완료", **result}
+
+    return await db_executor.run(work)
 
 # ==============================
 # API: 급여 관리
 # ==============================
 
-@app.get("/payroll")
+@app.get("/payroll", dependencies=[Depends(conditional_get("work_logs"))])
 async def get_payroll(
     center: str,
     date_filter: str,
     type: str,
-    user: TokenData = Depends(get_current_user)
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    try:
+    def work():
         c = conn.cursor()
         if type == 'REGULAR':
+            if len(date_filter) <= 7:
+                # 월(YYYY-MM) 이하 단위 조회는 집계 테이블에서
+                c.execute(
+                    """
+                    SELECT name,
+                           SUM(days) as days,
+                           SUM(hours_sum) as hours,
+                           SUM(pay_sum) as payment_amount
+                    FROM rollup_worker_month
+                    WHERE worker_type='REGULAR' AND location=? AND month >= ? AND month < ?
+                    GROUP BY name
+                    """,
+                    (center, *prefix_range(date_filter))
+                )
+                return [dict(r) for r in c.fetchall()]
+
             c.execute(
                 """
                 SELECT name,
@@ -653,128 +847,172 @@ async def get_payroll(
                        SUM(work_hours) as hours,
                        SUM(total_pay) as payment_amount
                 FROM work_logs
-                WHERE location=? AND work_date LIKE ? AND worker_type='REGULAR'
+                WHERE location=? AND work_date >= ? AND work_date < ? AND worker_type='REGULAR'
                 GROUP BY name
                 """,
-                (center, f"{date_filter}%")
+                (center, *prefix_range(date_filter))
             )
             return [dict(r) for r in c.fetchall()]
         else:
-            target_date = (
-                datetime.strptime(date_filter, "%Y-%m-%d") -
-                timedelta(days=PAYROLL_DELAY_DAYS)
-            ).strftime("%Y-%m-%d")
+            target_date = delayed_date(date_filter)
             c.execute(
                 """
                 SELECT id, name, job_name, time_slot, work_hours as hours,
                        total_pay as payment_amount, work_date
                 FROM work_logs
                 WHERE location=? AND work_date=? AND worker_type='DAILY'
+                ORDER BY id
                 """,
                 (center, target_date)
             )
             return {"target_date": target_date, "list": [dict(r) for r in c.fetchall()]}
-    finally:
-        conn.close()
+
+    return await cached(
+        tenant, "payroll", (center, date_filter, type), ("work_logs",), lambda: db_executor.run(work)
+    )
+
+def detail_query(type, date_filter, name, worker_id, keys, cols, cursor, limit):
+    # /workforce/detail SQL (query_plans 가 같은 함수로 정렬·커서 조합별 실행 계획을 검사)
+    if worker_id is not None:
+        where, params = ["worker_id=?"], [worker_id]
+    else:
+        where, params = ["name=?"], [name]
+    if type == 'REGULAR':
+        where.append("work_date >= ? AND work_date < ?")
+        params += prefix_range(date_filter)
+    else:
+        where.append("work_date=?")
+        params.append(delayed_date(date_filter))
+    if cursor is not None:
+        clause, p = keyset_clause(keys, cursor)
+        where.append(clause)
+        params += p
+
+    select = "*" if cols is None else ", ".join(cols)
+    sql = (f"SELECT {select} FROM work_logs /* dynamic: workforce_detail */ "
+           f"WHERE {' AND '.join(where)} ORDER BY {order_by(keys)}")
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
 
 @app.get("/workforce/detail")
 async def get_detail(
-    name: str,
     date_filter: str,
     type: str,
-    user: TokenData = Depends(get_current_user)
+    response: Response,
+    name: Optional[str] = None,
+    worker_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=LIST_PAGE_MAX),
+    fields: Optional[str] = None,
+    sort: Optional[str] = None,
+    user: TokenData = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    try:
+    # worker_id 가 있으면 동명이인과 구분해 정수 키로 조회, 없으면 기존처럼 이름으로 조회
+    if worker_id is None and not name:
+        raise HTTPException(status_code=400, detail="name 또는 worker_id 가 필요합니다.")
+    cols = parse_fields(fields, DETAIL_FIELDS)
+    default_order = [("work_date", True), ("id", False)] if type == 'REGULAR' else [("time_slot", False), ("id", False)]
+    keys = parse_sort(sort, DETAIL_SORTS, default_order)
+
+    def work():
         c = conn.cursor()
-        if type == 'REGULAR':
-            c.execute(
-                "SELECT * FROM work_logs WHERE name=? AND work_date LIKE ? ORDER BY work_date DESC",
-                (name, f"{date_filter}%")
-            )
-        else:
-            target_date = (
-                datetime.strptime(date_filter, "%Y-%m-%d") -
-                timedelta(days=PAYROLL_DELAY_DAYS)
-            ).strftime("%Y-%m-%d")
-            c.execute(
-                "SELECT * FROM work_logs WHERE name=? AND work_date=? ORDER BY time_slot",
-                (name, target_date)
-            )
+        cursor = cursor_values(conn, "work_logs", keys, after_id) if after_id is not None else None
+        c.execute(*detail_query(type, date_filter, name, worker_id, keys, cols, cursor, limit))
         return [dict(r) for r in c.fetchall()]
-    finally:
-        conn.close()
+
+    rows = await db_executor.run(work)
+    cursor = next_after_id(rows, limit)
+    if cursor is not None:
+        response.headers["X-Next-After-Id"] = str(cursor)
+    return rows
 
 # ==============================
 # API: 리스크 분석
 # ==============================
 
-@app.get("/risk")
+@app.get("/risk", dependencies=[Depends(conditional_get("workers", "work_logs"))])
 async def get_risk(
     type: str,
-    user: TokenData = Depends(get_current_user)
+    windows: Optional[str] = None,
+    intensity: float = RISK_INTENSITY,
+    streak: int = RISK_STREAK,
+    max_load: Optional[float] = None,
+    max_night: Optional[float] = None,
+    as_of: Optional[str] = None,
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    try:
-        c = conn.cursor()
-        c.execute("SELECT MAX(work_date) FROM work_logs WHERE worker_type=?", (type,))
-        today_row = c.fetchone()
-        today = today_row[0] if today_row else None
+    # 위험 조건: 하루 평균 강도 >= intensity 인 날이 기준일까지 streak 일 연속
+    #           또는 가장 긴 창의 부하 합계 >= max_load, 야간시간 합계 >= max_night
+    spans = parse_windows(windows)
+    if not 1 <= streak <= MAX_WINDOW:
+        raise HTTPException(status_code=400, detail=f"streak 는 1~{MAX_WINDOW}일 사이여야 합니다.")
+
+    def work():
+        today = as_of or latest_date(conn, type)
         if not today:
             return {}
+        try:
+            days = load_days(conn, type, today, max(spans[-1], streak))
+        except (ValueError, OverflowError):  # 형식 오류 / 0001-01-01 이전으로 넘어가는 날짜
+            raise HTTPException(status_code=400, detail="as_of 는 YYYY-MM-DD 형식이어야 합니다.")
+
+        stats = evaluate(days, today, spans, intensity)
+        if stats.empty:
+            return {}
+        longest = spans[-1]
+        flagged = stats['streak'] >= streak
+        if max_load is not None:
+            flagged |= stats[f'load_{longest}d'] >= max_load
+        if max_night is not None:
+            flagged |= stats[f'night_{longest}d'] >= max_night
+        stats = stats[flagged]
+
+        workers = lookup_workers(conn, stats.index)
+        items = []
+        for worker_id, r in stats.to_dict('index').items():
+            w = workers.get(worker_id)
+            if w is None:
+                continue  # 현재 명단에 없는 사람
+            item = {"worker_id": worker_id, "name": w['name'], "phone": w['phone'], "center": w['center']}
+            item.update({k: (None if pd.isna(v) else v) for k, v in r.items()})
+            items.append(item)
 
-        prev = (
-            datetime.strptime(today, "%Y-%m-%d") -
-            timedelta(days=1)
-        ).strftime("%Y-%m-%d")
-
-        query = """
-            SELECT w.name, w.phone, w.center,
-                AVG(CASE WHEN l.work_date=? THEN l.intensity ELSE NULL END) as today_int,
-                AVG(CASE WHEN l.work_date=? THEN l.intensity ELSE NULL END) as prev_int
-            FROM workers w
-            JOIN work_logs l ON w.name = l.name
-            WHERE l.work_date IN (?, ?)
-              AND w.worker_type=? 
-              AND l.worker_type=?
-            GROUP BY w.name
-            HAVING today_int >= 1.5 AND prev_int >= 1.5
-        """
-        c.execute(query, (today, prev, today, prev, type, type))
         data = {}
-        for r in c.fetchall():
-            center = r['center']
-            if center not in data:
-                data[center] = []
-            data[center].append(dict(r))
+        for item in sorted(items, key=lambda x: (str(x['name']), x['worker_id'])):
+            data.setdefault(item['center'], []).append(item)
         return data
-    finally:
-        conn.close()
+
+    return await cached(
+        tenant, "risk", (type, windows, intensity, streak, max_load, max_night, as_of),
+        ("workers", "work_logs"), lambda: db_executor.run(work)
+    )
 
 # ==============================
 # API: 센터 분석 (그래프)
 # ==============================
 
-@app.get("/analytics")
+@app.get("/analytics", dependencies=[Depends(conditional_get("work_logs"))])
 async def get_analytics(
     type: str,
-    user: TokenData = Depends(get_current_user)
+    user: TokenData = Depends(get_current_user),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    try:
+    def work():
         c = conn.cursor()
         c.execute(
             """
-            SELECT strftime('%Y-%m', work_date) as month,
+            SELECT month,
                    location,
-                   AVG(score) as avg_score
-            FROM work_logs
+                   CASE WHEN score_count > 0 THEN score_sum / score_count END as avg_score
+            FROM rollup_location_month
             WHERE worker_type=?
-            GROUP BY month, location
-            ORDER BY month
+            ORDER BY month, location
             """,
             (type,)
         )
@@ -785,8 +1023,8 @@ async def get_analytics(
                     data[r['month']] = {"month": r['month']}
                 data[r['month']][r['location']] = r['avg_score']
         return list(data.values())
-    finally:
-        conn.close()
+
+    return await cached(tenant, "analytics", (type,), ("work_logs",), lambda: db_executor.run(work))
 
 # ==============================
 # API: SMS 업무 배정 (Admin 전용)
@@ -796,45 +1034,61 @@ async def get_analytics(
 async def get_sms(
     center: str,
     type: str,
-    user: TokenData = Depends(admin_required)
+    response: Response,
+    seed: Optional[int] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(SMS_PAGE_DEFAULT, ge=1, le=SMS_PAGE_MAX),
+    user: TokenData = Depends(admin_required),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    try:
+    # 센터 전체를 한 번에 배정하고 offset/limit 만큼 돌려준다 (같은 seed 면 페이지를 나눠 받아도 같은 배정)
+    def work():
         c = conn.cursor()
         c.execute(
-            "SELECT name, phone FROM workers WHERE center=? AND worker_type=?",
+            "SELECT worker_id, name, phone, cert FROM workers WHERE center=? AND worker_type=? ORDER BY id",
             (center, type)
         )
         workers = c.fetchall()
 
-        pool = []
-
+        c.execute("SELECT job_name, intensity, ratio, required_cert FROM job_settings")
+        jobs = {r['job_name']: dict(r) for r in c.fetchall()}
         if type == 'DAILY':
-            # 일용직 업무 가중치: 상하차 40%, 포장 40%, 재고관리 20%
-            daily_weights = {
-                '상하차': 40,
-                '포장': 40,
-                '재고관리': 20
-            }
-            for job_name, ratio in daily_weights.items():
-                pool.extend([job_name] * ratio)
+            ratios = DAILY_RATIOS
         else:
             # 정규직 배분은 job_settings의 ratio 사용
-            c.execute("SELECT job_name, ratio FROM job_settings")
-            settings = c.fetchall()
-            for r in settings:
-                pool.extend([r['job_name']] * r['ratio'])
+            ratios = {j: v['ratio'] for j, v in jobs.items()}
+
+        # 최근 FATIGUE_DAYS 일 부하 (근무시간 × 강도)
+        loads = {}
+        as_of = latest_date(conn, type)
+        if as_of:
+            days = load_days(conn, type, as_of, FATIGUE_DAYS)
+            loads = days.groupby('worker_id')['load_sum'].sum().to_dict()
+
+        used_seed = seed if seed is not None else default_seed(center, type, datetime.now().date())
+        assigned, targets, shortfalls = plan(
+            [w['cert'] for w in workers], jobs, ratios,
+            [loads.get(w['worker_id'], 0.0) for w in workers], used_seed
+        )
+
+        response.headers["X-Total-Count"] = str(len(workers) if any(targets.values()) else 0)
+        response.headers["X-Assign-Seed"] = str(used_seed)
+        response.headers["X-Assign-Shortfall"] = json.dumps([s for s in shortfalls if s], ensure_ascii=True)
+        if not any(targets.values()):
+            return []
 
-        import random
         res = []
-        if pool:
-            for w in workers:
-                j1, j2 = random.choice(pool), random.choice(pool)
-                res.append({"phone": w['phone'], "text": f"{w['name']} 배정: {j1}/{j2}"})
-        return res[:20]
-    finally:
-        conn.close()
+        for w, picked in zip(workers[offset:offset + limit], assigned[offset:offset + limit]):
+            text = "/".join(j or "대기" for j in picked)
+            res.append({
+                "phone": w['phone'],
+                "text": f"{w['name']} 배정: {text}",
+                "worker_id": w['worker_id'],
+                "jobs": picked,
+            })
+        return res
+
+    return await db_executor.run(work)
 
 # ==============================
 # API: 설정 관리 (Admin 전용)
@@ -842,68 +1096,170 @@ async def get_sms(
 
 @app.get("/settings")
 async def get_settings(
-    user: TokenData = Depends(admin_required)
+    user: TokenData = Depends(admin_required),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    try:
+    def work():
         c = conn.cursor()
         c.execute("SELECT * FROM job_settings")
         return [dict(r) for r in c.fetchall()]
-    finally:
-        conn.close()
+
+    return await cached(tenant, "settings", (), ("job_settings",), lambda: db_executor.run(work))
 
 @app.post("/settings/update")
 async def update_s(
-    data: dict,
-    user: TokenData = Depends(admin_required)
+    data: JobUpdate,
+    user: TokenData = Depends(admin_required),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    try:
+    def work():
         c = conn.cursor()
+        c.execute("SELECT intensity, hourly_wage FROM job_settings WHERE job_name=?", (data.job_name,))
+        row = c.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="직무 설정이 존재하지 않습니다.")
+        intensity = row['intensity'] if data.intensity is None else data.intensity
+        wage = row['hourly_wage'] if data.hourly_wage is None else data.hourly_wage
         c.execute(
-            "UPDATE job_settings SET ratio=? WHERE job_name=?",
-            (data['ratio'], data['job_name'])
+            "UPDATE job_settings SET ratio=COALESCE(?, ratio), intensity=?, hourly_wage=? WHERE job_name=?",
+            (data.ratio, intensity, wage, data.job_name)
         )
+        result = {"msg": "ok"}
+        # 강도/시급이 바뀌면 기간 안의 기존 근무 기록도 같은 트랜잭션에서 다시 계산
+        changed = (intensity, wage) != (row['intensity'], row['hourly_wage'])
+        if changed:
+            result.update(reprice(conn, data.job_name, intensity, wage, data.date_from, data.date_to))
+        record_write(conn, "job_settings", *(("work_logs",) if changed else ()))
         conn.commit()
-    finally:
-        conn.close()
-    return {"msg": "ok"}
+        tenant.versions.bump("job_settings", *(("work_logs",) if changed else ()))
+        return result
+
+    return await db_executor.run(work)
+
+@app.post("/settings/reprice")
+async def reprice_logs(
+    data: RepriceReq,
+    user: TokenData = Depends(admin_required),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
+):
+    # 현재 직무 설정으로 기간 안의 근무 기록을 다시 계산 (설정과 어긋난 기록 보정용)
+    def work():
+        row = conn.execute(
+            "SELECT intensity, hourly_wage FROM job_settings WHERE job_name=?", (data.job_name,)
+        ).fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="직무 설정이 존재하지 않습니다.")
+        result = reprice(
+            conn, data.job_name, row['intensity'], row['hourly_wage'],
+            data.date_from, data.date_to, data.worker_type
+        )
+        record_write(conn, "work_logs")
+        conn.commit()
+        tenant.versions.bump("work_logs")
+        return {"msg": "재계산 완료", **result}
+
+    return await db_executor.run(work)
 
 @app.post("/settings/add")
 async def add_job_setting(
     job: JobAdd,
-    user: TokenData = Depends(admin_required)
+    user: TokenData = Depends(admin_required),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    try:
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO job_settings (job_name, intensity, hourly_wage, ratio, required_cert) VALUES (?,?,?,?,?)",
-            (job.job_name, job.intensity, job.hourly_wage, job.ratio, job.required_cert)
-        )
+    def work():
+        try:
+            c = conn.cursor()
+            c.execute(
+                "INSERT INTO job_settings (job_name, intensity, hourly_wage, ratio, required_cert) VALUES (?,?,?,?,?)",
+                (job.job_name, job.intensity, job.hourly_wage, job.ratio, job.required_cert)
+            )
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=400, detail="이미 존재하는 직무명입니다.")
+        # 설정 없이 올라온 이 직무의 기록(기본 강도/시급으로 계산됨)을 새 설정으로
+        result = reprice(conn, job.job_name, job.intensity, job.hourly_wage)
+        record_write(conn, "job_settings", *(("work_logs",) if result["repriced"] else ()))
         conn.commit()
-    except sqlite3.IntegrityError:
-        raise HTTPException(status_code=400, detail="이미 존재하는 직무명입니다.")
-    finally:
-        conn.close()
-    return {"msg": "추가 완료"}
+        tenant.versions.bump("job_settings", *(("work_logs",) if result["repriced"] else ()))
+        return {"msg": "추가 완료", **result}
+
+    return await db_executor.run(work)
 
 @app.post("/settings/delete")
 async def delete_job_setting(
     job: JobDelete,
-    user: TokenData = Depends(admin_required)
+    user: TokenData = Depends(admin_required),
+    tenant: Tenant = Depends(get_tenant),
+    conn: sqlite3.Connection = Depends(get_tenant_db)
 ):
-    conn = get_db()
-    try:
+    def work():
         c = conn.cursor()
         c.execute("DELETE FROM job_settings WHERE job_name=?", (job.job_name,))
+        record_write(conn, "job_settings")
         conn.commit()
-    finally:
-        conn.close()
-    return {"msg": "삭제 완료"}
+        tenant.versions.bump("job_settings")
+        return {"msg": "삭제 완료"}
+
+    return await db_executor.run(work)
 
 # 헬스체크
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+# 작업 풀 / 커넥션 풀 적체 현황 (관리자, 회사별 항목은 자기 회사만)
+@app.get("/health/pools")
+def health_pools(user: TokenData = Depends(admin_required), tenant: Tenant = Depends(get_tenant)):
+    return {
+        "executors": executor_stats(),
+        "db": tenants.stats(tenant),
+        "login_limiter": login_limiter.stats(),
+        "jobs": job_runner.stats(user.company_code),
+    }
+
+# 저장된 프로파일 목록 / 다운로드 (format=collapsed 는 flamegraph 입력 형식)
+@app.get("/admin/profiles")
+def list_profiles(user: TokenData = Depends(admin_required)):
+    return {"enabled": PROFILING, "profiles": profile_store.list()}
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: str, format: str = "json", user: TokenData = Depends(admin_required)):
+    try:
+        doc = profile_store.load(profile_id)
+    except (KeyError, OSError):
+        raise HTTPException(status_code=404, detail="프로파일이 없습니다.")
+    if format == "collapsed":
+        return PlainTextResponse(
+            to_collapsed(doc),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'}
+        )
+    return doc
+
+# /metrics 접근: 수집기 고정 토큰(METRICS_TOKEN) 또는 관리자 토큰
+async def metrics_access(request: Request):
+    authorization = request.headers.get("authorization", "")
+    if not authorization:
+        raise HTTPException(status_code=401, detail="인증이 필요합니다.")
+    scheme, _, token = authorization.partition(" ")
+    if METRICS_TOKEN and scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return
+    if not await is_admin_token(authorization):
+        raise HTTPException(status_code=403, detail="관리자 권한이 필요합니다.")
+
+# Prometheus 수집용 (라우트 지연시간, SQL 문장 시간, 업로드/다운로드 처리량)
+@app.get("/metrics", dependencies=[Depends(metrics_access)])
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# 가장 느린 SQL 문장 (최대 시간 순)
+@app.get("/health/sql")
+def health_sql(limit: int = Query(20, ge=1, le=200), user: TokenData = Depends(admin_required)):
+    return {"slowest": metrics.slowest(limit)}
+
+# 응답 캐시 적중률 / 테이블 데이터 버전 / 토큰 캐시 (관리자, 회사별 항목은 자기 회사만)
+@app.get("/health/cache")
+def health_cache(user: TokenData = Depends(admin_required), tenant: Tenant = Depends(get_tenant)):
+    return {"tenants": cache_stats([tenant]), "tokens": token_cache.stats()}
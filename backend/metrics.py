@@ -0,0 +1,313 @@
+"""
+운영 지표 (/metrics, Prometheus 텍스트 형식)
+
+- HTTP : 라우트(경로 템플릿)별 지연시간 히스토그램, 상태코드별 요청 수, 처리 중 요청 수
+         (MetricsMiddleware, 스트리밍 응답은 본문을 다 보낼 때까지)
+- SQL  : 풀 커넥션(TimedConnection)에서 실행한 문장별 시간 (실행 + 결과 읽기).
+         리터럴/IN 목록을 정규화한 SQL 문장을 라벨로 쓰고, 가장 느린 문장 목록을 따로 유지
+- 처리량: 업로드 행 수/시간, 다운로드 바이트 수/시간
+
+지표는 프로세스 안에만 있다. 여러 워커로 띄우면 워커마다 따로 수집된다.
+/metrics 는 관리자 토큰 또는 수집기용 고정 토큰(METRICS_TOKEN, Authorization: Bearer)이 있어야 읽을 수 있다.
+라우트 경로와 정규화된 SQL 문장이 라벨에 들어가므로 외부에 열지 않는다.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # Prometheus 수집기용 (비우면 관리자 토큰만)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))   # 이보다 오래 걸린 문장은 느린 문장으로 집계
+MAX_SQL_LABELS = 200    # SQL 라벨 종류 상한 (넘으면 "other")
+SLOWEST_KEEP = 20       # 가장 느린 문장 목록 크기
+SQL_LABEL_LENGTH = 160
+
+# 초 단위 (Prometheus 기본 버킷과 비슷하게, SQL 은 더 짧은 쪽으로)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# ==============================
+# 기본 지표
+# ==============================
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 마지막은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> list:
+        out, total = [], 0
+        sep = "," if labels else ""
+        for bound, n in zip(self.buckets + ("+Inf",), self.counts):
+            total += n
+            out.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {total}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.http = {}          # (method, route) -> Histogram
+        self.http_status = {}   # (method, route, status) -> count
+        self.in_flight = {}     # route -> 처리 중 요청 수
+        self.sql = {}           # statement -> Histogram
+        self.sql_max = {}       # statement -> 최대 시간
+        self.sql_slow = 0
+        self.transfer = {}      # (kind, label) -> [단위 수, 초]
+
+    # --- HTTP ---
+    def request_started(self, route: str):
+        with self._lock:
+            self.in_flight[route] = self.in_flight.get(route, 0) + 1
+
+    def request_finished(self, method: str, route: str, status: int, elapsed: float):
+        with self._lock:
+            self.in_flight[route] -= 1
+            h = self.http.get((method, route))
+            if h is None:
+                h = self.http[(method, route)] = Histogram(HTTP_BUCKETS)
+            h.observe(elapsed)
+            key = (method, route, status)
+            self.http_status[key] = self.http_status.get(key, 0) + 1
+
+    # --- SQL ---
+    def sql_observed(self, statement: str, elapsed: float):
+        with self._lock:
+            h = self.sql.get(statement)
+            if h is None:
+                if len(self.sql) >= MAX_SQL_LABELS:
+                    statement = "other"
+                    h = self.sql.get(statement)
+                if h is None:
+                    h = self.sql[statement] = Histogram(SQL_BUCKETS)
+            h.observe(elapsed)
+            if elapsed > self.sql_max.get(statement, 0.0):
+                self.sql_max[statement] = elapsed
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                self.sql_slow += 1
+
+    def slowest(self, n: int = SLOWEST_KEEP) -> list:
+        # 최대 시간 기준 상위 n 문장
+        with self._lock:
+            top = sorted(self.sql_max.items(), key=lambda kv: kv[1], reverse=True)[:n]
+            return [
+                {
+                    "statement": stmt,
+                    "max_ms": round(mx * 1000, 3),
+                    "mean_ms": round(self.sql[stmt].sum / self.sql[stmt].count * 1000, 3),
+                    "count": self.sql[stmt].count,
+                    "total_ms": round(self.sql[stmt].sum * 1000, 3),
+                }
+                for stmt, mx in top
+            ]
+
+    # --- 업로드/다운로드 처리량 ---
+    def transferred(self, kind: str, label: str, units: float, elapsed: float):
+        with self._lock:
+            acc = self.transfer.setdefault((kind, label), [0, 0.0])
+            acc[0] += units
+            acc[1] += elapsed
+
+    def render(self) -> str:
+        with self._lock:
+            out = [
+                "# HELP http_request_duration_seconds 라우트별 요청 처리 시간",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), h in sorted(self.http.items()):
+                out += h.lines("http_request_duration_seconds", f'method="{method}",route="{_label(route)}"')
+            out += ["# TYPE http_requests_total counter"]
+            for (method, route, status), n in sorted(self.http_status.items()):
+                out.append(f'http_requests_total{{method="{method}",route="{_label(route)}",status="{status}"}} {n}')
+            out += ["# TYPE http_requests_in_flight gauge"]
+            for route, n in sorted(self.in_flight.items()):
+                out.append(f'http_requests_in_flight{{route="{_label(route)}"}} {n}')
+
+            out += [
+                "# HELP sql_statement_duration_seconds 문장별 실행+결과 읽기 시간 (정규화한 SQL)",
+                "# TYPE sql_statement_duration_seconds histogram",
+            ]
+            for stmt, h in sorted(self.sql.items()):
+                out += h.lines("sql_statement_duration_seconds", f'statement="{_label(stmt)}"')
+            out += ["# TYPE sql_statement_max_seconds gauge"]
+            for stmt, mx in sorted(self.sql_max.items()):
+                out.append(f'sql_statement_max_seconds{{statement="{_label(stmt)}"}} {mx:.6f}')
+            out += [
+                f"# HELP sql_slow_statements_total {SLOW_QUERY_MS:g}ms 이상 걸린 문장 수",
+                "# TYPE sql_slow_statements_total counter",
+                f"sql_slow_statements_total {self.sql_slow}",
+            ]
+
+            for kind, unit in (("upload", "rows"), ("export", "bytes")):
+                out += [f"# TYPE {kind}_{unit}_total counter", f"# TYPE {kind}_seconds_total counter"]
+                for (k, label), (units, secs) in sorted(self.transfer.items()):
+                    if k == kind:
+                        out.append(f'{kind}_{unit}_total{{target="{_label(label)}"}} {units}')
+                        out.append(f'{kind}_seconds_total{{target="{_label(label)}"}} {secs:.6f}')
+        return "\n".join(out) + "\n"
+
+
+metrics = Metrics()
+
+# ==============================
+# SQL 시간 측정
+# ==============================
+
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    # 같은 문장이면 같은 라벨: 주석/리터럴 제거, IN (?,?,...) 길이 무시, 공백 정리
+    s = _COMMENT.sub(" ", sql)
+    s = _STRING.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _PLACEHOLDERS.sub("?...", s)
+    s = _SPACE.sub(" ", s).strip()
+    return s[:SQL_LABEL_LENGTH]
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    execute 부터 결과를 다 읽을 때까지(다음 execute / fetchall / 소진 / close / 해제)를 한 번으로 잰다.
+    SELECT 는 execute 에서 첫 행만 계산하므로 fetch 시간까지 더해야 실제 비용이 된다.
+    """
+    _stmt = None
+    _elapsed = 0.0
+
+    def _flush(self):
+        if self._stmt is not None:
+            metrics.sql_observed(self._stmt, self._elapsed)
+            self._stmt = None
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._stmt = normalize_sql(sql)
+            self._elapsed = time.perf_counter() - started
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.sql_observed(normalize_sql(sql), time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - started
+        if row is None:
+            self._flush()
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._elapsed += time.perf_counter() - started
+        if not rows:
+            self._flush()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - started
+        self._flush()
+        return rows
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+class TimedConnection(sqlite3.Connection):
+    # conn.execute() 도 TimedCursor 를 거치도록
+    def cursor(self, factory=None):
+        return super().cursor(factory or TimedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def connection_factory():
+    return TimedConnection if METRICS_ENABLED else sqlite3.Connection
+
+# ==============================
+# HTTP 미들웨어
+# ==============================
+
+class MetricsMiddleware:
+    """
+    순수 ASGI 미들웨어 (스트리밍 응답을 버퍼링하지 않음).
+    라우트 라벨은 경로 템플릿이고, 어떤 라우트와도 맞지 않는 경로는 "unmatched" 하나로 묶는다.
+    """
+    def __init__(self, app):
+        self.app = app
+        # path -> 라우트 경로. 경로 변수가 없는 라우트만 담는다 (/jobs/{job_id} 같은 경로를 담으면
+        # 인증 전 요청이 임의의 경로로 캐시를 키울 수 있음) -> 크기는 라우트 수 이하
+        self._routes = {}
+
+    def _route(self, scope) -> str:
+        path = scope["path"]
+        route = self._routes.get(path)
+        if route is None:
+            from starlette.routing import Match
+            for r in scope["app"].router.routes:
+                match, _ = r.matches(scope)
+                if match != Match.NONE:
+                    route = getattr(r, "path", path)
+                    if not getattr(r, "param_convertors", None):
+                        self._routes[path] = route
+                    break
+            else:
+                return "unmatched"
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        route = self._route(scope)
+        method = scope["method"]
+        status = {"code": 500}
+        started = time.perf_counter()
+        metrics.request_started(route)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.request_finished(method, route, status["code"], time.perf_counter() - started)
@@ -0,0 +1,612 @@
+"""
+스키마 마이그레이션
+
+schema_version 테이블에 적용된 버전을 기록하고, 아직 적용되지 않은 단계만 순서대로 실행한다.
+앱 임포트 시점이 아니라 배포 단계(CLI) 또는 서버 시작(lifespan)에서 한 번 실행된다.
+
+    python migrations.py              # DB_PATH 에 미적용 마이그레이션 실행
+    python migrations.py --status     # 적용 현황 출력
+    python migrations.py --db other.db
+"""
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import bcrypt
+
+from cache import record_write
+from db import DB_PATH, DB_BUSY_TIMEOUT, PRAGMAS
+
+BACKFILL_BATCH_SIZE = 5000  # 백필 한 트랜잭션에서 갱신하는 행 수 (쓰기 잠금 유지 시간 제한)
+BACKFILL_PAUSE = 0.01       # 배치 사이에 다른 쓰기 요청에 양보하는 시간(초)
+
+# (version, name, fn, batched)
+MIGRATIONS = []
+
+
+def migration(version: int, name: str, batched: bool = False):
+    """
+    마이그레이션 단계 등록.
+    batched=False : 단계 전체가 하나의 BEGIN IMMEDIATE 트랜잭션 안에서 실행된다.
+    batched=True  : 단계가 직접 작은 트랜잭션들로 나눠 실행한다 (대용량 백필).
+                    중간에 중단돼도 다시 실행하면 이어서 진행되도록 멱등하게 작성해야 한다.
+    """
+    def register(fn):
+        MIGRATIONS.append((version, name, fn, batched))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+# ==============================
+# 공통 유틸
+# ==============================
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT, isolation_level=None)  # 트랜잭션 직접 관리
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(r[1] == column for r in conn.execute(f"PRAGMA table_info({table})"))
+
+def backfill_sql(table: str, set_clause: str, where: str = "1") -> str:
+    return f"UPDATE {table} /* dynamic: backfill */ SET {set_clause} WHERE rowid > ? AND rowid <= ? AND ({where})"
+
+def backfill(conn: sqlite3.Connection, table: str, set_clause: str, where: str = "1",
+             params=(), batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    UPDATE {table} SET {set_clause} WHERE {where} 를 rowid 구간별로 나눠 실행한다.
+    배치마다 커밋하므로 수백만 행 테이블에서도 쓰기 잠금을 짧게만 잡는다.
+    """
+    row = conn.execute(
+        f"SELECT (SELECT MIN(rowid) FROM {table}), (SELECT MAX(rowid) FROM {table})"
+    ).fetchone()
+    if row[0] is None:
+        return 0
+    lo, hi = row[0] - 1, row[1]
+    sql = backfill_sql(table, set_clause, where)
+    updated = 0
+    while lo < hi:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(sql, (*params, lo, lo + batch_size))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        updated += cur.rowcount
+        lo += batch_size
+        time.sleep(BACKFILL_PAUSE)
+    return updated
+
+REBUILD_DATE_START = "0"          # 숫자로 시작하지 않는 날짜는 어차피 GLOB 조건에 걸러지므로 건너뜀
+REBUILD_RANGE_END = "\U0010ffff"  # 날짜 접두어 구간의 끝 (접두어로 시작하는 모든 문자열보다 큼)
+
+def _next_rebuild_range(conn: sqlite3.Connection, worker_type, date_from):
+    # (worker_type, date_from) 이후 첫 (근로형태, 월) 구간. 날짜 앞 7글자(YYYY-MM)가 같은 행은 한 구간에 모두 들어간다
+    while worker_type is not None:
+        first = conn.execute(
+            "SELECT MIN(work_date) FROM work_logs WHERE worker_type = ? AND work_date >= ?",
+            (worker_type, date_from)
+        ).fetchone()[0]
+        if first is not None and len(first) < 7:
+            # YYYY-MM 보다 짧은 값은 GLOB 조건에 걸러지므로 그 값만 건너뜀 (짧은 접두어 구간은 여러 달을 한 번에 잡음)
+            date_from = first + " "
+            continue
+        if first is not None:
+            prefix = first[:7]
+            return worker_type, prefix, prefix + REBUILD_RANGE_END
+        worker_type = conn.execute(
+            "SELECT MIN(worker_type) FROM work_logs WHERE worker_type > ?", (worker_type,)
+        ).fetchone()[0]
+        date_from = REBUILD_DATE_START
+    return None
+
+def rebuild_batched(conn: sqlite3.Connection, key: str, reset, statements) -> int:
+    """
+    work_logs 에서 다시 계산하는 집계를 (근로형태, 월) 구간별 트랜잭션으로 나눠 채운다.
+    reset      : 처음 한 번만 실행하는 문장들 (대상 테이블 비우기/다시 만들기)
+    statements : 구간 하나를 넣는 INSERT 문들 (:worker_type, :date_from, :date_to 로 범위 지정)
+    다음 구간 위치를 migration_progress 에 같은 트랜잭션으로 기록하므로, 중단 후 다시 실행하거나
+    여러 워커가 동시에 실행해도 각 구간은 정확히 한 번 들어간다.
+    """
+    batches = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT worker_type, date_from FROM migration_progress WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                for sql in reset:
+                    conn.execute(sql)
+                first = conn.execute(
+                    "SELECT MIN(worker_type) FROM work_logs WHERE worker_type IS NOT NULL"
+                ).fetchone()[0]
+                row = (first, REBUILD_DATE_START)
+            span = _next_rebuild_range(conn, *row)
+            if span is not None:
+                worker_type, date_from, date_to = span
+                params = {"worker_type": worker_type, "date_from": date_from, "date_to": date_to}
+                for sql in statements:
+                    conn.execute(sql, params)
+                row = (worker_type, date_to)
+            else:
+                row = (None, None)  # 완료
+            conn.execute(
+                "INSERT OR REPLACE INTO migration_progress (key, worker_type, date_from) VALUES (?,?,?)",
+                (key, *row)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if span is None:
+            return batches
+        batches += 1
+        time.sleep(BACKFILL_PAUSE)
+
+def current_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at TEXT
+    )''')
+    # batched 단계의 진행 위치 (rebuild_batched: 단계 키 -> 다음 구간 시작)
+    conn.execute('''CREATE TABLE IF NOT EXISTS migration_progress (
+        key TEXT PRIMARY KEY,
+        worker_type TEXT,
+        date_from TEXT
+    )''')
+
+def _record(conn: sqlite3.Connection, version: int, name: str):
+    conn.execute(
+        "INSERT OR IGNORE INTO schema_version (version, name, applied_at) VALUES (?,?,?)",
+        (version, name, datetime.utcnow().isoformat(timespec="seconds"))
+    )
+
+def _touch_data_versions(conn: sqlite3.Connection):
+    # 단계가 데이터를 바꿨을 수 있으므로 실행 중인 서버의 응답 캐시/ETag 를 무효화 (data_versions 는 m012 부터)
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master /* scan-ok: 스키마 */ WHERE type='table' AND name='data_versions'"
+    ).fetchone():
+        record_write(conn)
+
+# ==============================
+# 실행
+# ==============================
+
+def migrate(conn: sqlite3.Connection, log=print) -> int:
+    """
+    미적용 마이그레이션을 순서대로 실행하고 최종 버전을 반환한다.
+    각 단계는 BEGIN IMMEDIATE 로 쓰기 잠금을 잡은 뒤 버전을 다시 확인하므로,
+    여러 워커가 동시에 시작해도 같은 DDL을 두 번 실행하지 않는다.
+    """
+    _ensure_version_table(conn)
+    latest = MIGRATIONS[-1][0] if MIGRATIONS else 0
+    if current_version(conn) > latest:
+        raise RuntimeError(
+            f"DB 스키마 버전({current_version(conn)})이 코드({latest})보다 높습니다."
+        )
+
+    for version, name, fn, batched in MIGRATIONS:
+        if current_version(conn) >= version:
+            continue
+
+        started = time.perf_counter()
+        if batched:
+            fn(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            _record(conn, version, name)
+            _touch_data_versions(conn)
+            conn.execute("COMMIT")
+        else:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if current_version(conn) >= version:  # 다른 워커가 먼저 적용함
+                    conn.execute("ROLLBACK")
+                    continue
+                fn(conn)
+                _record(conn, version, name)
+                _touch_data_versions(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if log:
+            log(f"[migrate] {version:03d} {name} ({time.perf_counter() - started:.2f}s)")
+    return current_version(conn)
+
+def migrate_path(path: str = DB_PATH, log=print) -> int:
+    conn = connect(path)
+    try:
+        return migrate(conn, log=log)
+    finally:
+        conn.close()
+
+def status(conn: sqlite3.Connection):
+    _ensure_version_table(conn)
+    applied = {r[0]: r[2] for r in conn.execute("SELECT version, name, applied_at FROM schema_version")}
+    return [
+        (version, name, applied.get(version))
+        for version, name, _, _ in MIGRATIONS
+    ]
+
+# ==============================
+# 마이그레이션 단계
+# ==============================
+
+@migration(1, "base_tables")
+def m001_base_tables(conn):
+    # 기존 init_db() 와 동일 (IF NOT EXISTS 로 기존 DB 도 그대로 채택)
+
+    # 계정 테이블
+    conn.execute('''CREATE TABLE IF NOT EXISTS accounts (
+        company_code TEXT,
+        username TEXT,
+        secret_key TEXT,
+        role INTEGER,
+        company_name TEXT,
+        PRIMARY KEY (company_code, username)
+    )''')
+
+    # 직원 명단
+    conn.execute('''CREATE TABLE IF NOT EXISTS workers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        phone TEXT,
+        center TEXT,
+        shift TEXT,
+        cert TEXT,
+        worker_type TEXT,
+        valid_date TEXT
+    )''')
+
+    # 직무 설정
+    conn.execute('''CREATE TABLE IF NOT EXISTS job_settings (
+        job_name TEXT PRIMARY KEY,
+        intensity REAL,
+        hourly_wage INTEGER,
+        ratio INTEGER,
+        required_cert TEXT
+    )''')
+
+    # 근무 기록
+    conn.execute('''CREATE TABLE IF NOT EXISTS work_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        location TEXT,
+        job_name TEXT,
+        time_slot TEXT,
+        work_hours REAL,
+        night_hours REAL,
+        total_pay INTEGER,
+        intensity REAL,
+        score REAL,
+        work_date TEXT,
+        worker_type TEXT
+    )''')
+
+@migration(2, "seed_defaults")
+def m002_seed_defaults(conn):
+    # 초기 계정
+    if conn.execute("SELECT count(*) FROM accounts").fetchone()[0] == 0:
+        pw_hash = bcrypt.hashpw(b"1234", bcrypt.gensalt()).decode("utf-8")  # 데모용 비밀번호
+        conn.execute("INSERT INTO accounts VALUES ('WMS01', 'admin', ?, 1, '대한통운 서울센터')", (pw_hash,))
+        conn.execute("INSERT INTO accounts VALUES ('WMS01', 'staff', ?, 2, '대한통운 서울센터')", (pw_hash,))
+
+    # 초기 직무
+    if conn.execute("SELECT count(*) FROM job_settings").fetchone()[0] == 0:
+        jobs = [
+            ('상하차',   1.9, 15000, 20, None),
+            ('포장',     1.0, 12000, 20, None),
+            ('재고관리', 0.8, 13000, 20, None),
+            ('특수용접', 1.7, 25000, 10, '용접기능사'),
+            ('전기설비', 1.5, 22000, 10, '전기기사'),
+            ('지게차',   1.4, 18000, 20, '지게차면허')
+        ]
+        conn.executemany("INSERT INTO job_settings VALUES (?,?,?,?,?)", jobs)
+
+@migration(3, "hot_path_indexes")
+def m003_hot_path_indexes(conn):
+    # 조회 경로별 인덱스 (query_plans.py 로 전체 테이블 스캔 여부 검사)
+
+    # /payroll (센터 + 날짜 범위, 월 합계는 인덱스만으로 계산)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_type_loc_date "
+                 "ON work_logs (worker_type, location, work_date, name, work_hours, total_pay)")
+    # MAX(work_date), 업로드 중복 검사, /risk 날짜 조건, /analytics
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_type_date "
+                 "ON work_logs (worker_type, work_date, name, intensity)")
+    # /workforce/detail, 명단-기록 이름 조인
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_name_date "
+                 "ON work_logs (name, work_date, worker_type, intensity)")
+    # 일용직 명단 조회 / 중복 검사
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_workers_type_date ON workers (worker_type, valid_date)")
+    # /sms 센터별 명단
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_workers_type_center ON workers (worker_type, center)")
+    # /risk 이름 조인
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_workers_name ON workers (name)")
+
+@migration(4, "log_rollups", batched=True)
+def m004_log_rollups(conn):
+    # /analytics: 근로형태·월·센터별 점수 합계
+    conn.execute('''CREATE TABLE IF NOT EXISTS rollup_location_month (
+        worker_type TEXT,
+        month TEXT,
+        location TEXT,
+        log_count INTEGER NOT NULL DEFAULT 0,
+        score_sum REAL NOT NULL DEFAULT 0,
+        score_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (worker_type, month, location)
+    ) WITHOUT ROWID''')
+
+    # 근로자·일별 합계 (월 근무일수 계산용)
+    conn.execute('''CREATE TABLE IF NOT EXISTS rollup_worker_day (
+        worker_type TEXT,
+        location TEXT,
+        name TEXT,
+        work_date TEXT,
+        log_count INTEGER NOT NULL DEFAULT 0,
+        hours_sum REAL NOT NULL DEFAULT 0,
+        pay_sum INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (worker_type, location, name, work_date)
+    ) WITHOUT ROWID''')
+
+    # 정규직 /payroll: 근로형태·센터·월·이름별 합계
+    conn.execute('''CREATE TABLE IF NOT EXISTS rollup_worker_month (
+        worker_type TEXT,
+        location TEXT,
+        month TEXT,
+        name TEXT,
+        days INTEGER NOT NULL DEFAULT 0,
+        log_count INTEGER NOT NULL DEFAULT 0,
+        hours_sum REAL NOT NULL DEFAULT 0,
+        pay_sum INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (worker_type, location, month, name)
+    ) WITHOUT ROWID''')
+
+    rebuild_batched(conn, "004_log_rollups", _M004_RESET, _M004_RANGE)
+
+# 004 배포 당시 rollups.rebuild 결과 그대로 (이후 rollups 가 바뀌어도 이 단계의 결과는 고정)
+_M004_RESET = (
+    "DELETE FROM rollup_location_month",
+    "DELETE FROM rollup_worker_day",
+    "DELETE FROM rollup_worker_month",
+)
+# 구간 문장은 (근로형태, 날짜) 인덱스로 그 달만 읽도록 고정 (센터 인덱스를 고르면 근로형태 전체를 매번 읽음)
+_M004_RANGE = (
+    """
+    INSERT INTO rollup_location_month (worker_type, month, location, log_count, score_sum, score_count)
+    SELECT worker_type, substr(work_date, 1, 7), location, COUNT(*), TOTAL(score), COUNT(score)
+    FROM work_logs INDEXED BY idx_logs_type_date
+    WHERE worker_type = :worker_type AND work_date >= :date_from AND work_date < :date_to
+      AND work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+      AND location IS NOT NULL
+    GROUP BY 1, 2, 3
+    """,
+    """
+    INSERT INTO rollup_worker_day (worker_type, location, name, work_date, log_count, hours_sum, pay_sum)
+    SELECT worker_type, location, name, work_date, COUNT(*), TOTAL(work_hours), COALESCE(SUM(total_pay), 0)
+    FROM work_logs INDEXED BY idx_logs_type_date
+    WHERE worker_type = :worker_type AND work_date >= :date_from AND work_date < :date_to
+      AND work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+      AND location IS NOT NULL AND name IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    """,
+    # 원래는 rollup_worker_day 를 다시 묶었지만 그 테이블에는 (근로형태, 날짜) 인덱스가 없어 구간마다 work_logs 에서 직접
+    # (일수 = 서로 다른 work_date 수 = 근로자·일 행 수)
+    """
+    INSERT INTO rollup_worker_month (worker_type, location, month, name, days, log_count, hours_sum, pay_sum)
+    SELECT worker_type, location, substr(work_date, 1, 7), name,
+           COUNT(DISTINCT work_date), COUNT(*), TOTAL(work_hours), COALESCE(SUM(total_pay), 0)
+    FROM work_logs INDEXED BY idx_logs_type_date
+    WHERE worker_type = :worker_type AND work_date >= :date_from AND work_date < :date_to
+      AND work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+      AND location IS NOT NULL AND name IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    """,
+)
+
+@migration(5, "fatigue_rollup")
+def m005_fatigue_rollup(conn):
+    # /risk: 근로형태·날짜·이름별 피로도 합계 (부하 = 근무시간 × 강도)
+    # 채우지 않는다: 007 이 worker_id 기준으로 다시 만들면서 채우므로 여기서 전체를 읽는 것은 버려지는 작업
+    conn.execute('''CREATE TABLE IF NOT EXISTS rollup_fatigue_day (
+        worker_type TEXT,
+        work_date TEXT,
+        name TEXT,
+        log_count INTEGER NOT NULL DEFAULT 0,
+        hours_sum REAL NOT NULL DEFAULT 0,
+        load_sum REAL NOT NULL DEFAULT 0,
+        night_sum REAL NOT NULL DEFAULT 0,
+        intensity_sum REAL NOT NULL DEFAULT 0,
+        intensity_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (worker_type, work_date, name)
+    ) WITHOUT ROWID''')
+
+@migration(6, "worker_ids")
+def m006_worker_ids(conn):
+    # 사람 단위 정수 키 (정규직 명단은 업로드마다 지우고 다시 넣으므로 workers.id 대신 별도 테이블)
+    conn.execute('''CREATE TABLE IF NOT EXISTS worker_identities (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        worker_type TEXT NOT NULL,
+        name TEXT NOT NULL,
+        phone TEXT NOT NULL DEFAULT '',
+        UNIQUE (worker_type, name, phone)
+    )''')
+    if not column_exists(conn, "workers", "worker_id"):
+        conn.execute("ALTER TABLE workers ADD COLUMN worker_id INTEGER REFERENCES worker_identities (id)")
+    if not column_exists(conn, "work_logs", "worker_id"):
+        conn.execute("ALTER TABLE work_logs ADD COLUMN worker_id INTEGER REFERENCES worker_identities (id)")
+
+    # 기존 명단에서 사람 목록 생성 (이름 + 전화번호)
+    conn.execute("""
+        INSERT OR IGNORE INTO worker_identities (worker_type, name, phone)
+        SELECT worker_type, name, COALESCE(phone, '')
+        FROM workers /* scan-ok: 초기 채우기 */
+        WHERE worker_type IS NOT NULL AND name IS NOT NULL
+        GROUP BY 1, 2, 3
+        ORDER BY MIN(id)
+    """)
+    conn.execute("""
+        UPDATE workers /* scan-ok: 초기 채우기 */
+        SET worker_id = (
+            SELECT i.id FROM worker_identities i
+            WHERE i.worker_type = workers.worker_type
+              AND i.name = workers.name
+              AND i.phone = COALESCE(workers.phone, '')
+        )
+        WHERE worker_id IS NULL
+    """)
+
+    # 명단 <-> 근무 기록 조인, /workforce/detail, /risk 명단 조회
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_workers_worker_id ON workers (worker_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_worker_date "
+                 "ON work_logs (worker_id, work_date, worker_type, intensity)")
+
+@migration(7, "work_logs_worker_id", batched=True)
+def m007_work_logs_worker_id(conn):
+    # 기존 근무 기록은 이름으로 연결 (동명이인이 있는 이름은 판단할 수 없어 비워 둠)
+    backfill(
+        conn, "work_logs",
+        """worker_id = (
+            SELECT CASE WHEN COUNT(*) = 1 THEN MIN(i.id) END
+            FROM worker_identities i
+            WHERE i.worker_type = work_logs.worker_type AND i.name = work_logs.name
+        )""",
+        where="worker_id IS NULL"
+    )
+
+    # 피로도 집계를 이름 대신 worker_id 기준으로 다시 생성
+    rebuild_batched(conn, "007_work_logs_worker_id", _M007_RESET, _M007_RANGE)
+
+_M007_RESET = (
+    "DROP TABLE IF EXISTS rollup_fatigue_day",
+    '''CREATE TABLE rollup_fatigue_day (
+        worker_type TEXT,
+        work_date TEXT,
+        worker_id INTEGER,
+        log_count INTEGER NOT NULL DEFAULT 0,
+        hours_sum REAL NOT NULL DEFAULT 0,
+        load_sum REAL NOT NULL DEFAULT 0,
+        night_sum REAL NOT NULL DEFAULT 0,
+        intensity_sum REAL NOT NULL DEFAULT 0,
+        intensity_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (worker_type, work_date, worker_id)
+    ) WITHOUT ROWID''',
+)
+# 007 배포 당시 rollups.rebuild_fatigue 결과 그대로
+_M007_RANGE = (
+    """
+    INSERT INTO rollup_fatigue_day (worker_type, work_date, worker_id, log_count, hours_sum,
+                                    load_sum, night_sum, intensity_sum, intensity_count)
+    SELECT worker_type, work_date, worker_id, COUNT(*), TOTAL(work_hours),
+           TOTAL(work_hours * intensity), TOTAL(night_hours), TOTAL(intensity), COUNT(intensity)
+    FROM work_logs INDEXED BY idx_logs_type_date
+    WHERE worker_type = :worker_type AND work_date >= :date_from AND work_date < :date_to
+      AND work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+      AND worker_id IS NOT NULL
+    GROUP BY 1, 2, 3
+    """,
+)
+
+@migration(8, "worker_list_sort_index")
+def m008_worker_list_sort_index(conn):
+    # /workers/list?sort=name 키셋 페이지 (근로형태 안에서 이름순)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_workers_type_name ON workers (worker_type, name)")
+
+@migration(9, "login_limits")
+def m009_login_limits(conn):
+    # RATE_LIMIT_BACKEND=sqlite 일 때 워커 프로세스들이 공유하는 로그인 시도 카운터
+    conn.execute('''CREATE TABLE IF NOT EXISTS login_limits (
+        key TEXT PRIMARY KEY,
+        window_start REAL NOT NULL,
+        prev_count INTEGER NOT NULL,
+        curr_count INTEGER NOT NULL,
+        blocked_until REAL NOT NULL,
+        expires_at REAL NOT NULL
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_login_limits_expires ON login_limits (expires_at)")
+
+@migration(10, "upload_ledger")
+def m010_upload_ledger(conn):
+    # 업로드 파일 SHA-256 원장 (같은 파일 재시도는 파싱 없이 이전 결과 반환)
+    conn.execute('''CREATE TABLE IF NOT EXISTS uploads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        worker_type TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        result TEXT NOT NULL,
+        username TEXT,
+        created_at TEXT NOT NULL
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_uploads_kind ON uploads (kind, worker_type, id)")
+
+@migration(11, "reprice_index")
+def m011_reprice_index(conn):
+    # 직무 설정 변경 시 기간 재계산 (reprice.py) 이 해당 직무 행만 읽도록
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_job_date ON work_logs (job_name, work_date)")
+
+@migration(12, "data_versions")
+def m012_data_versions(conn):
+    # 응답 캐시/ETag 용 테이블별 데이터 버전 (쓰기 트랜잭션 안에서 cache.record_write 로 올림)
+    # 여러 프로세스가 같은 DB 를 쓸 때 다른 프로세스의 쓰기를 알 수 있게 DB 에 둔다
+    conn.execute('''CREATE TABLE IF NOT EXISTS data_versions (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )''')
+    conn.executemany(
+        "INSERT OR IGNORE INTO data_versions (table_name) VALUES (?)",
+        [("workers",), ("work_logs",), ("job_settings",)]
+    )
+
+@migration(13, "token_revocations")
+def m013_token_revocations(conn):
+    # 로그아웃/계정 단위 토큰 폐기를 워커 프로세스들이 공유 (공용 DB 의 것만 사용)
+    conn.execute('''CREATE TABLE IF NOT EXISTS revoked_tokens (
+        digest BLOB PRIMARY KEY,
+        expires_at REAL NOT NULL
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens (expires_at)")
+    conn.execute('''CREATE TABLE IF NOT EXISTS revoked_users (
+        company_code TEXT NOT NULL,
+        username TEXT NOT NULL,
+        revoked_before REAL NOT NULL,
+        PRIMARY KEY (company_code, username)
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_revoked_users_before ON revoked_users (revoked_before)")
+
+# ==============================
+# CLI
+# ==============================
+
+def main_cli(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = DB_PATH
+    if "--db" in argv:
+        path = argv[argv.index("--db") + 1]
+
+    if "--status" in argv:
+        conn = connect(path)
+        try:
+            for version, name, applied_at in status(conn):
+                print(f"{version:03d} {name:<28} {applied_at or '(미적용)'}")
+        finally:
+            conn.close()
+        return 0
+
+    version = migrate_path(path)
+    print(f"{path}: schema version {version}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,88 @@
+"""
+키셋 페이지네이션 / 필드 선택 / 정렬
+
+    ?after_id=123&limit=100&sort=-name&fields=id,name,phone
+
+- after_id: 이전 페이지 마지막 행의 id. 그 행의 정렬 키 값을 읽어 "그 뒤" 조건을 만든다
+            (OFFSET 처럼 앞 행을 건너뛰며 읽지 않으므로 페이지 위치와 무관하게 일정한 시간)
+- sort    : 허용된(인덱스가 있는) 컬럼만, '-' 접두사는 내림차순. 항상 같은 방향의 id 를 마지막 키로 붙인다
+            (인덱스 끝에 rowid 가 있으므로 방향이 같으면 정렬 없이 인덱스 순서대로 읽는다)
+- fields  : 허용된 컬럼만, id 는 다음 페이지 커서로 쓰이므로 항상 포함
+"""
+from fastapi import HTTPException
+
+LIST_PAGE_MAX = 1000  # limit 최대값
+
+def parse_fields(fields, allowed, always=("id",)):
+    # None 이면 전체 컬럼
+    if not fields:
+        return None
+    picked = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in picked if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 필드입니다: {', '.join(unknown)}")
+    return list(always) + [f for f in dict.fromkeys(picked) if f not in always]
+
+def parse_sort(sort, allowed, default):
+    """
+    반환: [(컬럼, 내림차순 여부), ...] (마지막은 항상 id)
+    default 는 sort 를 주지 않았을 때의 키 목록 (기존 응답 순서).
+    """
+    if not sort:
+        return list(default)
+    desc = sort.startswith("-")
+    col = sort.lstrip("-")
+    if col not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"정렬할 수 없는 컬럼입니다: {col} ({', '.join(sorted(allowed))})"
+        )
+    keys = [(col, desc)]
+    if col != "id":
+        keys.append(("id", desc))
+    return keys
+
+def order_by(keys, alias: str = "") -> str:
+    return ", ".join(f"{alias}{col}{' DESC' if desc else ''}" for col, desc in keys)
+
+def cursor_values(conn, table: str, keys, after_id: int):
+    row = conn.execute(
+        f"SELECT {', '.join(col for col, _ in keys)} FROM {table} WHERE id=?",
+        (after_id,)
+    ).fetchone()
+    if row is None:
+        raise HTTPException(status_code=400, detail="after_id 에 해당하는 행이 없습니다.")
+    return tuple(row)
+
+def _after(col: str, desc: bool, value):
+    # NULL 은 오름차순에서 맨 앞, 내림차순에서 맨 뒤 (SQLite 정렬 규칙)
+    if value is None:
+        return (f"{col} IS NOT NULL", []) if not desc else ("0", [])
+    if desc:
+        return f"({col} < ? OR {col} IS NULL)", [value]
+    return f"{col} > ?", [value]
+
+def keyset_clause(keys, values, alias: str = ""):
+    """
+    정렬 키 (k1, k2, ...) 가 커서 값 "뒤"인 행 조건.
+    모두 오름차순이고 커서 값에 NULL 이 없으면 행 값 비교 (k1, k2) > (?, ?) 로 인덱스 탐색을 쓰고,
+    아니면 (내림차순은 NULL 이 뒤에 오므로) k1 > v1 OR (k1 = v1 AND k2 > v2) OR ... 로 풀어서 쓴다.
+    """
+    cols = [f"{alias}{col}" for col, _ in keys]
+    if not any(desc for _, desc in keys) and None not in values:
+        marks = ", ".join("?" * len(values))
+        return f"({', '.join(cols)}) > ({marks})", list(values)
+
+    parts, params = [], []
+    for i, (col, (_, desc)) in enumerate(zip(cols, keys)):
+        cond, p = _after(col, desc, values[i])
+        eq = [f"{c} IS ?" for c in cols[:i]]
+        parts.append("(" + " AND ".join(eq + [cond]) + ")")
+        params += list(values[:i]) + p
+    return "(" + " OR ".join(parts) + ")", params
+
+def next_after_id(rows, limit):
+    # 마지막 페이지가 아니면 다음 요청에 넣을 after_id
+    if limit and len(rows) == limit:
+        return rows[-1]["id"]
+    return None
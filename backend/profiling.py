@@ -0,0 +1,276 @@
+"""
+느린 요청 프로파일링 (기본 꺼짐)
+
+PROFILING=1 일 때만 미들웨어가 붙는다 (끄면 요청 경로에 추가 작업이 전혀 없음).
+켜져 있으면 다음 중 하나에 해당하는 요청의 스택을 샘플링해 저장한다.
+- 관리자 토큰과 함께 X-Profile: 1 헤더를 보낸 요청
+- PROFILE_SAMPLE_RATE 비율로 무작위로 고른 요청
+- PROFILE_SLOW_MS 이상 걸린 요청 (이 값을 주면 모든 요청을 샘플링하고 느린 것만 남김)
+
+cProfile 은 호출한 스레드만 보므로, 별도 샘플러 스레드가 PROFILE_INTERVAL_MS 마다
+sys._current_frames() 로 요청에 묶인 스레드들의 스택을 읽는다. 묶이는 스레드:
+- 이벤트 루프 스레드 (요청 처리 중 내내. 동시에 처리 중인 다른 요청의 코루틴도 같이 잡힐 수 있음)
+- BoundedExecutor 작업 스레드 (그 요청이 넘긴 작업을 실행하는 동안만: pandas 파싱, SQLite 등)
+
+결과는 PROFILE_DIR 에 최근 PROFILE_KEEP 개만 남기고, /admin/profiles 로 목록/다운로드한다.
+다운로드 형식 collapsed 는 flamegraph.pl / speedscope 에 바로 넣을 수 있다.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+
+PROFILING = os.getenv("PROFILING", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))    # 0~1
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))            # 0 이면 끔
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))                   # 디스크에 남기는 개수
+PROFILE_HEADER = "x-profile"
+PROFILE_MAX_DEPTH = 80
+TOP_FUNCTIONS = 30
+
+PROFILE_ID = re.compile(r"^[\w.-]+$")
+
+current_profile = ContextVar("current_profile", default=None)
+
+# ==============================
+# 샘플링
+# ==============================
+
+class Profile:
+    def __init__(self):
+        self.threads = {}   # thread id -> 묶인 횟수 (같은 스레드가 겹쳐 묶일 수 있음)
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle = 0       # 이벤트 루프가 I/O 대기(select) 중이던 샘플 (스택에는 넣지 않음)
+        self._lock = threading.Lock()
+
+    def attach(self, ident: int):
+        with self._lock:
+            self.threads[ident] = self.threads.get(ident, 0) + 1
+
+    def detach(self, ident: int):
+        with self._lock:
+            n = self.threads.get(ident, 0) - 1
+            if n > 0:
+                self.threads[ident] = n
+            else:
+                self.threads.pop(ident, None)
+
+    def sample(self, frames: dict):
+        with self._lock:
+            idents = list(self.threads)
+        for ident in idents:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            if frame.f_code.co_filename.endswith("selectors.py"):
+                self.idle += 1
+                continue
+            self.stacks[collapse(frame)] += 1
+            self.samples += 1
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def collapse(frame) -> str:
+    # 바깥 -> 안쪽 순서로 ';' 연결 (collapsed stack 형식)
+    names = []
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class Sampler:
+    # 활성 프로파일이 있을 때만 도는 샘플러 스레드 하나
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self._active = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+
+    def start(self, profile: Profile):
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="wg-profiler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def stop(self, profile: Profile):
+        with self._lock:
+            self._active.discard(profile)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                while not self._active:
+                    self._wake.wait()
+                active = list(self._active)
+            frames = sys._current_frames()
+            frames.pop(me, None)
+            for profile in active:
+                profile.sample(frames)
+            time.sleep(self.interval)
+
+
+sampler = Sampler()
+
+def run_attached(profile, fn):
+    # BoundedExecutor 작업 스레드에서: 작업을 실행하는 동안만 요청 프로파일에 묶는다
+    if profile is None:
+        return fn()
+    ident = threading.get_ident()
+    profile.attach(ident)
+    try:
+        return fn()
+    finally:
+        profile.detach(ident)
+
+# ==============================
+# 저장소 (디스크 링)
+# ==============================
+
+class ProfileStore:
+    def __init__(self, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str) -> str:
+        if not PROFILE_ID.match(profile_id):
+            raise KeyError(profile_id)
+        return os.path.join(self.directory, profile_id + ".json")
+
+    def save(self, profile: Profile, meta: dict) -> str:
+        own = Counter()
+        for stack, n in profile.stacks.items():
+            own[stack.rsplit(";", 1)[-1]] += n
+        slug = re.sub(r"[^\w]+", "_", meta["route"]).strip("_") or "root"
+        profile_id = f"{time.time_ns()}-{slug}"
+        doc = {
+            "id": profile_id,
+            **meta,
+            "samples": profile.samples,
+            "idle_samples": profile.idle,
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "top_functions": [{"function": f, "samples": n} for f, n in own.most_common(TOP_FUNCTIONS)],
+            "stacks": dict(profile.stacks.most_common()),
+        }
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self._path(profile_id) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(doc, f, ensure_ascii=False)
+            os.replace(tmp, self._path(profile_id))
+            # 오래된 것부터 지워 keep 개만 유지 (이름이 시각 순)
+            files = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+            for name in files[:-self.keep] if self.keep > 0 else files:
+                os.remove(os.path.join(self.directory, name))
+        return profile_id
+
+    def list(self) -> list:
+        if not os.path.isdir(self.directory):
+            return []
+        out = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    doc = json.load(f)
+            except (OSError, ValueError):
+                continue  # 링에서 막 지워진 파일
+            out.append({k: v for k, v in doc.items() if k not in ("stacks", "top_functions")})
+        return out
+
+    def load(self, profile_id: str) -> dict:
+        with open(self._path(profile_id), encoding="utf-8") as f:
+            return json.load(f)
+
+
+profile_store = ProfileStore()
+
+def to_collapsed(doc: dict) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in doc["stacks"].items())
+
+# ==============================
+# 미들웨어
+# ==============================
+
+class ProfilingMiddleware:
+    """
+    is_admin(authorization 헤더 값) -> bool 코루틴: X-Profile 헤더 요청을 관리자에게만 허용.
+    """
+    def __init__(self, app, is_admin, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 slow_ms: float = PROFILE_SLOW_MS, store: ProfileStore = profile_store):
+        self.app = app
+        self.is_admin = is_admin
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.store = store
+
+    async def _reason(self, scope):
+        headers = dict(scope.get("headers") or ())
+        if headers.get(PROFILE_HEADER.encode()) == b"1" and await self.is_admin(
+            headers.get(b"authorization", b"").decode("latin-1")
+        ):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        if self.slow_ms:
+            return "slow"  # 끝나고 느린 경우만 저장
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/admin/profiles"):
+            return await self.app(scope, receive, send)
+        reason = await self._reason(scope)
+        if reason is None:
+            return await self.app(scope, receive, send)
+
+        profile = Profile()
+        token = current_profile.set(profile)
+        loop_thread = threading.get_ident()
+        profile.attach(loop_thread)
+        status = {"code": 500}
+        started = time.perf_counter()
+        started_at = datetime.now().isoformat(timespec="milliseconds")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop(profile)
+            profile.detach(loop_thread)
+            current_profile.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if reason != "slow" or elapsed_ms >= self.slow_ms:
+                route = scope.get("route")
+                # 파일 쓰기/링 정리는 이벤트 루프 밖에서
+                await asyncio.get_running_loop().run_in_executor(None, self.store.save, profile, {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", scope["path"]),
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": status["code"],
+                    "elapsed_ms": round(elapsed_ms, 3),
+                    "started_at": started_at,
+                    "reason": reason,
+                })
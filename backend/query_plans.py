@@ -0,0 +1,255 @@
+"""
+EXPLAIN QUERY PLAN 회귀 검사
+
+backend 모듈 안의 모든 SQL 문자열을 찾아 실제 스키마(인덱스 포함)에서 실행 계획을 확인하고,
+작은 설정 테이블 외의 테이블을 전체 스캔(SCAN)하는 문장이 하나라도 있으면 실패한다.
+재계산처럼 의도적으로 전체를 읽는 문장은 SQL 안에 /* scan-ok: 사유 */ 를 적어 제외한다.
+
+f-string SQL 은 모듈 전역 값(컬럼 목록 등)과 FSTRING_VALUES 의 대표 값으로 펼쳐서 검사한다.
+요청 값으로 조건/정렬을 조립하는 SQL 은 /* dynamic: 이름 */ 을 적고, DYNAMIC_VARIANTS 의 같은 이름 함수가
+실제 조립 함수를 불러 정렬·커서·필터 조합별 문장을 만든다. 어느 쪽으로도 펼칠 수 없는 SQL 은 실패로 보고한다.
+
+    python query_plans.py            # 실패 시 종료 코드 1
+    python query_plans.py --verbose  # 모든 문장의 실행 계획 출력
+"""
+import ast
+import importlib
+import itertools
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# 전체 스캔을 허용하는 테이블 (행 수가 수십 개 수준인 설정/계정/메타 테이블)
+SCAN_ALLOWED = {"job_settings", "accounts", "schema_version"}
+
+# f-string 안의 지역 변수에 들어갈 수 있는 값 (예: f"SELECT ... FROM {table} ...")
+FSTRING_VALUES = {
+    "table": ("workers", "work_logs"),
+    "keys": ([("id", False)], [("name", True), ("id", True)]),  # paging.cursor_values
+    "batch": ([1, 2, 3],),                                      # fatigue.lookup_workers 의 IN (?,?,?)
+    "rollup": ("rollup_location_month", "rollup_worker_month", "rollup_fatigue_day"),  # rollups CLI
+}
+
+# 의도적인 전체 스캔 표시 (예: 집계 재계산) -> SQL 안에 /* scan-ok: 사유 */
+SCAN_OK_MARKER = "/* scan-ok"
+
+SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE|CREATE TEMP)\b", re.IGNORECASE)
+# 요청 중에 만드는 임시 테이블: 검사 DB 에도 만들어 두고 뒤 문장들의 계획을 본다 (소스 순서대로 수집됨)
+TEMP_TABLE = re.compile(r"^\s*CREATE TEMP", re.IGNORECASE)
+NAMED_PARAM = re.compile(r"[:@$]([A-Za-z_]\w*)")
+DYNAMIC_MARKER = re.compile(r"/\* dynamic: (\w+) \*/")
+UNEXPANDED = "펼칠 수 없는 동적 SQL (/* dynamic: 이름 */ 과 DYNAMIC_VARIANTS 에 대표 조합 추가)"
+
+# ==============================
+# SQL 수집
+# ==============================
+
+def _module_globals(path: Path) -> dict:
+    # f-string 안의 모듈 전역 값(컬럼 목록 등)을 계산하기 위해 모듈을 임포트
+    sys.path.insert(0, str(BACKEND_DIR))
+    try:
+        return vars(importlib.import_module(path.stem))
+    except ImportError:
+        return {}
+
+def _expand_fstring(node: ast.JoinedStr, env: dict):
+    # 펼친 문장 목록, 지역 값에 의존해 펼칠 수 없으면 None
+    exprs = [part.value for part in node.values if isinstance(part, ast.FormattedValue)]
+    used = {n.id for e in exprs for n in ast.walk(e) if isinstance(n, ast.Name)}
+    names = [n for n in FSTRING_VALUES if n in used]
+
+    variants = []
+    for values in itertools.product(*(FSTRING_VALUES[n] for n in names)):
+        scope = {**env, **dict(zip(names, values))}
+        text = []
+        for part in node.values:
+            if isinstance(part, ast.Constant):
+                text.append(str(part.value))
+                continue
+            try:
+                text.append(str(eval(compile(ast.Expression(part.value), "<sql>", "eval"), scope)))
+            except NameError:
+                return None
+        variants.append("".join(text))
+    return variants
+
+def _fstring_text(node: ast.JoinedStr) -> str:
+    return "".join(str(p.value) if isinstance(p, ast.Constant) else "{}" for p in node.values)
+
+def _sort_variants(allowed, default):
+    from paging import parse_sort
+    return [list(default)] + [parse_sort(f"{sign}{col}", allowed, default) for col in sorted(allowed) for sign in ("", "-")]
+
+def _cursor_variants(keys):
+    # 커서 없음 / 값 있음 / 첫 키가 NULL (keyset_clause 의 풀어 쓴 조건)
+    out = [None, tuple(1 for _ in keys)]
+    if keys[0][0] != "id":
+        out.append((None,) + tuple(1 for _ in keys[1:]))
+    return out
+
+def _workers_list_variants():
+    from main import WORKER_LIST_SORTS, workers_list_query
+    for type, date in (("REGULAR", None), ("DAILY", None), ("DAILY", "2025-01-01")):
+        for keys in _sort_variants(WORKER_LIST_SORTS, [("id", False)]):
+            for cursor in _cursor_variants(keys):
+                for cols in (None, ["id", "name"]):
+                    yield workers_list_query(type, date, keys, cols, cursor, "2025-01", 100)[0]
+
+def _workforce_detail_variants():
+    from main import DETAIL_SORTS, detail_query
+    for type, date_filter in (("REGULAR", "2025-01"), ("DAILY", "2025-01-04")):
+        default = [("work_date", True), ("id", False)] if type == 'REGULAR' else [("time_slot", False), ("id", False)]
+        for name, worker_id in (("홍길동", None), (None, 1)):
+            for keys in _sort_variants(DETAIL_SORTS, default):
+                for cursor in _cursor_variants(keys):
+                    yield detail_query(type, date_filter, name, worker_id, keys, None, cursor, 100)[0]
+
+def _export_variants():
+    from export import TABLES, build_query, count_query
+    for table in TABLES:
+        for center, date_from, date_to in itertools.product((None, "A"), (None, "2025-01-01"), (None, "2025-01-31")):
+            sql, _ = build_query(table, "REGULAR", center, date_from, date_to)
+            yield sql
+            yield count_query(sql)
+
+def _backfill_variants():
+    from migrations import backfill_sql
+    yield backfill_sql("work_logs", "worker_id = NULL", "worker_id IS NULL")
+
+# /* dynamic: 이름 */ -> 대표 조합 문장을 만드는 함수
+DYNAMIC_VARIANTS = {
+    "workers_list": _workers_list_variants,
+    "workforce_detail": _workforce_detail_variants,
+    "export": _export_variants,
+    "backfill": _backfill_variants,
+}
+
+def collect_statements(paths=None):
+    """
+    (위치, SQL) 목록. 펼칠 수 없는 동적 SQL 은 SQL 자리에 None (check 가 실패로 보고).
+    """
+    paths = paths or sorted(
+        p for p in BACKEND_DIR.glob("*.py") if p.name != Path(__file__).name
+    )
+    found = []
+    dynamic = {}
+    for path in paths:
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        env = _module_globals(path) if any(isinstance(n, ast.JoinedStr) for n in ast.walk(tree)) else {}
+        # f-string 의 조각 문자열과 docstring 등 단독 문자열 문장은 제외
+        fragments = {
+            id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr)
+            for part in node.values
+        }
+        fragments |= {
+            id(node.value) for node in ast.walk(tree) if isinstance(node, ast.Expr)
+        }
+        for node in ast.walk(tree):
+            if id(node) in fragments:
+                continue
+            where = f"{path.name}:{getattr(node, 'lineno', 0)}"
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                candidates = [node.value]
+            elif isinstance(node, ast.JoinedStr):
+                text = _fstring_text(node)
+                marker = DYNAMIC_MARKER.search(text)
+                if marker:
+                    dynamic.setdefault(marker.group(1), where)
+                    continue
+                candidates = _expand_fstring(node, env)
+                if candidates is None:
+                    if SQL_START.match(text):
+                        found.append((where, None))
+                    continue
+            else:
+                continue
+            for sql in candidates:
+                if SQL_START.match(sql):
+                    found.append((where, " ".join(sql.split())))
+
+    for name, where in dynamic.items():
+        if name not in DYNAMIC_VARIANTS:
+            found.append((where, None))
+            continue
+        for i, sql in enumerate(dict.fromkeys(DYNAMIC_VARIANTS[name]())):
+            found.append((f"{where} [{name} #{i}]", " ".join(sql.split())))
+    return found
+
+# ==============================
+# 실행 계획 검사
+# ==============================
+
+def _params(sql: str):
+    names = NAMED_PARAM.findall(sql)
+    if names:
+        return {n: None for n in names}
+    return [None] * sql.count("?")
+
+def explain(conn: sqlite3.Connection, sql: str):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, _params(sql))]
+
+def full_scans(plan):
+    bad = []
+    # FROM (SELECT ...) AS d 로 먼저 만든 중간 결과를 도는 것은 원본 테이블 스캔이 아님
+    materialized = {m.group(1) for m in (re.match(r"MATERIALIZE (\S+)", d) for d in plan) if m}
+    for detail in plan:
+        m = re.match(r"SCAN (\S+)", detail)
+        if not m:
+            continue
+        target = m.group(1)
+        if target in SCAN_ALLOWED or target in materialized or target == "CONSTANT" or target.startswith("("):
+            continue
+        # 요청이 넘긴 키 목록(json_each, 임시 테이블)을 도는 것은 전체 스캔이 아님
+        if "VIRTUAL TABLE" in detail or target.startswith("temp."):
+            continue
+        bad.append(detail)
+    return bad
+
+def build_schema_db() -> sqlite3.Connection:
+    # 빈 임시 DB 에 전체 마이그레이션을 적용해 운영과 같은 스키마/인덱스를 만든다
+    sys.path.insert(0, str(BACKEND_DIR))
+    from migrations import connect, migrate
+    from jobs import JOB_SCHEMA
+    conn = connect(os.path.join(tempfile.mkdtemp(), "query_plans.db"))
+    migrate(conn, log=None)
+    # 작업 큐는 별도 파일(jobs.db)이지만 문장 검사는 같은 DB 에서
+    for sql in JOB_SCHEMA:
+        conn.execute(sql)
+    return conn
+
+def check(conn: sqlite3.Connection, statements, verbose: bool = False):
+    failures = []
+    for where, sql in statements:
+        if sql is None:
+            failures.append((where, None, [UNEXPANDED]))
+            print(f"FAIL {where}  {UNEXPANDED}")
+            continue
+        if TEMP_TABLE.match(sql):
+            conn.execute(sql)
+            continue
+        plan = explain(conn, sql)
+        bad = [] if SCAN_OK_MARKER in sql else full_scans(plan)
+        if bad:
+            failures.append((where, sql, bad))
+        if verbose or bad:
+            print(f"{'FAIL' if bad else 'ok  '} {where}  {sql[:100]}")
+            for detail in plan:
+                print(f"       {detail}")
+    return failures
+
+def main_cli(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    conn = build_schema_db()
+    statements = collect_statements()
+    failures = check(conn, statements, verbose="--verbose" in argv)
+    print(f"{len(statements)}개 문장 검사, 전체 스캔 {len(failures)}건")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,201 @@
+"""
+로그인 시도 제한
+
+키(IP)별로 실패 횟수를 슬라이딩 윈도우 카운터로 센다.
+직전 윈도우 횟수 × (남은 비율) + 현재 윈도우 횟수 가 MAX_LOGIN_ATTEMPTS 이상이면
+BLOCK_DURATION_SECONDS 동안 차단한다. 키마다 (윈도우 시작, 직전 횟수, 현재 횟수, 차단 종료)
+네 값만 두고, 마지막 실패 후 TTL(두 윈도우 또는 차단 종료 중 늦은 쪽)이 지나면 지운다.
+
+저장소 (RATE_LIMIT_BACKEND)
+- memory : 프로세스 메모리. 최대 RATE_LIMIT_MAX_KEYS 개, 넘치면 가장 오래 안 쓰인 키부터 제거
+- sqlite : login_limits 테이블 (마이그레이션 9). 여러 uvicorn 워커가 같은 한도를 공유한다
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException
+
+from db import pool
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")   # memory | sqlite
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+MAX_LOGIN_ATTEMPTS = 5
+LOGIN_WINDOW_SECONDS = 300    # 실패 횟수를 세는 윈도우
+BLOCK_DURATION_SECONDS = 300  # 5분
+
+SWEEP_INTERVAL = 60  # sqlite: 만료 행 정리 주기(초)
+
+# ==============================
+# 슬라이딩 윈도우 카운터
+# ==============================
+
+def advance(state, now: float, window: float, limit: int, block: float):
+    """
+    실패 1회를 반영한 새 상태 (window_start, prev_count, curr_count, blocked_until).
+    state 가 None 이면 처음 보는 키.
+    """
+    start = now - now % window
+    if state is None:
+        prev, curr = 0, 0
+    else:
+        old_start, prev, curr, _ = state
+        if start != old_start:
+            # 바로 앞 윈도우였으면 현재 횟수가 직전 횟수가 되고, 더 오래됐으면 모두 버림
+            prev = curr if start - old_start == window else 0
+            curr = 0
+    curr += 1
+    estimate = prev * (1 - (now - start) / window) + curr
+    if estimate >= limit:
+        # 차단 후에는 횟수를 비워 차단이 끝나면 처음부터 다시 센다
+        return (start, 0, 0, now + block)
+    return (start, prev, curr, 0.0)
+
+def expires_at(state, window: float) -> float:
+    return max(state[0] + 2 * window, state[3])
+
+# ==============================
+# 저장소
+# ==============================
+
+class MemoryBackend:
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # key -> (만료 시각, state), 마지막 갱신 순
+        self.evictions = 0
+
+    def _sweep(self, now: float):
+        # 앞쪽이 가장 오래 갱신 안 된 키. 만료 시각이 지난 것만 앞에서부터 제거
+        while self._items:
+            key, (exp, _) = next(iter(self._items.items()))
+            if exp > now:
+                break
+            del self._items[key]
+
+    def blocked_until(self, key: str, now: float) -> float:
+        with self._lock:
+            item = self._items.get(key)
+            return item[1][3] if item and item[0] > now else 0.0
+
+    def hit(self, key: str, now: float, window: float, limit: int, block: float):
+        with self._lock:
+            self._sweep(now)
+            item = self._items.pop(key, None)
+            state = advance(item[1] if item and item[0] > now else None, now, window, limit, block)
+            self._items[key] = (expires_at(state, window), state)
+            while len(self._items) > self.max_keys:
+                self._items.popitem(last=False)
+                self.evictions += 1
+            return state
+
+    def reset(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "keys": len(self._items), "max_keys": self.max_keys, "evictions": self.evictions}
+
+
+class SqliteBackend:
+    def __init__(self, pool=pool):
+        self.pool = pool
+        self._next_sweep = 0.0
+
+    def blocked_until(self, key: str, now: float) -> float:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT blocked_until FROM login_limits WHERE key=? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+        return row[0] if row else 0.0
+
+    def hit(self, key: str, now: float, window: float, limit: int, block: float):
+        with self.pool.connection() as conn:
+            # 읽고-쓰기를 다른 프로세스와 겹치지 않게 쓰기 잠금을 먼저 잡는다
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT window_start, prev_count, curr_count, blocked_until FROM login_limits "
+                "WHERE key=? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+            state = advance(tuple(row) if row else None, now, window, limit, block)
+            conn.execute(
+                """
+                INSERT INTO login_limits (key, window_start, prev_count, curr_count, blocked_until, expires_at)
+                VALUES (?,?,?,?,?,?)
+                ON CONFLICT(key) DO UPDATE SET
+                    window_start = excluded.window_start,
+                    prev_count = excluded.prev_count,
+                    curr_count = excluded.curr_count,
+                    blocked_until = excluded.blocked_until,
+                    expires_at = excluded.expires_at
+                """,
+                (key, *state, expires_at(state, window))
+            )
+            if now >= self._next_sweep:
+                self._next_sweep = now + SWEEP_INTERVAL
+                conn.execute("DELETE FROM login_limits WHERE expires_at <= ?", (now,))
+            conn.commit()
+        return state
+
+    def reset(self, key: str):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM login_limits WHERE key=?", (key,))
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM login_limits WHERE expires_at > ?", (time.time(),)
+            ).fetchone()
+        return {"backend": "sqlite", "keys": row[0]}
+
+# ==============================
+# 제한기
+# ==============================
+
+class RateLimiter:
+    def __init__(self, backend, limit: int = MAX_LOGIN_ATTEMPTS,
+                 window: float = LOGIN_WINDOW_SECONDS, block: float = BLOCK_DURATION_SECONDS):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        self.block = block
+
+    def check(self, key: str):
+        now = time.time()
+        until = self.backend.blocked_until(key, now)
+        if until > now:
+            raise HTTPException(
+                status_code=429,
+                detail="로그인 시도가 너무 많습니다. 잠시 후 다시 시도해주세요.",
+                headers={"Retry-After": str(int(until - now) + 1)}
+            )
+
+    def hit(self, key: str):
+        self.backend.hit(key, time.time(), self.window, self.limit, self.block)
+
+    def reset(self, key: str):
+        self.backend.reset(key)
+
+    def stats(self) -> dict:
+        return {
+            **self.backend.stats(),
+            "limit": self.limit,
+            "window": self.window,
+            "block": self.block,
+        }
+
+
+def make_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SqliteBackend()
+    raise ValueError(f"알 수 없는 RATE_LIMIT_BACKEND: {name}")
+
+login_limiter = RateLimiter(make_backend())
@@ -0,0 +1,137 @@
+"""
+직무 설정 변경 시 근무 기록 재계산
+
+job_settings 의 시급(hourly_wage)이나 강도(intensity)가 바뀌면 이미 저장된 work_logs 의
+total_pay / intensity / score 를 기간 단위로 한 번에 다시 계산한다.
+행마다 calc_pay 를 부르지 않고 야간 판정(calc_pay, ingest.night_mask 와 같은 규칙)을 SQL 식으로 옮겨
+UPDATE 한 문장으로 처리한다. night_hours 는 시간대와 근무시간으로만 정해지므로 그대로다.
+
+집계 테이블은 같은 트랜잭션에서, work_logs 를 바꾸기 전에 (새 값 - 이전 값)을 그룹별로 합산해 더한다.
+건수/근무시간/근무일수는 변하지 않으므로 금액·점수·강도 합계만 움직인다.
+- rollup_location_month : score_sum, score_count
+- rollup_worker_day / rollup_worker_month : pay_sum
+- rollup_fatigue_day : load_sum, intensity_sum, intensity_count
+
+모든 문장이 idx_logs_job_date (job_name, work_date) 범위만 읽는다.
+"""
+import time
+
+# 기간을 주지 않으면 전체 (prefix_range 와 같은 방식의 열린 범위)
+DATE_MIN = ""
+DATE_MAX = "\uffff"
+
+# 새 total_pay: calc_pay 와 같은 계산 순서 (근무시간 × 시급 × 야간 1.5배, 소수점 버림)
+# 새 score: 강도 × 근무시간 × 10
+
+LOCATION_MONTH_DELTA = """
+    UPDATE rollup_location_month AS r SET
+        score_sum = r.score_sum + d.score_delta,
+        score_count = r.score_count + d.count_delta
+    FROM (
+        SELECT worker_type, substr(work_date, 1, 7) AS month, location,
+               TOTAL(:intensity * work_hours * 10) - TOTAL(score) AS score_delta,
+               COUNT(:intensity * work_hours * 10) - COUNT(score) AS count_delta
+        FROM work_logs
+        WHERE job_name = :job AND work_date >= :date_from AND work_date <= :date_to
+          AND (:worker_type IS NULL OR worker_type = :worker_type)
+          AND work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+          AND worker_type IS NOT NULL AND location IS NOT NULL
+        GROUP BY 1, 2, 3
+    ) AS d
+    WHERE r.worker_type = d.worker_type AND r.month = d.month AND r.location = d.location
+"""
+
+WORKER_DAY_DELTA = """
+    UPDATE rollup_worker_day AS r SET pay_sum = r.pay_sum + d.pay_delta
+    FROM (
+        SELECT worker_type, location, name, work_date,
+               SUM(COALESCE(CAST(work_hours * :wage * (CASE
+                   WHEN (instr(time_slot, '18:00~02:00') > 0 AND instr(time_slot, '(후반)') > 0)
+                     OR (instr(time_slot, '02:00~10:00') > 0 AND instr(time_slot, '(전반)') > 0)
+                   THEN 1.5 ELSE 1.0 END) AS INTEGER), 0) - COALESCE(total_pay, 0)) AS pay_delta
+        FROM work_logs
+        WHERE job_name = :job AND work_date >= :date_from AND work_date <= :date_to
+          AND (:worker_type IS NULL OR worker_type = :worker_type)
+          AND work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+          AND worker_type IS NOT NULL AND location IS NOT NULL AND name IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    ) AS d
+    WHERE r.worker_type = d.worker_type AND r.location = d.location
+      AND r.name = d.name AND r.work_date = d.work_date
+"""
+
+WORKER_MONTH_DELTA = """
+    UPDATE rollup_worker_month AS r SET pay_sum = r.pay_sum + d.pay_delta
+    FROM (
+        SELECT worker_type, location, substr(work_date, 1, 7) AS month, name,
+               SUM(COALESCE(CAST(work_hours * :wage * (CASE
+                   WHEN (instr(time_slot, '18:00~02:00') > 0 AND instr(time_slot, '(후반)') > 0)
+                     OR (instr(time_slot, '02:00~10:00') > 0 AND instr(time_slot, '(전반)') > 0)
+                   THEN 1.5 ELSE 1.0 END) AS INTEGER), 0) - COALESCE(total_pay, 0)) AS pay_delta
+        FROM work_logs
+        WHERE job_name = :job AND work_date >= :date_from AND work_date <= :date_to
+          AND (:worker_type IS NULL OR worker_type = :worker_type)
+          AND work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+          AND worker_type IS NOT NULL AND location IS NOT NULL AND name IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    ) AS d
+    WHERE r.worker_type = d.worker_type AND r.location = d.location
+      AND r.month = d.month AND r.name = d.name
+"""
+
+FATIGUE_DAY_DELTA = """
+    UPDATE rollup_fatigue_day AS r SET
+        load_sum = r.load_sum + d.load_delta,
+        intensity_sum = r.intensity_sum + d.int_delta,
+        intensity_count = r.intensity_count + d.int_count_delta
+    FROM (
+        SELECT worker_type, work_date, worker_id,
+               TOTAL(COALESCE(work_hours, 0) * :intensity)
+                 - TOTAL(COALESCE(work_hours, 0) * COALESCE(intensity, 0)) AS load_delta,
+               TOTAL(:intensity - COALESCE(intensity, 0)) AS int_delta,
+               COUNT(*) - COUNT(intensity) AS int_count_delta
+        FROM work_logs
+        WHERE job_name = :job AND work_date >= :date_from AND work_date <= :date_to
+          AND (:worker_type IS NULL OR worker_type = :worker_type)
+          AND work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+          AND worker_type IS NOT NULL AND worker_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    ) AS d
+    WHERE r.worker_type = d.worker_type AND r.work_date = d.work_date AND r.worker_id = d.worker_id
+"""
+
+REPRICE_LOGS = """
+    UPDATE work_logs SET
+        total_pay = CAST(work_hours * :wage * (CASE
+            WHEN (instr(time_slot, '18:00~02:00') > 0 AND instr(time_slot, '(후반)') > 0)
+              OR (instr(time_slot, '02:00~10:00') > 0 AND instr(time_slot, '(전반)') > 0)
+            THEN 1.5 ELSE 1.0 END) AS INTEGER),
+        intensity = :intensity,
+        score = :intensity * work_hours * 10
+    WHERE job_name = :job AND work_date >= :date_from AND work_date <= :date_to
+      AND (:worker_type IS NULL OR worker_type = :worker_type)
+"""
+
+ROLLUP_DELTAS = (LOCATION_MONTH_DELTA, WORKER_DAY_DELTA, WORKER_MONTH_DELTA, FATIGUE_DAY_DELTA)
+
+
+def reprice(conn, job_name: str, intensity: float, hourly_wage: int,
+            date_from: str = None, date_to: str = None, worker_type: str = None) -> dict:
+    """
+    job_name 의 근무 기록 중 [date_from, date_to] (없으면 전체) 를 주어진 강도/시급으로 다시 계산한다.
+    커밋은 호출자가 job_settings 변경과 함께 한다.
+    """
+    started = time.perf_counter()
+    params = {
+        "job": job_name,
+        "intensity": float(intensity),
+        "wage": int(hourly_wage),
+        "date_from": date_from or DATE_MIN,
+        "date_to": date_to or DATE_MAX,
+        "worker_type": worker_type,
+    }
+    # 집계는 이전 값이 남아 있을 때 먼저 (새 값 - 이전 값)을 더한다
+    for sql in ROLLUP_DELTAS:
+        conn.execute(sql, params)
+    rows = conn.execute(REPRICE_LOGS, params).rowcount
+    return {"repriced": rows, "elapsed_sec": round(time.perf_counter() - started, 3)}
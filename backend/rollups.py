@@ -0,0 +1,279 @@
+"""
+근무 기록 집계(rollup) 테이블
+
+/analytics 와 정규직 /payroll 이 원본 work_logs 를 매번 GROUP BY 하지 않도록
+(근로형태, 센터, 월) / (근로형태, 센터, 이름, 월) 단위 합계를 미리 유지한다.
+/risk 는 (근로형태, 날짜, worker_id) 단위 피로도 합계(rollup_fatigue_day)를 읽는다.
+업로드·수정 경로가 같은 트랜잭션 안에서 apply_log_delta() 로 증감분을 반영하고,
+값이 어긋났을 때는 rebuild 로 원본에서 다시 계산한다.
+
+    python rollups.py --rebuild [--db PATH]
+"""
+import sys
+from collections import defaultdict
+
+import pandas as pd
+
+from ingest import frame_rows
+
+# 집계에 필요한 work_logs 컬럼
+ROLLUP_COLUMNS = (
+    'worker_type', 'location', 'name', 'work_date', 'work_hours', 'night_hours',
+    'total_pay', 'intensity', 'score', 'worker_id'
+)
+
+# 피로도 집계에 필요한 컬럼
+FATIGUE_COLUMNS = ('worker_type', 'work_date', 'worker_id', 'work_hours', 'night_hours', 'intensity')
+
+# 'YYYY-MM-DD' 형태의 날짜만 월 집계에 포함 (SQL 쪽 GLOB 과 같은 규칙)
+DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}'
+
+UPSERT_LOCATION_MONTH = """
+    INSERT INTO rollup_location_month (worker_type, month, location, log_count, score_sum, score_count)
+    VALUES (?,?,?,?,?,?)
+    ON CONFLICT (worker_type, month, location) DO UPDATE SET
+        log_count = log_count + excluded.log_count,
+        score_sum = score_sum + excluded.score_sum,
+        score_count = score_count + excluded.score_count
+"""
+
+UPSERT_WORKER_DAY = """
+    INSERT INTO rollup_worker_day (worker_type, location, name, work_date, log_count, hours_sum, pay_sum)
+    VALUES (?,?,?,?,?,?,?)
+    ON CONFLICT (worker_type, location, name, work_date) DO UPDATE SET
+        log_count = log_count + excluded.log_count,
+        hours_sum = hours_sum + excluded.hours_sum,
+        pay_sum = pay_sum + excluded.pay_sum
+    RETURNING log_count
+"""
+
+UPSERT_WORKER_MONTH = """
+    INSERT INTO rollup_worker_month (worker_type, location, month, name, days, log_count, hours_sum, pay_sum)
+    VALUES (?,?,?,?,?,?,?,?)
+    ON CONFLICT (worker_type, location, month, name) DO UPDATE SET
+        days = days + excluded.days,
+        log_count = log_count + excluded.log_count,
+        hours_sum = hours_sum + excluded.hours_sum,
+        pay_sum = pay_sum + excluded.pay_sum
+"""
+
+UPSERT_FATIGUE_DAY = """
+    INSERT INTO rollup_fatigue_day (worker_type, work_date, worker_id, log_count, hours_sum,
+                                    load_sum, night_sum, intensity_sum, intensity_count)
+    VALUES (?,?,?,?,?,?,?,?,?)
+    ON CONFLICT (worker_type, work_date, worker_id) DO UPDATE SET
+        log_count = log_count + excluded.log_count,
+        hours_sum = hours_sum + excluded.hours_sum,
+        load_sum = load_sum + excluded.load_sum,
+        night_sum = night_sum + excluded.night_sum,
+        intensity_sum = intensity_sum + excluded.intensity_sum,
+        intensity_count = intensity_count + excluded.intensity_count
+"""
+
+# ==============================
+# 증감 반영
+# ==============================
+
+def month_of(dates: pd.Series) -> pd.Series:
+    s = dates.astype(str)
+    return s.str.slice(0, 7).where(s.str.match(DATE_PATTERN))
+
+def apply_log_delta(conn, frame: pd.DataFrame, weight=1):
+    """
+    work_logs 행 묶음(frame)을 집계 테이블에 더한다. weight=-1 이면 뺀다.
+    weight 에 배열을 주면 행마다 부호를 다르게 줄 수 있다 (수정 = 이전 값 -1, 새 값 +1).
+    커밋은 호출자가 원본 변경과 함께 한다.
+    """
+    df = frame.loc[:, list(ROLLUP_COLUMNS)].copy()
+    df['w'] = weight
+    df['month'] = month_of(df['work_date'])
+    df = df[df['month'].notna()]
+    if df.empty:
+        return
+
+    df['score_w'] = df['score'].fillna(0) * df['w']
+    df['score_n'] = df['score'].notna().astype(int) * df['w']
+    df['hours_w'] = df['work_hours'].fillna(0) * df['w']
+    df['pay_w'] = df['total_pay'].fillna(0).astype('int64') * df['w']
+    removing = bool((df['w'] < 0).any())
+
+    # 1) 센터·월
+    loc = (
+        df.groupby(['worker_type', 'month', 'location'], sort=False)[['w', 'score_w', 'score_n']]
+        .sum().reset_index()
+    )
+    conn.executemany(
+        UPSERT_LOCATION_MONTH,
+        frame_rows(loc, ('worker_type', 'month', 'location', 'w', 'score_w', 'score_n'))
+    )
+    if removing:
+        conn.executemany(
+            "DELETE FROM rollup_location_month "
+            "WHERE worker_type=? AND month=? AND location=? AND log_count <= 0",
+            frame_rows(loc, ('worker_type', 'month', 'location'))
+        )
+
+    # 2) 근로자·일 (월 근무일수 증감을 알아내기 위해 필요)
+    day = (
+        df.groupby(['worker_type', 'location', 'name', 'work_date', 'month'], sort=False)[['w', 'hours_w', 'pay_w']]
+        .sum().reset_index()
+    )
+    day_delta = defaultdict(int)
+    for wt, location, name, work_date, month, cnt, hours, pay in frame_rows(
+        day, ('worker_type', 'location', 'name', 'work_date', 'month', 'w', 'hours_w', 'pay_w')
+    ):
+        new = conn.execute(UPSERT_WORKER_DAY, (wt, location, name, work_date, cnt, hours, pay)).fetchone()[0]
+        old = new - cnt
+        if old <= 0 < new:
+            day_delta[(wt, location, month, name)] += 1
+        elif new <= 0 < old:
+            day_delta[(wt, location, month, name)] -= 1
+            conn.execute(
+                "DELETE FROM rollup_worker_day "
+                "WHERE worker_type=? AND location=? AND name=? AND work_date=?",
+                (wt, location, name, work_date)
+            )
+
+    # 3) 근로자·월
+    mon = (
+        df.groupby(['worker_type', 'location', 'month', 'name'], sort=False)[['w', 'hours_w', 'pay_w']]
+        .sum().reset_index()
+    )
+    keys = frame_rows(mon, ('worker_type', 'location', 'month', 'name'))
+    conn.executemany(
+        UPSERT_WORKER_MONTH,
+        [
+            (*key, day_delta.get(key, 0), cnt, hours, pay)
+            for key, cnt, hours, pay in zip(keys, *(mon[c].tolist() for c in ('w', 'hours_w', 'pay_w')))
+        ]
+    )
+    if removing:
+        conn.executemany(
+            "DELETE FROM rollup_worker_month "
+            "WHERE worker_type=? AND location=? AND month=? AND name=? AND log_count <= 0",
+            keys
+        )
+
+    apply_fatigue_delta(conn, frame, weight)
+
+def apply_fatigue_delta(conn, frame: pd.DataFrame, weight=1):
+    """
+    근로자·일 피로도 (센터 구분 없이 worker_id 단위, 부하 = 근무시간 × 강도).
+    명단에 연결되지 않은(worker_id 없는) 행은 제외한다.
+    """
+    df = frame.loc[:, list(FATIGUE_COLUMNS)].copy()
+    df['w'] = weight
+    df = df[month_of(df['work_date']).notna() & df['worker_id'].notna()]
+    if df.empty:
+        return
+
+    df['hours_w'] = df['work_hours'].fillna(0) * df['w']
+    df['load_w'] = (df['work_hours'].fillna(0) * df['intensity'].fillna(0)) * df['w']
+    df['night_w'] = df['night_hours'].fillna(0) * df['w']
+    df['int_w'] = df['intensity'].fillna(0) * df['w']
+    df['int_n'] = df['intensity'].notna().astype(int) * df['w']
+    fat = (
+        df.groupby(['worker_type', 'work_date', 'worker_id'], sort=False)
+        [['w', 'hours_w', 'load_w', 'night_w', 'int_w', 'int_n']]
+        .sum().reset_index()
+    )
+    fat['worker_id'] = fat['worker_id'].astype('int64')
+    conn.executemany(
+        UPSERT_FATIGUE_DAY,
+        frame_rows(fat, ('worker_type', 'work_date', 'worker_id', 'w', 'hours_w', 'load_w', 'night_w', 'int_w', 'int_n'))
+    )
+    if bool((df['w'] < 0).any()):
+        conn.executemany(
+            "DELETE FROM rollup_fatigue_day "
+            "WHERE worker_type=? AND work_date=? AND worker_id=? AND log_count <= 0",
+            frame_rows(fat, ('worker_type', 'work_date', 'worker_id'))
+        )
+
+# ==============================
+# 전체 재계산
+# ==============================
+
+def rebuild(conn):
+    # 트랜잭션은 호출자가 관리 (CLI --rebuild; 마이그레이션은 배포 당시 SQL 을 따로 고정해 둠)
+    rebuild_monthly(conn)
+    rebuild_fatigue(conn)
+
+def rebuild_monthly(conn):
+    conn.execute("DELETE FROM rollup_location_month")
+    conn.execute("DELETE FROM rollup_worker_day")
+    conn.execute("DELETE FROM rollup_worker_month")
+
+    conn.execute("""
+        INSERT INTO rollup_location_month (worker_type, month, location, log_count, score_sum, score_count)
+        SELECT worker_type, substr(work_date, 1, 7), location, COUNT(*), TOTAL(score), COUNT(score)
+        FROM work_logs /* scan-ok: 전체 재계산 */
+        WHERE work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+          AND worker_type IS NOT NULL AND location IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+    conn.execute("""
+        INSERT INTO rollup_worker_day (worker_type, location, name, work_date, log_count, hours_sum, pay_sum)
+        SELECT worker_type, location, name, work_date, COUNT(*), TOTAL(work_hours), COALESCE(SUM(total_pay), 0)
+        FROM work_logs /* scan-ok: 전체 재계산 */
+        WHERE work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+          AND worker_type IS NOT NULL AND location IS NOT NULL AND name IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """)
+    conn.execute("""
+        INSERT INTO rollup_worker_month (worker_type, location, month, name, days, log_count, hours_sum, pay_sum)
+        SELECT worker_type, location, substr(work_date, 1, 7), name,
+               COUNT(*), SUM(log_count), TOTAL(hours_sum), SUM(pay_sum)
+        FROM rollup_worker_day /* scan-ok: 전체 재계산 */
+        GROUP BY 1, 2, 3, 4
+    """)
+
+def rebuild_fatigue(conn):
+    conn.execute("DELETE FROM rollup_fatigue_day")
+    conn.execute("""
+        INSERT INTO rollup_fatigue_day (worker_type, work_date, worker_id, log_count, hours_sum,
+                                        load_sum, night_sum, intensity_sum, intensity_count)
+        SELECT worker_type, work_date, worker_id, COUNT(*), TOTAL(work_hours),
+               TOTAL(work_hours * intensity), TOTAL(night_hours), TOTAL(intensity), COUNT(intensity)
+        FROM work_logs /* scan-ok: 전체 재계산 */
+        WHERE work_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+          AND worker_type IS NOT NULL AND worker_id IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+# ==============================
+# CLI
+# ==============================
+
+def main_cli(argv=None):
+    from cache import record_write
+    from db import DB_PATH
+    from migrations import connect
+
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[argv.index("--db") + 1] if "--db" in argv else DB_PATH
+    if "--rebuild" not in argv:
+        print(__doc__)
+        return 1
+
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rebuild(conn)
+            record_write(conn, "work_logs")  # 실행 중인 서버의 집계 응답 캐시 무효화
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        counts = {
+            rollup: conn.execute(f"SELECT count(*) FROM {rollup} /* scan-ok: CLI 결과 출력 */").fetchone()[0]
+            for rollup in ("rollup_location_month", "rollup_worker_month", "rollup_fatigue_day")
+        }
+    finally:
+        conn.close()
+    print(f"{path}: rollup 재계산 완료 {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
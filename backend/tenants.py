@@ -0,0 +1,276 @@
+"""
+회사(company_code)별 DB 분리
+
+TENANT_MODE=shared : 모든 회사가 DB_PATH 하나를 쓴다 (분리 전 동작).
+TENANT_MODE=routed : 회사마다 TENANT_DB_DIR/<company_code>.db 파일과 커넥션 풀, 응답 캐시를 따로 둔다.
+                     준비(provision/split)되지 않은 회사의 요청은 403.
+계정(accounts)과 로그인 시도 제한(login_limits)은 로그인 시점에 회사 DB 를 모르므로 항상 DB_PATH 에 있다.
+
+파일이 나뉘어 있으므로 한 회사의 대용량 업로드가 잡는 쓰기 잠금, 페이지 캐시, 응답 캐시 LRU 가
+다른 회사에 영향을 주지 않는다. 회사별 풀 크기(TENANT_POOL_SIZE)는 DB 작업 풀(DB_WORKERS)보다 작게 두어
+한 회사의 요청이 DB 작업 스레드를 전부 차지하지 못하게 한다.
+
+    python tenants.py provision CODE [CODE ...]   # 빈 회사 DB 생성 (기본 직무 포함)
+    python tenants.py split [--owner CODE ...]    # 공용 DB 를 회사별 파일로 분리 (--owner 회사만 기존 데이터, 나머지는 빈 DB)
+    python tenants.py split --copy-all            # 모든 회사가 기존 데이터 사본을 받음 (회사 간 데이터 공유 주의)
+    python tenants.py migrate                     # 모든 회사 DB 에 미적용 마이그레이션 실행
+    python tenants.py status
+"""
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+from fastapi import HTTPException
+
+from cache import DataVersions, ResponseCache
+from db import DB_PATH, DB_POOL_SIZE, ConnectionPool, pool
+from migrations import connect, current_version, migrate_path
+
+# ==============================
+# 설정 / 상수
+# ==============================
+
+TENANT_MODE = os.getenv("TENANT_MODE", "shared")  # shared | routed
+TENANT_DB_DIR = os.getenv("TENANT_DB_DIR", "tenants")
+TENANT_POOL_SIZE = int(os.getenv("TENANT_POOL_SIZE", str(max(2, DB_POOL_SIZE // 2))))  # 회사당 커넥션 수
+# 백그라운드 작업 스레드마다 하나 (jobs.JOB_WORKERS 와 같은 설정값)
+JOB_POOL_SIZE = max(1, int(os.getenv("JOB_WORKERS", "1")))
+
+SHARED_CODE = "shared"
+CODE_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}")  # 파일 이름으로 쓰므로 제한
+
+# 회사 DB 에 남기지 않는 공용 테이블 (split 복사본에서 비움)
+SHARED_ONLY_TABLES = ("accounts", "login_limits", "revoked_tokens", "revoked_users")
+
+
+class Tenant:
+    """회사 하나의 DB 파일 / 요청용·작업용 커넥션 풀 / 데이터 버전 / 응답 캐시"""
+
+    def __init__(self, code: str, path: str, pool: ConnectionPool = None,
+                 versions: DataVersions = None, responses: ResponseCache = None):
+        self.code = code
+        self.path = path
+        self.pool = pool or ConnectionPool(path, TENANT_POOL_SIZE)
+        self.versions = versions or DataVersions(path=path)
+        self.responses = responses or ResponseCache()
+        self._job_pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def job_pool(self) -> ConnectionPool:
+        # 작업 스레드 전용 커넥션 (요청 풀과 따로, 처음 쓸 때 생성)
+        with self._lock:
+            if self._job_pool is None:
+                self._job_pool = ConnectionPool(self.path, JOB_POOL_SIZE)
+            return self._job_pool
+
+    def close(self):
+        self.pool.close_all()
+        self.versions.close()
+        with self._lock:
+            if self._job_pool is not None:
+                self._job_pool.close_all()
+
+    def stats(self) -> dict:
+        # 커넥션 풀 현황 (캐시는 cache.cache_stats)
+        stats = {"db": self.pool.stats()}
+        if self._job_pool is not None:
+            stats["jobs"] = self._job_pool.stats()
+        return stats
+
+# ==============================
+# 라우터
+# ==============================
+
+def tenant_path(code: str, directory: str = TENANT_DB_DIR) -> str:
+    if not CODE_PATTERN.fullmatch(code or ""):
+        raise ValueError(f"회사 코드 형식이 올바르지 않습니다: {code!r}")
+    return os.path.join(directory, f"{code}.db")
+
+class TenantRouter:
+    def __init__(self, mode: str = TENANT_MODE, directory: str = TENANT_DB_DIR):
+        if mode not in ("shared", "routed"):
+            raise ValueError(f"TENANT_MODE 는 shared, routed 중 하나입니다: {mode!r}")
+        self.mode = mode
+        self.directory = directory
+        self.shared = Tenant(SHARED_CODE, DB_PATH, pool=pool)
+        self._tenants = {}
+        self._lock = threading.Lock()
+
+    def get(self, company_code: str) -> Tenant:
+        if self.mode == "shared":
+            return self.shared
+        tenant = self._tenants.get(company_code)
+        if tenant is not None:
+            return tenant
+        try:
+            path = tenant_path(company_code, self.directory)
+        except ValueError:
+            raise HTTPException(status_code=403, detail="회사 코드가 올바르지 않습니다.")
+        # 없는 파일에 connect 하면 빈 DB 가 만들어지므로 준비된 회사만 연다 (없으면 매번 다시 확인)
+        if not os.path.exists(path):
+            raise HTTPException(status_code=403, detail="회사 DB가 준비되지 않았습니다. 관리자에게 문의하세요.")
+        with self._lock:
+            tenant = self._tenants.get(company_code)
+            if tenant is None:
+                tenant = self._tenants[company_code] = Tenant(company_code, path)
+        return tenant
+
+    def opened(self) -> list:
+        # 이 프로세스에서 연 회사들 (shared 모드는 공용 하나)
+        if self.mode == "shared":
+            return [self.shared]
+        with self._lock:
+            return list(self._tenants.values())
+
+    def migrate_all(self, log=print) -> dict:
+        if self.mode == "shared":
+            return {}
+        return {code: migrate_path(tenant_path(code, self.directory), log=log) for code in self.codes()}
+
+    def codes(self) -> list:
+        # 준비된 회사 코드 (디렉터리의 *.db)
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name[:-3] for name in os.listdir(self.directory)
+            if name.endswith(".db") and CODE_PATTERN.fullmatch(name[:-3])
+        )
+
+    def close_all(self):
+        for tenant in self.opened():
+            tenant.close()
+        with self._lock:
+            self._tenants.clear()
+
+    def stats(self, tenant: Tenant) -> dict:
+        # 다른 회사 코드가 드러나지 않게 열린 회사는 개수만, 상세는 요청한 회사 것만
+        return {"mode": self.mode, "opened": len(self.opened()), "tenants": {tenant.code: tenant.stats()}}
+
+
+tenants = TenantRouter()
+
+# ==============================
+# 준비 / 분리
+# ==============================
+
+def _clear_shared_tables(path: str):
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for table in SHARED_ONLY_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+def _remove_part(tmp: str):
+    # 중단된 이전 실행이 남긴 임시 파일
+    for path in (tmp, tmp + "-wal", tmp + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def provision(code: str, directory: str = TENANT_DB_DIR, log=print) -> bool:
+    """빈 회사 DB 를 만든다 (전체 마이그레이션 + 기본 직무). 이미 있으면 False."""
+    path = tenant_path(code, directory)
+    if os.path.exists(path):
+        return False
+    os.makedirs(directory, exist_ok=True)
+    tmp = path + ".part"
+    _remove_part(tmp)
+    migrate_path(tmp, log=None)
+    _clear_shared_tables(tmp)  # 데모 계정 시드는 공용 DB 에만
+    os.replace(tmp, path)
+    if log:
+        log(f"[tenant] {code}: 생성 ({path})")
+    return True
+
+def split(shared_path: str = DB_PATH, owners=None, directory: str = TENANT_DB_DIR, log=print,
+          copy_all: bool = False) -> dict:
+    """
+    공용 DB 를 회사별 파일로 나눈다. 회사 목록은 공용 DB 의 accounts 에서 읽는다.
+    workers/work_logs 에는 회사 구분 컬럼이 없으므로 기존 데이터를 누가 가질지는 정할 수 없다.
+    - 기본: owners 로 지정한 회사만 기존 데이터 사본을 받고 나머지(owners 가 없으면 전부)는 빈 DB 로 시작한다.
+    - copy_all=True: 모든 회사가 사본을 받는다. 다른 회사의 명단/기록이 그대로 보이므로
+      공용 DB 를 실제로 함께 쓰던 회사들만 있을 때 명시적으로 쓴다.
+    이미 파일이 있는 회사는 건너뛰므로 다시 실행해도 된다. 공용 DB 의 데이터는 지우지 않는다.
+    """
+    if copy_all and owners:
+        raise ValueError("owners 와 copy_all 은 함께 쓸 수 없습니다.")
+    migrate_path(shared_path, log=log)
+    src = connect(shared_path)
+    try:
+        codes = [r[0] for r in src.execute("SELECT DISTINCT company_code FROM accounts ORDER BY 1")]
+        unknown = set(owners or ()) - set(codes)
+        if unknown:
+            raise ValueError(f"accounts 에 없는 회사 코드: {', '.join(sorted(unknown))}")
+        os.makedirs(directory, exist_ok=True)
+        result = {}
+        for code in codes:
+            path = tenant_path(code, directory)
+            if os.path.exists(path):
+                result[code] = "exists"
+                continue
+            if not copy_all and code not in (owners or ()):
+                provision(code, directory, log=None)
+                result[code] = "empty"
+            else:
+                # 페이지 단위 온라인 복사 (복사 중에도 공용 DB 읽기/쓰기 가능)
+                tmp = path + ".part"
+                _remove_part(tmp)
+                dst = sqlite3.connect(tmp)
+                try:
+                    src.backup(dst)
+                finally:
+                    dst.close()
+                _clear_shared_tables(tmp)
+                os.replace(tmp, path)
+                result[code] = "copied"
+            if log:
+                log(f"[tenant] {code}: {result[code]}")
+        return result
+    finally:
+        src.close()
+
+# ==============================
+# CLI
+# ==============================
+
+def main_cli(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "status"
+    router = TenantRouter("routed")
+
+    if command == "provision":
+        for code in argv[1:]:
+            if not provision(code):
+                print(f"[tenant] {code}: 이미 있음")
+    elif command == "split":
+        owners = [argv[i + 1] for i, a in enumerate(argv) if a == "--owner" and i + 1 < len(argv)]
+        try:
+            split(owners=owners or None, copy_all="--copy-all" in argv)
+        except ValueError as e:
+            print(f"[tenant] {e}")
+            return 2
+    elif command == "migrate":
+        for code, version in router.migrate_all().items():
+            print(f"{code}: schema version {version}")
+    elif command == "status":
+        for code in router.codes():
+            conn = connect(tenant_path(code))
+            try:
+                version = current_version(conn)
+            finally:
+                conn.close()
+            size = os.path.getsize(tenant_path(code))
+            print(f"{code:<20} v{version:03d} {size / (1024 * 1024):8.1f}MB")
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
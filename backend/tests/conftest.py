@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# 모듈이 임포트 시점에 경로 설정을 읽으므로 먼저 임시 디렉터리로
+_tmp = tempfile.mkdtemp(prefix="wg-test-")
+os.environ.setdefault("DB_PATH", os.path.join(_tmp, "test.db"))
+os.environ.setdefault("JOB_DIR", os.path.join(_tmp, "jobs"))
+os.environ.setdefault("TENANT_DB_DIR", os.path.join(_tmp, "tenants"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
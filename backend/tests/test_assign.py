@@ -0,0 +1,63 @@
+import random
+
+from assign import DAILY_RATIOS, HEAVY_INTENSITY, eligible, plan
+
+# migrations m002 의 기본 직무
+JOBS = {
+    '상하차':   {'intensity': 1.9, 'ratio': 20, 'required_cert': None},
+    '포장':     {'intensity': 1.0, 'ratio': 20, 'required_cert': None},
+    '재고관리': {'intensity': 0.8, 'ratio': 20, 'required_cert': None},
+    '특수용접': {'intensity': 1.7, 'ratio': 10, 'required_cert': '용접기능사'},
+    '전기설비': {'intensity': 1.5, 'ratio': 10, 'required_cert': '전기기사'},
+    '지게차':   {'intensity': 1.4, 'ratio': 20, 'required_cert': '지게차면허'},
+}
+
+
+def workforce(n, seed=7):
+    # 7일 부하가 사람마다 크게 다른 실제 분포 (0 ~ 100점대)
+    rng = random.Random(seed)
+    certs = [rng.choice([None, None, '용접기능사', '전기기사', '지게차면허', '용접기능사,지게차면허']) for _ in range(n)]
+    loads = [round(rng.lognormvariate(3.0, 0.8), 1) for _ in range(n)]
+    return certs, loads
+
+
+def heavy_slots(assigned):
+    return [sum(1 for j in jobs if j and JOBS[j]['intensity'] >= HEAVY_INTENSITY) for jobs in assigned]
+
+
+def test_daily_no_one_gets_two_heavy_slots():
+    certs, loads = workforce(2000)
+    assigned, _, shortfalls = plan(certs, JOBS, DAILY_RATIOS, loads, seed=1)
+    counts = heavy_slots(assigned)
+    # 고강도(상하차) 40% 씩 두 칸 = 80% 인원이 한 칸씩 받으면 충분
+    assert max(counts) == 1
+    assert sum(counts) == 2 * 800
+    assert not any(shortfalls)
+
+
+def test_regular_heavy_slots_spread_with_cert_jobs():
+    certs, loads = workforce(2000)
+    ratios = {j: v['ratio'] for j, v in JOBS.items()}
+    assigned, targets, shortfalls = plan(certs, JOBS, ratios, loads, seed=1)
+    counts = heavy_slots(assigned)
+    assert not any(shortfalls)
+    # 자격증 고강도 직무는 매 칸 자격자 중에서만 뽑으므로 2 × 목표 - 자격자 수 만큼은 두 번 받을 수밖에 없다
+    forced = sum(
+        max(0, 2 * targets[j] - sum(1 for c in certs if eligible(c, v['required_cert'])))
+        for j, v in JOBS.items() if v['required_cert'] and v['intensity'] >= HEAVY_INTENSITY
+    )
+    assert forced > 0
+    assert sum(1 for c in counts if c == 2) == forced
+    # 각 칸의 직무별 인원은 목표대로
+    for slot in range(2):
+        for job, target in targets.items():
+            assert sum(1 for a in assigned if a[slot] == job) == target
+
+
+def test_heavy_slots_go_to_least_loaded_first():
+    certs, loads = workforce(2000)
+    assigned, _, _ = plan(certs, JOBS, DAILY_RATIOS, loads, seed=1)
+    counts = heavy_slots(assigned)
+    rested = sorted(range(2000), key=loads.__getitem__)[:200]
+    tired = sorted(range(2000), key=loads.__getitem__)[-200:]
+    assert sum(counts[i] for i in rested) > sum(counts[i] for i in tired)
@@ -0,0 +1,124 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import rollups
+from cache import DataVersions, make_etag, record_write, refresh_versions
+from db import DB_PATH
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as cl:
+        yield cl
+
+
+@pytest.fixture
+def headers(client):
+    r = client.post("/auth/login", json={"code": "WMS01", "username": "admin", "key": "1234"})
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    # 간격 없이 매번 data_versions 확인
+    versions = main.tenants.get("WMS01").versions
+    monkeypatch.setattr(versions, "interval", 0)
+    return versions
+
+
+def other_process_write(sql, params, *tables):
+    # 다른 워커 프로세스 / CLI 처럼 별도 커넥션으로 쓰기 (이 프로세스의 bump 없음)
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.execute(sql, params)
+        record_write(conn, *tables)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_other_process_write_invalidates_cache(client, headers, versions):
+    before = client.get("/settings", headers=headers).json()
+    wage = {r["job_name"]: r["hourly_wage"] for r in before}["포장"]
+    other_process_write("UPDATE job_settings SET hourly_wage=? WHERE job_name='포장'", (wage + 1,), "job_settings")
+    after = client.get("/settings", headers=headers).json()
+    assert {r["job_name"]: r["hourly_wage"] for r in after}["포장"] == wage + 1
+
+
+def test_other_process_write_changes_etag(client, headers, versions):
+    r = client.get("/analytics?type=REGULAR", headers=headers)
+    etag = r.headers["etag"]
+    assert client.get("/analytics?type=REGULAR", headers={**headers, "If-None-Match": etag}).status_code == 304
+    other_process_write("DELETE FROM work_logs WHERE id < 0", (), "work_logs")
+    r = client.get("/analytics?type=REGULAR", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
+def test_rollup_rebuild_cli_bumps_version(versions):
+    versions.refresh()
+    before = versions.snapshot(("work_logs",))
+    assert rollups.main_cli(["--rebuild", "--db", DB_PATH]) == 0
+    versions.refresh()
+    assert versions.snapshot(("work_logs",)) != before
+
+
+def test_version_check_is_throttled(monkeypatch):
+    versions = main.tenants.get("WMS01").versions
+    monkeypatch.setattr(versions, "interval", 3600)
+    asyncio.run(refresh_versions(versions))
+    before = versions.snapshot(("job_settings",))
+    other_process_write("UPDATE job_settings SET ratio=ratio WHERE 0", (), "job_settings")
+    asyncio.run(refresh_versions(versions))
+    assert versions.snapshot(("job_settings",)) == before
+
+
+def test_lookup_does_not_read_db():
+    # 요청 경로의 snapshot/shared 는 메모리 값만, DB 읽기는 refresh (작업 스레드) 에서만
+    versions = DataVersions(path=DB_PATH)
+    try:
+        assert versions.shared(("work_logs",)) is None
+        assert versions.snapshot(("work_logs",)) == ((0, 0),)
+        assert versions._conn is None
+        assert versions.due() and not versions.due()
+        versions.refresh()
+        assert versions.shared(("work_logs",))[0] > 0
+    finally:
+        versions.close()
+
+
+def test_etag_is_same_in_every_process(client, headers):
+    # 다른 워커 프로세스 (이 프로세스의 bump 기록 없음) 도 같은 태그를 만든다
+    tenant = main.tenants.get("WMS01")
+    etag = client.get("/analytics?type=REGULAR", headers=headers).headers["etag"]
+    other = SimpleNamespace(code=tenant.code, versions=DataVersions(path=DB_PATH))
+    try:
+        other.versions.refresh()
+        assert make_etag(other, "/analytics", [("type", "REGULAR")], ("work_logs",)) == etag
+    finally:
+        other.versions.close()
+
+
+def test_local_write_changes_etag_immediately(client, headers, monkeypatch):
+    # data_versions 를 다시 읽는 간격과 관계없이 이 프로세스의 쓰기는 다음 요청 태그에 반영
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        log_id = conn.execute(
+            "INSERT INTO work_logs (name, location, job_name, time_slot, work_hours, work_date, worker_type) "
+            "VALUES ('김철수', '서울', '포장', '10:00~18:00', 8, '2025-05-01', 'REGULAR')"
+        ).lastrowid
+        rollups.rebuild(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    monkeypatch.setattr(main.tenants.get("WMS01").versions, "interval", 3600)
+    etag = client.get("/analytics?type=REGULAR", headers=headers).headers["etag"]
+    r = client.post("/edit/log", json={"id": log_id, "job_name": "포장", "work_hours": 4}, headers=headers)
+    assert r.status_code == 200, r.text
+    r = client.get("/analytics?type=REGULAR", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
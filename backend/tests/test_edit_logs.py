@@ -0,0 +1,118 @@
+import shutil
+import sqlite3
+
+import pytest
+
+import main
+import rollups
+from edits import edit_log_rows
+from migrations import connect, migrate
+
+ROLLUP_TABLES = ("rollup_location_month", "rollup_worker_day", "rollup_worker_month", "rollup_fatigue_day")
+
+LOGS = [
+    # name, location, job_name, time_slot, work_hours, work_date, worker_type, worker_id
+    ("김철수", "A센터", "포장", "18:00~02:00 (후반)", 8.0, "2025-03-01", "DAILY", 1),
+    ("김철수", "A센터", "포장", "10:00~18:00", 4.0, "2025-03-01", "DAILY", 1),
+    ("이영희", "B센터", "상하차", "02:00~10:00 (전반)", 6.5, "2025-03-02", "REGULAR", 2),
+    ("박민수", None, "포장", None, 3.0, "2025-03-03", "DAILY", None),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    conn = connect(str(tmp_path / "edit.db"))
+    migrate(conn, log=None)
+    conn.execute("DELETE FROM job_settings")
+    conn.executemany(
+        "INSERT INTO job_settings (job_name, intensity, hourly_wage) VALUES (?,?,?)",
+        [("포장", 1.0, 10000), ("상하차", 1.8, 13000)]
+    )
+    for name, location, job, slot, hours, day, wtype, wid in LOGS:
+        wage, intensity = (10000, 1.0) if job == "포장" else (13000, 1.8)
+        night, pay = main.calc_pay(slot or "", hours, wage)
+        conn.execute(
+            "INSERT INTO work_logs (name, location, job_name, time_slot, work_hours, night_hours, total_pay, "
+            "intensity, score, work_date, worker_type, worker_id) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+            (name, location, job, slot, hours, night, pay, intensity, intensity * hours * 10, day, wtype, wid)
+        )
+    conn.execute("BEGIN IMMEDIATE")
+    rollups.rebuild(conn)
+    conn.execute("COMMIT")
+    yield conn
+    conn.close()
+
+
+def snapshot(conn, tables=ROLLUP_TABLES):
+    return {
+        t: sorted(
+            tuple(round(v, 6) if isinstance(v, float) else v for v in r)
+            for r in conn.execute(f"SELECT * FROM {t}")
+        )
+        for t in tables
+    }
+
+
+def full_rebuild(conn, tmp_path):
+    # 바뀐 work_logs 로 처음부터 다시 계산한 결과 (비교 기준)
+    ref = str(tmp_path / "reference.db")
+    conn.execute("PRAGMA wal_checkpoint(FULL)")
+    shutil.copy(conn.execute("PRAGMA database_list").fetchone()[2], ref)
+    other = sqlite3.connect(ref)
+    try:
+        rollups.rebuild(other)
+        return snapshot(other)
+    finally:
+        other.close()
+
+
+def fatigue(conn, worker_id, day):
+    return conn.execute(
+        "SELECT load_sum, intensity_sum, intensity_count FROM rollup_fatigue_day "
+        "WHERE worker_id = ? AND work_date = ?", (worker_id, day)
+    ).fetchone()
+
+
+def test_edit_log_rows_reports_failures_by_index(db, tmp_path):
+    db.execute("BEGIN IMMEDIATE")
+    result = edit_log_rows(db, [
+        (1, "상하차", 7.0),     # 0: 반영 (직무 변경)
+        (3, "포장", 5.0),       # 1: 반영
+        (1, "포장", 2.0),       # 2: 같은 id 중복
+        (2, "없는직무", 1.0),   # 3: 직무 없음
+        (999, "포장", 1.0),     # 4: 기록 없음
+        (4, "포장", 2.5),       # 5: 반영 (집계 대상 아님)
+        (3, "상하차", 9.0),     # 6: 같은 id 중복
+    ])
+    db.execute("COMMIT")
+
+    assert result["rows"] == 3
+    assert [(f["index"], f["id"]) for f in result["failed"]] == [(2, 1), (3, 2), (4, 999), (6, 3)]
+    details = [f["detail"] for f in result["failed"]]
+    assert details[0] == details[3] == "같은 요청에 이미 있는 기록입니다."
+    assert details[1] == "직무 설정이 존재하지 않습니다."
+    assert details[2] == "근무 기록을 찾을 수 없습니다."
+
+    # 첫 항목만 반영되고 계산은 calc_pay 와 같아야 함
+    row = db.execute(
+        "SELECT job_name, work_hours, night_hours, total_pay, intensity, score FROM work_logs WHERE id = 1"
+    ).fetchone()
+    assert tuple(row) == ("상하차", 7.0, *main.calc_pay("18:00~02:00 (후반)", 7.0, 13000), 1.8, pytest.approx(126.0))
+    # 실패한 항목의 기록은 그대로
+    assert tuple(db.execute("SELECT job_name, work_hours FROM work_logs WHERE id = 2").fetchone()) == ("포장", 4.0)
+
+    assert snapshot(db) == full_rebuild(db, tmp_path)
+
+
+def test_edit_log_rows_moves_fatigue_intensity(db, tmp_path):
+    before = fatigue(db, 1, "2025-03-01")
+    assert before == pytest.approx((8.0 * 1.0 + 4.0 * 1.0, 2.0, 2))
+
+    db.execute("BEGIN IMMEDIATE")
+    result = edit_log_rows(db, [(2, "상하차", 4.0)])
+    db.execute("COMMIT")
+
+    assert result["rows"] == 1 and result["failed"] == []
+    # 직무가 바뀌면 시간이 같아도 강도 부하가 움직임
+    assert fatigue(db, 1, "2025-03-01") == pytest.approx((8.0 * 1.0 + 4.0 * 1.8, 2.8, 2))
+    assert snapshot(db) == full_rebuild(db, tmp_path)
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+import pytest
+
+from executor import BoundedExecutor, ExecutorBusy
+
+
+async def cancel_queued(pool):
+    # 스레드 하나를 막아 두고, 그 뒤에 줄 선 작업을 요청 취소처럼 끊는다
+    release = threading.Event()
+    blocker = asyncio.ensure_future(pool.run(release.wait))
+    while pool.stats()["running"] == 0:
+        await asyncio.sleep(0.01)
+    queued = asyncio.ensure_future(pool.run(lambda: "never"))
+    await asyncio.sleep(0.05)
+    assert pool.stats()["queued"] == 1
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    release.set()
+    await blocker
+
+
+@pytest.mark.parametrize("queue_timeout", [0, 5])
+def test_cancelled_before_start_leaves_queue(queue_timeout):
+    pool = BoundedExecutor("test", 1, queue_timeout=queue_timeout)
+    try:
+        asyncio.run(cancel_queued(pool))
+        stats = pool.stats()
+        assert (stats["queued"], stats["running"], stats["completed"]) == (0, 0, 1)
+    finally:
+        pool.shutdown()
+
+
+def test_queue_timeout_counts_once():
+    pool = BoundedExecutor("test", 1, queue_timeout=0.05)
+
+    async def scenario():
+        release = threading.Event()
+        blocker = asyncio.ensure_future(pool.run(release.wait))
+        while pool.stats()["running"] == 0:
+            await asyncio.sleep(0.01)
+        with pytest.raises(ExecutorBusy):
+            await pool.run(lambda: "never")
+        release.set()
+        await blocker
+
+    try:
+        asyncio.run(scenario())
+        stats = pool.stats()
+        assert (stats["queued"], stats["timed_out"], stats["completed"]) == (0, 1, 1)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,47 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as cl:
+        yield cl
+
+
+def login(cl, username):
+    r = cl.post("/auth/login", json={"code": "WMS01", "username": username, "key": "1234"})
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+@pytest.mark.parametrize("path", ["/health/pools", "/health/cache"])
+def test_health_details_need_admin(client, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=login(client, "staff")).status_code == 403
+    assert client.get(path, headers=login(client, "admin")).status_code == 200
+
+
+def test_health_details_show_own_company_only(client):
+    headers = login(client, "admin")
+    pools = client.get("/health/pools", headers=headers).json()["db"]
+    assert set(pools["tenants"]) == {main.tenants.get("WMS01").code}
+    assert pools["opened"] >= 1
+    caches = client.get("/health/cache", headers=headers).json()["tenants"]
+    assert set(caches) == set(pools["tenants"])
+
+
+def test_health_sql_needs_admin(client):
+    assert client.get("/health/sql").status_code == 401
+    assert client.get("/health/sql", headers=login(client, "staff")).status_code == 403
+    assert "slowest" in client.get("/health/sql", headers=login(client, "admin")).json()
+
+
+def test_metrics_needs_admin_or_scrape_token(client, monkeypatch):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=login(client, "staff")).status_code == 403
+    assert client.get("/metrics", headers=login(client, "admin")).status_code == 200
+
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
@@ -0,0 +1,66 @@
+import io
+import sqlite3
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from db import DB_PATH
+from ingest import compute_log_frame
+
+XL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def logs(hours):
+    return pd.DataFrame({
+        "날짜": "2024-02-01", "이름": [f"숫자검사{i}" for i in range(len(hours))], "근무지": "서울",
+        "직무": "포장", "시간대": "10:00~18:00 (전반)", "근무시간": hours,
+    })
+
+
+def xlsx(df):
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as cl:
+        yield cl
+
+
+@pytest.mark.parametrize("bad, row", [(None, 3), ("여덟", 4), (float("inf"), 2)])
+def test_upload_rejects_non_numeric_hours(client, bad, row):
+    r = client.post("/auth/login", json={"code": "WMS01", "username": "admin", "key": "1234"})
+    headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+    hours = [8, 8, 8]
+    hours[row - 2] = bad
+    r = client.post(
+        "/upload/logs", data={"type": "REGULAR"},
+        files={"file": ("l.xlsx", xlsx(logs(hours)), XL)}, headers=headers
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"].startswith(f"{row}행")
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        assert conn.execute("SELECT count(*) FROM work_logs WHERE name LIKE '숫자검사%'").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_numeric_strings_are_accepted():
+    jobs = pd.DataFrame([("포장", 1.0, 10000)], columns=["job_name", "intensity", "hourly_wage"])
+    frame = compute_log_frame(logs(["8", 4.5]), jobs, "REGULAR")
+    assert frame["total_pay"].tolist() == [80000, 45000]
+
+
+def test_bad_rows_are_counted():
+    jobs = pd.DataFrame([("포장", 1.0, 10000)], columns=["job_name", "intensity", "hourly_wage"])
+    df = logs([8, None, "x"]).set_axis([2, 5, 9])
+    with pytest.raises(HTTPException) as e:
+        compute_log_frame(df, jobs, "REGULAR")
+    assert e.value.status_code == 400
+    assert e.value.detail.startswith("5행 외 1건")
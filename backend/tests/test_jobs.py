@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from jobs import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JobQueue, JobRunner
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / "jobs.db"))
+    yield q
+    q.close()
+
+
+def submit(queue, job_id, company="WMS01"):
+    queue.submit(job_id, "export", {"target": "workers"}, company, "admin")
+    time.sleep(0.002)  # created_at 순서가 겹치지 않도록
+
+
+def expire(queue, job_id):
+    # 작업 프로세스가 종료되어 lease 동안 heartbeat 가 없었던 상태
+    with queue._db().connection() as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at=? WHERE id=?", (time.time() - JOB_LEASE_SECONDS - 1, job_id))
+        conn.commit()
+
+
+def test_stale_running_job_is_requeued_once(queue):
+    submit(queue, "j1")
+    assert queue.claim("dead")["id"] == "j1"
+    expire(queue, "j1")
+
+    assert queue.requeue_stale() == 1
+    assert queue.requeue_stale() == 0
+    job = queue.get("j1")
+    assert (job["status"], job["owner"], job["attempts"]) == ("queued", None, 1)
+
+    # 다시 가져가면 시도 횟수가 늘고, 횟수를 다 쓰면 더 이상 돌리지 않고 실패 처리
+    for attempt in range(2, JOB_MAX_ATTEMPTS + 1):
+        assert queue.claim("dead")["attempts"] == attempt
+        expire(queue, "j1")
+        queue.requeue_stale()
+    assert queue.get("j1")["status"] == "failed"
+    assert queue.claim("alive") is None
+
+
+def test_running_job_with_heartbeat_is_not_requeued(queue):
+    submit(queue, "j1")
+    queue.claim("alive")
+    queue.heartbeat("alive")
+    assert queue.requeue_stale() == 0
+    assert queue.get("j1")["status"] == "running"
+
+
+def test_cancelled_queued_job_is_not_claimed(queue):
+    submit(queue, "j1")
+    submit(queue, "j2")
+    assert queue.cancel("j1") == "cancelled"
+    assert queue.claim("w")["id"] == "j2"
+    assert queue.claim("w") is None
+    assert queue.get("j1")["status"] == "cancelled"
+    # 실행 중이면 요청만 남음
+    assert queue.cancel("j2") == "running"
+    assert queue.get("j2")["cancel_requested"] == 1
+
+
+def test_claim_alternates_between_companies(queue):
+    # A 회사가 먼저 몰아 넣어도 B 회사 작업이 그 뒤에 줄 서지 않음
+    for i in range(3):
+        submit(queue, f"a{i}", "A")
+    for i in range(2):
+        submit(queue, f"b{i}", "B")
+    claimed = [queue.claim("w")["id"] for _ in range(5)]
+    assert claimed == ["a0", "b0", "a1", "b1", "a2"]
+
+
+def test_stats_count_only_own_company(queue):
+    for i in range(3):
+        submit(queue, f"a{i}", "A")
+    submit(queue, "b0", "B")
+    queue.claim("w")  # a0
+    runner = JobRunner(queue, workers=0)
+    runner.running = {"a0": "A"}
+
+    a = runner.stats("A")
+    assert (a["running"], a["queue_running"], a["queue_queued"]) == (1, 1, 2)
+    b = runner.stats("B")
+    assert (b["running"], b.get("queue_running", 0), b["queue_queued"]) == (0, 0, 1)
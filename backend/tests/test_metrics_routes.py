@@ -0,0 +1,32 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from metrics import MetricsMiddleware, metrics
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as cl:
+        yield cl
+
+
+def metrics_middleware(app):
+    node = app.middleware_stack
+    while node is not None and not isinstance(node, MetricsMiddleware):
+        node = getattr(node, "app", None)
+    return node
+
+
+@pytest.mark.skipif(not main.METRICS_ENABLED, reason="METRICS_ENABLED=0")
+def test_route_cache_does_not_grow_with_path_params(client):
+    client.get("/health")
+    mw = metrics_middleware(main.app)
+    before = len(mw._routes)
+    for i in range(200):
+        assert client.get(f"/jobs/x{i}").status_code == 401
+        client.get(f"/admin/profiles/p{i}")
+    assert len(mw._routes) == before
+    assert "/health" in mw._routes
+    # 라벨은 여전히 경로 템플릿
+    assert 'route="/jobs/{job_id}"' in metrics.render()
@@ -0,0 +1,107 @@
+import random
+import shutil
+import sqlite3
+
+import pytest
+
+import migrations
+import rollups
+from migrations import connect, migrate
+
+ROLLUP_TABLES = ("rollup_location_month", "rollup_worker_day", "rollup_worker_month", "rollup_fatigue_day")
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    # 집계 테이블이 생기기 전(003) DB 에 근무 기록만 있는 상태
+    path = str(tmp_path / "legacy.db")
+    with monkeypatch.context() as m:
+        m.setattr(migrations, "MIGRATIONS", [x for x in migrations.MIGRATIONS if x[0] <= 3])
+        conn = connect(path)
+        migrate(conn, log=None)
+    rng = random.Random(7)
+    rows = []
+    for _ in range(600):
+        day = f"{rng.choice(['2024-11', '2024-12', '2025-01', '2025-02'])}-{rng.randint(1, 28):02d}"
+        rows.append((
+            rng.choice(["김철수", "이영희", "박민수", "최지우", None]),
+            rng.choice(["A센터", "B센터", None]),
+            rng.choice(["상하차", "포장"]), rng.uniform(1, 9), rng.uniform(0, 2), rng.randint(0, 90000),
+            rng.choice([1.0, 1.5, None]), rng.choice([70.0, None]), day,
+            rng.choice(["REGULAR", "DAILY", None]),
+        ))
+    # 형식이 맞지 않는 날짜 (집계에서 빠져야 함)
+    for bad in ("", "2025", "2025-1-3", "abc", None, "2025-01-05 08:00"):
+        rows.append(("김철수", "A센터", "포장", 8.0, 0.0, 80000, 1.0, 70.0, bad, "DAILY"))
+    # 명단에 있는 사람만 007 에서 worker_id 가 채워짐 (최지우는 기록만 있음)
+    conn.executemany(
+        "INSERT INTO workers (name, phone, worker_type) VALUES (?, '010', ?)",
+        [(n, t) for n in ("김철수", "이영희", "박민수") for t in ("REGULAR", "DAILY")]
+    )
+    conn.executemany(
+        "INSERT INTO work_logs (name, location, job_name, work_hours, night_hours, total_pay, intensity, score, "
+        "work_date, worker_type) VALUES (?,?,?,?,?,?,?,?,?,?)", rows
+    )
+    conn.close()
+    return path
+
+
+def snapshot(path, tables=ROLLUP_TABLES):
+    conn = sqlite3.connect(path)
+    try:
+        return {
+            t: sorted(
+                tuple(round(v, 6) if isinstance(v, float) else v for v in r)
+                for r in conn.execute(f"SELECT * FROM {t}")
+            )
+            for t in tables
+        }
+    finally:
+        conn.close()
+
+
+def full_rebuild(path, tmp_path):
+    # 한 번에 다시 계산한 결과 (비교 기준)
+    ref = str(tmp_path / "reference.db")
+    shutil.copy(path, ref)
+    conn = connect(ref)
+    conn.execute("BEGIN IMMEDIATE")
+    rollups.rebuild(conn)
+    conn.execute("COMMIT")
+    conn.close()
+    return snapshot(ref)
+
+
+def test_batched_rebuild_matches_full_rebuild(legacy_db, tmp_path):
+    conn = connect(legacy_db)
+    migrate(conn, log=None)
+    conn.close()
+    result = snapshot(legacy_db)
+    assert result["rollup_worker_month"] and result["rollup_fatigue_day"]
+    assert result == full_rebuild(legacy_db, tmp_path)
+
+
+def test_batched_rebuild_resumes_after_interruption(legacy_db, tmp_path, monkeypatch):
+    batches = []
+
+    def interrupt(_):
+        batches.append(1)
+        if len(batches) == 3:
+            raise KeyboardInterrupt
+
+    conn = connect(legacy_db)
+    with monkeypatch.context() as m:
+        m.setattr(migrations.time, "sleep", interrupt)
+        with pytest.raises(KeyboardInterrupt):
+            migrate(conn, log=None)
+    assert migrations.current_version(conn) == 3
+    done = conn.execute("SELECT COUNT(*) FROM rollup_location_month").fetchone()[0]
+    assert done > 0
+
+    # 이어서 실행: 이미 넣은 구간은 다시 넣지 않음 (PRIMARY KEY 충돌 없이 끝나야 함)
+    assert migrations.rebuild_batched(
+        conn, "004_log_rollups", migrations._M004_RESET, migrations._M004_RANGE
+    ) == 9 - 3  # 근로형태 2 × 4개월 + DAILY 의 '2025-1-' 구간, 그중 3개는 끝남
+    migrate(conn, log=None)
+    conn.close()
+    assert snapshot(legacy_db) == full_rebuild(legacy_db, tmp_path)
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache import record_write
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as cl:
+        tenant = main.tenants.get("WMS01")
+        rng = random.Random(3)
+        # 같은 이름이 여러 번, 이름이 없는 사람도 섞어서 (정렬 키가 겹치고 NULL 이 있는 경우)
+        rows = [
+            (rng.choice(["가", "나", "다", "라", None]), f"010-{i}", rng.choice(["서울", "부산", None]), "REGULAR")
+            for i in range(40)
+        ]
+        with tenant.pool.connection() as conn:
+            conn.executemany("INSERT INTO workers (name, phone, center, worker_type) VALUES (?,?,?,?)", rows)
+            record_write(conn, "workers")
+            conn.commit()
+        tenant.versions.bump("workers")
+        yield cl
+
+
+def login(cl, username="admin"):
+    r = cl.post("/auth/login", json={"code": "WMS01", "username": username, "key": "1234"})
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+def walk(cl, headers, base, limit):
+    # X-Next-After-Id 를 따라 끝까지
+    out, after = [], None
+    while True:
+        url = f"{base}&limit={limit}" + (f"&after_id={after}" if after else "")
+        r = cl.get(url, headers=headers)
+        assert r.status_code == 200, r.text
+        out += r.json()
+        after = r.headers.get("X-Next-After-Id")
+        if not after:
+            return out
+
+
+@pytest.mark.parametrize("sort", [None, "name", "-name", "center", "-center", "-id"])
+@pytest.mark.parametrize("limit", [1, 7])
+def test_workers_list_pages_cover_unpaged_result(client, sort, limit):
+    headers = login(client)
+    base = "/workers/list?type=REGULAR" + (f"&sort={sort}" if sort else "")
+    full = client.get(base, headers=headers).json()
+    assert any(r["name"] is None for r in full) and len(full) >= 40
+
+    pages = walk(client, headers, base, limit)
+    ids = [r["id"] for r in pages]
+    assert len(ids) == len(set(ids))  # 중복 없음
+    assert pages == full              # 빠진 행 없이 같은 순서
+
+
+def test_workers_list_null_names_sort_first_ascending_last_descending(client):
+    headers = login(client)
+    asc = [r["name"] for r in client.get("/workers/list?type=REGULAR&sort=name", headers=headers).json()]
+    desc = [r["name"] for r in client.get("/workers/list?type=REGULAR&sort=-name", headers=headers).json()]
+    nulls = asc.count(None)
+    assert asc[:nulls] == [None] * nulls and desc[-nulls:] == [None] * nulls
+    assert desc[:-nulls] == sorted(asc[nulls:], reverse=True)
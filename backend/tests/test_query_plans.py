@@ -0,0 +1,30 @@
+from query_plans import UNEXPANDED, build_schema_db, check, collect_statements
+
+
+def test_no_full_scans():
+    conn = build_schema_db()
+    try:
+        assert check(conn, collect_statements()) == []
+    finally:
+        conn.close()
+
+
+def test_dynamic_sql_variants_are_checked():
+    labels = [where for where, _ in collect_statements()]
+    for name in ("workers_list", "workforce_detail", "export"):
+        assert any(f"[{name} #" in w for w in labels)
+
+
+def test_unexpandable_sql_is_reported(tmp_path):
+    # 지역 값으로 조립한 SQL 은 건너뛰지 않고 실패로
+    src = tmp_path / "qp_dynamic_sample.py"
+    src.write_text(
+        'def f(cols, where):\n'
+        '    return f"SELECT {cols} FROM workers WHERE {where}"\n'
+        'def g(where):\n'
+        '    return f"SELECT id FROM workers /* dynamic: unknown_builder */ WHERE {where}"\n',
+        encoding="utf-8"
+    )
+    found = collect_statements([src])
+    assert found == [("qp_dynamic_sample.py:2", None), ("qp_dynamic_sample.py:4", None)]
+    assert check(None, found) == [(w, None, [UNEXPANDED]) for w, _ in found]
@@ -0,0 +1,129 @@
+import random
+import shutil
+import sqlite3
+
+import pytest
+
+import main
+import rollups
+from migrations import connect, migrate
+from reprice import DATE_MAX, DATE_MIN, reprice
+
+ROLLUP_TABLES = ("rollup_location_month", "rollup_worker_day", "rollup_worker_month", "rollup_fatigue_day")
+
+# 야간 판정이 갈리는 시간대 (calc_pay 와 같은 결과가 나와야 함)
+TIME_SLOTS = [
+    "18:00~02:00 (후반)", "18:00~02:00 (전반)", "02:00~10:00 (전반)", "02:00~10:00 (후반)",
+    "10:00~18:00", "주간 18:00~02:00 (후반) 연장", None,
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "reprice.db")
+    conn = connect(path)
+    migrate(conn, log=None)
+    rng = random.Random(11)
+    rows = []
+    for _ in range(500):
+        day = f"{rng.choice(['2025-01', '2025-02', '2025-03'])}-{rng.randint(1, 28):02d}"
+        rows.append((
+            rng.choice(["김철수", "이영희", "박민수", None]),
+            rng.choice(["A센터", "B센터", None]),
+            rng.choice(["상하차", "포장"]), rng.choice(TIME_SLOTS),
+            rng.choice([rng.uniform(1, 9), 7.5, 3.3, None]), rng.uniform(0, 2), rng.randint(0, 90000),
+            rng.choice([1.0, 1.5, None]), rng.choice([70.0, None]), day,
+            rng.choice(["REGULAR", "DAILY", None]), rng.choice([1, 2, 3, None]),
+        ))
+    # 형식이 맞지 않는 날짜 (집계에는 없고 기록만 바뀌어야 함)
+    rows.append(("김철수", "A센터", "상하차", "18:00~02:00 (후반)", 8.0, 8.0, 0, 1.0, 80.0, "2025-2-3", "DAILY", 1))
+    conn.executemany(
+        "INSERT INTO work_logs (name, location, job_name, time_slot, work_hours, night_hours, total_pay, intensity, "
+        "score, work_date, worker_type, worker_id) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", rows
+    )
+    conn.execute("BEGIN IMMEDIATE")
+    rollups.rebuild(conn)
+    conn.execute("COMMIT")
+    yield conn
+    conn.close()
+
+
+def snapshot(conn, tables=ROLLUP_TABLES):
+    return {
+        t: sorted(
+            tuple(round(v, 6) if isinstance(v, float) else v for v in r)
+            for r in conn.execute(f"SELECT * FROM {t}")
+        )
+        for t in tables
+    }
+
+
+def full_rebuild(conn, tmp_path):
+    # 바뀐 work_logs 로 처음부터 다시 계산한 결과 (비교 기준)
+    ref = str(tmp_path / "reference.db")
+    conn.execute("PRAGMA wal_checkpoint(FULL)")
+    shutil.copy(conn.execute("PRAGMA database_list").fetchone()[2], ref)
+    other = sqlite3.connect(ref)
+    try:
+        rollups.rebuild(other)
+        return snapshot(other)
+    finally:
+        other.close()
+
+
+def logs(conn, *cols):
+    return conn.execute(f"SELECT id, {', '.join(cols)} FROM work_logs ORDER BY id").fetchall()
+
+
+@pytest.mark.parametrize("date_from, date_to, worker_type", [
+    (None, None, None),
+    ("2025-02-01", "2025-02-28", None),
+    ("2025-01-10", "2025-03-05", "DAILY"),
+    (None, None, "REGULAR"),
+])
+def test_reprice_matches_rebuild(db, tmp_path, date_from, date_to, worker_type):
+    before = {r[0]: r[1:] for r in logs(db, "total_pay", "intensity", "score", "night_hours")}
+    db.execute("BEGIN IMMEDIATE")
+    result = reprice(db, "상하차", 1.8, 12345, date_from, date_to, worker_type)
+    db.execute("COMMIT")
+    assert result["repriced"] > 0
+
+    low, high = date_from or DATE_MIN, date_to or DATE_MAX
+    changed = 0
+    for row_id, job, slot, hours, work_date, wtype, pay, intensity, score, night in logs(
+        db, "job_name", "time_slot", "work_hours", "work_date", "worker_type",
+        "total_pay", "intensity", "score", "night_hours"
+    ):
+        in_range = (
+            job == "상하차" and work_date is not None and low <= work_date <= high
+            and (worker_type is None or wtype == worker_type)
+        )
+        if not in_range:
+            assert (pay, intensity, score, night) == before[row_id]
+            continue
+        changed += 1
+        assert night == before[row_id][3]
+        assert intensity == 1.8
+        if hours is None:
+            assert pay is None and score is None
+            continue
+        # 야간 시간대 판정과 소수점 버림이 calc_pay 와 같아야 함
+        assert pay == main.calc_pay(slot or "", hours, 12345)[1]
+        assert score == pytest.approx(1.8 * hours * 10)
+    assert changed == result["repriced"]
+
+    assert snapshot(db) == full_rebuild(db, tmp_path)
+
+
+def test_reprice_night_slots(db):
+    db.execute("DELETE FROM work_logs")
+    db.executemany(
+        "INSERT INTO work_logs (name, location, job_name, time_slot, work_hours, night_hours, total_pay, "
+        "intensity, score, work_date, worker_type, worker_id) "
+        "VALUES ('김철수', 'A센터', '포장', ?, 7.3, 0, 0, 1.0, 0, '2025-04-01', 'DAILY', 1)",
+        [(s,) for s in TIME_SLOTS]
+    )
+    reprice(db, "포장", 1.0, 10001)
+    pays = [r[0] for r in db.execute("SELECT total_pay FROM work_logs ORDER BY id")]
+    assert pays == [main.calc_pay(s or "", 7.3, 10001)[1] for s in TIME_SLOTS]
+    assert len(set(pays)) == 2
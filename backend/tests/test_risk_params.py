@@ -0,0 +1,31 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from fatigue import MAX_WINDOW
+
+
+@pytest.fixture(scope="module")
+def headers():
+    with TestClient(main.app) as cl:
+        r = cl.post("/auth/login", json={"code": "WMS01", "username": "admin", "key": "1234"})
+        yield cl, {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+@pytest.mark.parametrize("streak", [0, MAX_WINDOW + 1, 800000, 100000000])
+def test_streak_out_of_range_is_rejected(headers, streak):
+    cl, h = headers
+    r = cl.get(f"/risk?type=REGULAR&as_of=2024-01-01&streak={streak}", headers=h)
+    assert r.status_code == 400
+    assert "streak" in r.json()["detail"]
+
+
+def test_streak_at_limit_is_accepted(headers):
+    cl, h = headers
+    assert cl.get(f"/risk?type=REGULAR&as_of=2024-01-01&streak={MAX_WINDOW}", headers=h).status_code == 200
+
+
+def test_as_of_before_calendar_start_is_rejected(headers):
+    # 창 시작일이 0001-01-01 이전 -> OverflowError 가 500 이 아니라 400
+    cl, h = headers
+    assert cl.get("/risk?type=REGULAR&as_of=0001-01-03", headers=h).status_code == 400
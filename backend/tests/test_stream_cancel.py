@@ -0,0 +1,75 @@
+import asyncio
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from db import DB_PATH, ConnectionPool
+from export import build_query, export_stream, stream_export
+from ingest import ChunkSpool, spool_excel_chunks
+from metrics import metrics
+from migrations import migrate_path
+
+
+def slow(gen, state, delay=0.3):
+    # 청크마다 스레드에서 오래 걸리는 인코딩/파싱 흉내
+    try:
+        for item in gen:
+            state["started"] = True
+            time.sleep(delay)
+            yield item
+    finally:
+        state["closed"] = True
+        gen.close()
+
+
+async def cancel_while_running(coro, state):
+    task = asyncio.ensure_future(coro)
+    while not state.get("started"):
+        await asyncio.sleep(0.01)
+    task.cancel()  # next() 가 작업 스레드에서 실행 중일 때
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.fixture(scope="module")
+def db_pool():
+    migrate_path(DB_PATH, log=None)
+    pool = ConnectionPool(DB_PATH, size=2)
+    with pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO workers (name, phone, center, worker_type, valid_date) VALUES (?,?,?,?,?)",
+            [(f"w{i}", str(i), "서울", "REGULAR", "") for i in range(100)]
+        )
+        conn.commit()
+    yield pool
+    pool.close_all()
+    os.remove(DB_PATH)
+
+
+def test_download_cancelled_midway_closes_stream(db_pool):
+    sql, params = build_query("workers", "REGULAR", None, None, None)
+    state = {}
+    gen = slow(export_stream("workers", "csv", sql, params, db_pool), state)
+
+    async def consume():
+        async for _ in stream_export(gen, label="test.csv"):
+            pass
+
+    asyncio.run(cancel_while_running(consume(), state))
+    assert state["closed"]
+    # 스트림이 잡은 커넥션이 GC 전에 풀로 돌아옴
+    assert db_pool.stats()["idle"] == db_pool.stats()["created"]
+    assert ("export", "test.csv") in metrics.transfer
+
+
+def test_upload_cancelled_midway_closes_parser():
+    state = {}
+    chunks = slow((pd.DataFrame({"a": [i]}) for i in range(3)), state)
+    spool = ChunkSpool()
+    try:
+        asyncio.run(cancel_while_running(spool_excel_chunks(chunks, spool), state))
+        assert state["closed"]
+    finally:
+        spool.close()
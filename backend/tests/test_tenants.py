@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+import tenants
+from migrations import migrate_path
+
+
+@pytest.fixture
+def shared_db(tmp_path):
+    # WMS01(시드) + ACME 두 회사, 명단 1명
+    path = str(tmp_path / "shared.db")
+    migrate_path(path, log=None)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO accounts VALUES ('ACME', 'admin', 'x', 1, 'ACME')")
+    conn.execute("INSERT INTO workers (name, phone, worker_type) VALUES ('홍길동', '010-0000', 'REGULAR')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def counts(directory, code):
+    conn = sqlite3.connect(tenants.tenant_path(code, str(directory)))
+    try:
+        return tuple(conn.execute(f"SELECT count(*) FROM {t}").fetchone()[0] for t in ("accounts", "workers"))
+    finally:
+        conn.close()
+
+
+def test_split_defaults_to_empty_dbs(shared_db, tmp_path):
+    out = tmp_path / "tenants"
+    assert tenants.split(shared_db, directory=str(out), log=None) == {"ACME": "empty", "WMS01": "empty"}
+    assert counts(out, "ACME") == (0, 0)
+    assert counts(out, "WMS01") == (0, 0)
+
+
+def test_split_copies_only_to_owners(shared_db, tmp_path):
+    out = tmp_path / "tenants"
+    assert tenants.split(shared_db, owners=["WMS01"], directory=str(out), log=None) == {"ACME": "empty", "WMS01": "copied"}
+    assert counts(out, "WMS01") == (0, 1)
+    assert counts(out, "ACME") == (0, 0)
+
+
+def test_split_copy_all_is_explicit(shared_db, tmp_path):
+    out = tmp_path / "tenants"
+    with pytest.raises(ValueError):
+        tenants.split(shared_db, owners=["WMS01"], directory=str(out), log=None, copy_all=True)
+    assert tenants.split(shared_db, directory=str(out), log=None, copy_all=True) == {"ACME": "copied", "WMS01": "copied"}
+    assert counts(out, "ACME") == (0, 1)
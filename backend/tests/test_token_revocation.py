@@ -0,0 +1,48 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from tokens import revocations, token_cache, token_digest
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as cl:
+        yield cl
+
+
+def login(cl, username="staff"):
+    token = cl.post("/auth/login", json={"code": "WMS01", "username": username, "key": "1234"}).json()["access_token"]
+    return token, {"Authorization": "Bearer " + token}
+
+
+def test_logout_survives_fresh_process_cache(client):
+    _, headers = login(client)
+    assert client.get("/analytics?type=REGULAR", headers=headers).status_code == 200
+    assert client.post("/auth/logout", headers=headers).json()["success"]
+    # 다른 워커 프로세스: 로컬 캐시/거부 목록 없이 공용 DB 만 봄
+    token_cache._revoked.clear()
+    token_cache.clear()
+    assert client.get("/analytics?type=REGULAR", headers=headers).status_code == 401
+
+
+def test_revocation_from_other_process_applies_after_ttl(client, monkeypatch):
+    monkeypatch.setattr(token_cache, "ttl", 0)
+    token, headers = login(client)
+    assert client.get("/analytics?type=REGULAR", headers=headers).status_code == 200
+    # 다른 프로세스의 로그아웃은 공용 DB 에만 기록됨
+    revocations.revoke_token(token_digest(token), time.time() + 60)
+    assert client.get("/analytics?type=REGULAR", headers=headers).status_code == 401
+
+
+def test_logout_all_revokes_every_session(client):
+    _, first = login(client)
+    _, second = login(client)
+    assert client.post("/auth/logout?all=true", headers=first).json()["success"]
+    token_cache.clear()
+    assert client.get("/analytics?type=REGULAR", headers=second).status_code == 401
+    time.sleep(0.01)
+    _, again = login(client)
+    assert client.get("/analytics?type=REGULAR", headers=again).status_code == 200
@@ -0,0 +1,66 @@
+import io
+import sqlite3
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import ingest
+import main
+from db import DB_PATH
+
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as cl:
+        yield cl
+
+
+def login(cl):
+    r = cl.post("/auth/login", json={"code": "WMS01", "username": "admin", "key": "1234"})
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+def xlsx(df):
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def other_writer_can_lock():
+    # 다른 커넥션이 기다리지 않고 바로 쓰기 잠금을 잡을 수 있는지
+    conn = sqlite3.connect(DB_PATH, timeout=0)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("ROLLBACK")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def test_upload_parses_without_holding_write_lock(client, monkeypatch):
+    checks = []
+
+    def chunks(fileobj, required, **kwargs):
+        # 작은 청크로 나눠 두 번째 청크부터 파싱 중에 쓰기 잠금 확인
+        for i, df in enumerate(ingest.iter_excel_chunks(fileobj, required, chunk_rows=2)):
+            if i:
+                checks.append(other_writer_can_lock())
+            yield df
+
+    monkeypatch.setattr(main, "iter_excel_chunks", chunks)
+    rows = pd.DataFrame({
+        "날짜": [f"2030-01-{d:02d}" for d in range(1, 8)],
+        "이름": "김철수", "근무지": "서울", "직무": "포장", "시간대": "10:00~18:00", "근무시간": 8,
+    })
+    r = client.post(
+        "/upload/logs", data={"type": "REGULAR"},
+        files={"file": ("logs.xlsx", xlsx(rows), XLSX)}, headers=login(client)
+    )
+    assert r.status_code == 200, r.text
+    assert r.json()["rows"] == 7
+    assert checks == [True, True, True]
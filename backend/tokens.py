@@ -0,0 +1,161 @@
+"""
+검증된 토큰 캐시
+
+대시보드는 화면 하나에 여러 API 를 연달아 부르므로 같은 Bearer 토큰이 계속 들어온다.
+한 번 서명 검증을 통과한 토큰은 (토큰 해시 -> 만료 시각, TokenData) 로 보관해
+다음 요청부터 jwt.decode 와 모델 생성을 건너뛴다.
+
+- exp 가 지난 항목은 꺼낼 때 버린다 (캐시가 토큰 수명을 늘리지 않음)
+- revoke_token: 로그아웃한 토큰은 exp 까지 거부 목록에 둔다
+- revoke_user : 해당 계정이 그 시각 이전에 발급받은 토큰을 모두 거부한다 (iat 비교, /auth/logout?all=true)
+
+거부 목록은 공용 DB(RevocationStore: revoked_tokens, revoked_users)에도 기록해 워커 프로세스들이 공유한다.
+캐시에 없는 토큰은 서명 검증 후 DB 거부 목록을 확인하고, 캐시 항목은 TOKEN_CACHE_TTL 초가 지나면 다시 확인하므로
+다른 프로세스에서 폐기한 토큰도 최대 그 시간 안에 거부된다.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from db import pool
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))  # 최대 항목 수
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "30"))    # 초, 지나면 DB 거부 목록 다시 확인
+
+def token_digest(token: str) -> bytes:
+    # 원문 토큰을 메모리에 키로 들고 있지 않도록 해시로 보관
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+class TokenCache:
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()   # digest -> (만료 시각 = min(exp, 넣은 시각 + ttl), subject, user)
+        self._revoked = {}            # digest -> exp (로그아웃한 토큰)
+        self._revoked_before = {}     # subject -> 이 시각 이전 발급 토큰 거부
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.rejected = 0
+
+    def get(self, digest: bytes):
+        now = time.time()
+        with self._lock:
+            item = self._items.get(digest)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[0] <= now:
+                del self._items[digest]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(digest)
+            self.hits += 1
+            return item[2]
+
+    def admit(self, digest: bytes, exp: float, subject: tuple, issued_at, user) -> bool:
+        """
+        서명 검증을 막 통과한 토큰을 거부 목록과 대조해 넣는다. 거부 대상이면 False.
+        확인과 저장을 한 잠금 안에서 해, 검증 중에 폐기된 토큰이 캐시에 남지 않게 한다.
+        (iat 가 없는 예전 토큰은 0 으로 취급)
+        """
+        with self._lock:
+            before = self._revoked_before.get(subject)
+            if digest in self._revoked or (before is not None and (issued_at or 0) < before):
+                self.rejected += 1
+                return False
+            self._items[digest] = (min(exp, time.time() + self.ttl), subject, user)
+            self._items.move_to_end(digest)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def revoke_token(self, digest: bytes, exp: float):
+        now = time.time()
+        with self._lock:
+            self._items.pop(digest, None)
+            # 만료된 거부 항목은 어차피 jwt.decode 에서 걸리므로 정리
+            for d in [d for d, e in self._revoked.items() if e <= now]:
+                del self._revoked[d]
+            self._revoked[digest] = exp
+
+    def revoke_user(self, subject: tuple, before: float = None):
+        # subject = (company_code, username)
+        before = time.time() if before is None else before
+        with self._lock:
+            self._revoked_before[subject] = before
+            for d in [d for d, item in self._items.items() if item[1] == subject]:
+                del self._items[d]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "rejected": self.rejected,
+                "revoked_tokens": len(self._revoked),
+                "revoked_users": len(self._revoked_before),
+            }
+
+# ==============================
+# 공용 DB 거부 목록
+# ==============================
+
+class RevocationStore:
+    def __init__(self, pool=pool):
+        self.pool = pool
+
+    def revoke_token(self, digest: bytes, exp: float):
+        now = time.time()
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT INTO revoked_tokens (digest, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(digest) DO UPDATE SET expires_at = excluded.expires_at",
+                (digest, exp)
+            )
+            conn.commit()
+
+    def revoke_user(self, subject: tuple, before: float, max_age: float):
+        # max_age: 토큰 최대 수명. 그보다 오래된 기준 시각은 이전 토큰이 모두 만료됐으므로 정리
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM revoked_users WHERE revoked_before <= ?", (time.time() - max_age,))
+            conn.execute(
+                "INSERT INTO revoked_users (company_code, username, revoked_before) VALUES (?, ?, ?) "
+                "ON CONFLICT(company_code, username) DO UPDATE SET "
+                "revoked_before = MAX(revoked_before, excluded.revoked_before)",
+                (*subject, before)
+            )
+            conn.commit()
+
+    def is_revoked(self, digest: bytes, subject: tuple, issued_at) -> bool:
+        with self.pool.connection() as conn:
+            if conn.execute(
+                "SELECT 1 FROM revoked_tokens WHERE digest=? AND expires_at > ?", (digest, time.time())
+            ).fetchone():
+                return True
+            row = conn.execute(
+                "SELECT revoked_before FROM revoked_users WHERE company_code=? AND username=?", subject
+            ).fetchone()
+        return row is not None and (issued_at or 0) < row[0]
+
+
+token_cache = TokenCache()
+revocations = RevocationStore()
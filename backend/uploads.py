@@ -0,0 +1,162 @@
+"""
+엑셀 업로드 처리 (/upload/workers, /upload/logs 와 백그라운드 작업이 같이 쓴다)
+
+업로드 한 건 = 객체 하나. 엑셀은 먼저 끝까지 파싱해 임시 파일(ingest.ChunkSpool)에 적어 두고,
+apply_spool() 이 BEGIN IMMEDIATE 로 쓰기 잠금을 잡은 뒤 청크마다 insert_chunk(df) 를 부르고,
+finish() 가 원장 기록과 커밋으로 같은 트랜잭션을 마친다. 쓰기 잠금은 파싱 시간과 무관하게 반영하는 동안만 잡힌다.
+커밋 전에 예외가 나면 커넥션 반납 시 전체가 롤백된다.
+"""
+from fastapi import HTTPException
+
+from ingest import (
+    INSERT_LOG_SQL, INSERT_WORKER_SQL, LOG_COLUMNS, WORKER_COLUMNS,
+    WorkerIdMap, compute_log_frame, compute_worker_frame, existing_dates, insert_frame,
+    load_job_frame, record_upload, replace_daily_workers, replace_log_rows, throughput, to_date_str
+)
+from cache import record_write
+from rollups import apply_fatigue_delta, apply_log_delta
+
+WORKER_REQUIRED = ['이름', '전화번호', '소속센터', '고정교대조', '자격증']
+LOG_REQUIRED = ['날짜', '이름', '근무지', '직무', '시간대', '근무시간']
+
+
+class WorkerUpload:
+    kind = "workers"
+    label = "workers"                    # 처리량 지표 라벨
+    tables = ("workers", "work_logs")    # 캐시 버전을 올릴 테이블
+    required = WORKER_REQUIRED
+    msg = "명단 업로드 완료"
+
+    def __init__(self, conn, worker_type: str, mode: str):
+        self.conn = conn
+        self.worker_type = worker_type
+        self.mode = mode
+        self.valid_date = None
+        self.ids = None
+        self.upsert = False  # 이미 있는 기준일이면 거절 대신 같은 사람 행만 교체
+        self.replaced = 0
+
+    def _start(self, df):
+        # 첫 청크에서 기준일 확인 / 기존 명단 정리
+        conn = self.conn
+        self.ids = WorkerIdMap(conn, self.worker_type)
+        if self.worker_type == 'DAILY':
+            target_date = str(df.iloc[0].get('기준일')).split()[0]
+            if not target_date:
+                raise HTTPException(status_code=400, detail="기준일 컬럼이 필요합니다.")
+            row = conn.execute(
+                "SELECT count(*) FROM workers WHERE worker_type='DAILY' AND valid_date=?",
+                (target_date,)
+            ).fetchone()
+            if row[0] > 0:
+                if self.mode != 'upsert':
+                    raise HTTPException(
+                        status_code=409,
+                        detail=f"❌ {target_date} 일용직 명단이 이미 존재합니다."
+                    )
+                self.upsert = True
+            self.valid_date = target_date
+        else:
+            conn.execute("DELETE FROM workers WHERE worker_type='REGULAR'")
+            self.valid_date = ''
+
+    def insert_chunk(self, df) -> int:
+        conn = self.conn
+        if self.valid_date is None:
+            self._start(df)
+        worker_ids = self.ids.ensure(conn, df['이름'], df['전화번호'])
+        if self.upsert:
+            self.replaced += replace_daily_workers(conn, self.valid_date, worker_ids)
+        rows = insert_frame(
+            conn, INSERT_WORKER_SQL,
+            compute_worker_frame(df, self.worker_type, self.valid_date, worker_ids), WORKER_COLUMNS
+        )
+        # 명단보다 먼저 올라온 근무 기록을 새 사람에 연결
+        apply_fatigue_delta(conn, self.ids.link_orphans(conn))
+        return rows
+
+    def finish(self, rows: int, started: float, digest: str, size: int, username: str) -> dict:
+        if self.valid_date is None and self.worker_type != 'DAILY':
+            # 빈 정규직 명단 = 전체 삭제
+            self.conn.execute("DELETE FROM workers WHERE worker_type='REGULAR'")
+        return _commit(self, rows, started, digest, size, username)
+
+
+class LogUpload:
+    kind = "logs"
+    label = "work_logs"
+    tables = ("work_logs",)
+    required = LOG_REQUIRED
+    msg = "기록 업로드 완료"
+
+    def __init__(self, conn, worker_type: str, mode: str):
+        self.conn = conn
+        self.worker_type = worker_type
+        self.mode = mode
+        self.jobs = None
+        self.ids = None
+        self.seen_dates = set()  # 이번 업로드에서 이미 넣은 날짜 (청크 간 중복 검사 제외)
+        self.overlap = set()     # upsert: 업로드 전부터 기록이 있던 날짜
+        self.replaced = 0
+
+    def insert_chunk(self, df) -> int:
+        conn = self.conn
+        dates = set(to_date_str(df['날짜']).unique()) - self.seen_dates
+        clash = existing_dates(conn, self.worker_type, dates)
+        if clash and self.mode != 'upsert':
+            raise HTTPException(
+                status_code=409,
+                detail=f"❌ {', '.join(clash[:5])}{' 외' if len(clash) > 5 else ''} 근무 기록이 이미 존재합니다. (수정 탭 이용)"
+            )
+        self.seen_dates.update(dates)
+        self.overlap.update(clash)
+
+        if self.jobs is None:
+            self.jobs = load_job_frame(conn)
+            self.ids = WorkerIdMap(conn, self.worker_type)
+        # 전화번호 컬럼(선택)이 있으면 동명이인도 구분해 연결
+        worker_ids = self.ids.resolve(df['이름'], df['전화번호'] if '전화번호' in df else None)
+        logs = compute_log_frame(df, self.jobs, self.worker_type, worker_ids)
+        if self.overlap:
+            # 기존 날짜는 (날짜, 이름, 시간대)가 같은 행을 교체
+            replaced = replace_log_rows(conn, logs, self.worker_type, self.overlap)
+            apply_log_delta(conn, replaced, -1)
+            self.replaced += len(replaced)
+        rows = insert_frame(conn, INSERT_LOG_SQL, logs, LOG_COLUMNS)
+        apply_log_delta(conn, logs)
+        return rows
+
+    def finish(self, rows: int, started: float, digest: str, size: int, username: str) -> dict:
+        return _commit(self, rows, started, digest, size, username)
+
+
+UPLOADS = {"workers": WorkerUpload, "logs": LogUpload}
+
+def _commit(upload, rows: int, started: float, digest: str, size: int, username: str) -> dict:
+    # 원장 기록과 데이터를 한 트랜잭션으로
+    result = {"msg": upload.msg, **throughput(rows, started), "replaced": upload.replaced}
+    result["upload_id"] = record_upload(
+        upload.conn, upload.kind, upload.worker_type, upload.mode, digest, size, result, username
+    )
+    record_write(upload.conn, *upload.tables)
+    upload.conn.commit()
+    return result
+
+def check_upload_access(kind: str, worker_type: str, role: int):
+    # 정규직 명단은 관리자만 덮어쓰기 허용
+    if kind == "workers" and worker_type != 'DAILY' and role != 1:
+        raise HTTPException(status_code=403, detail="정규직 명단 업로드는 관리자만 가능합니다.")
+
+def apply_spool(upload, spool, progress=None) -> int:
+    """
+    파싱해 둔 청크를 쓰기 트랜잭션 하나로 반영한다 (커밋은 finish).
+    잠금을 처음에 잡으므로 중간 청크에서 다른 쓰기와 부딪혀 실패하지 않는다.
+    progress(rows) 는 청크마다 호출 (취소 시 예외를 내면 커밋 전이라 전체가 롤백됨).
+    """
+    upload.conn.execute("BEGIN IMMEDIATE")
+    total = 0
+    for df in spool:
+        total += upload.insert_chunk(df)
+        if progress:
+            progress(total)
+    return total